@@ -0,0 +1,151 @@
+"""
+Token-budgeted context assembly for agent prompts.
+
+_build_chat_messages() used to paste every non-user message of the whole
+chat into the system prompt. assemble_context() instead picks what fits
+in a per-node token budget:
+
+1. outputs of upstream agents in the current run (most recent first)
+2. the rolling chat summary, if any (see app.services.chat_summary)
+3. earlier chat outputs, most relevant to the current query first
+   (keyword overlap), ties broken by recency
+
+An item that does not fit is condensed (truncated) if a useful amount of
+budget is left, otherwise dropped. Selection is deterministic and the
+kept items are returned in their original chat order.
+"""
+
+import re
+from typing import List, Optional, Set
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken is optional - fall back to a character heuristic
+    _ENCODING = None
+
+# Heuristic used when tiktoken isn't installed (English text averages ~4 chars/token)
+CHARS_PER_TOKEN = 4
+
+# Don't bother condensing an item into less than this many tokens - drop it instead
+MIN_CONDENSED_TOKENS = 64
+
+TRUNCATION_MARKER = "\n...[truncated]"
+
+_WORD_RE = re.compile(r"[a-z0-9]{3,}")
+
+# Sender of the transient message carrying Chat.summary into the history
+SUMMARY_SENDER = "chat_summary"
+
+
+def count_tokens(text: Optional[str]) -> int:
+    """ Number of tokens in `text` (exact with tiktoken, estimated otherwise) """
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """ Keep the head of `text` so that the result (marker included) fits in max_tokens """
+    if count_tokens(text) <= max_tokens:
+        return text
+    keep = max(0, max_tokens - count_tokens(TRUNCATION_MARKER))
+    if _ENCODING is not None:
+        head = _ENCODING.decode(_ENCODING.encode(text)[:keep])
+    else:
+        head = text[:keep * CHARS_PER_TOKEN]
+    return head.rstrip() + TRUNCATION_MARKER
+
+
+def _keywords(text: str) -> Set[str]:
+    return set(_WORD_RE.findall((text or "").lower()))
+
+
+class ContextItem:
+    """
+    One agent output that may go into the prompt.
+
+    Attributes:
+    sender: agent id that produced it
+    content: full text
+    index: position in the chat history (used for ordering / recency)
+    current_run: True for upstream outputs of the run being executed
+    """
+    def __init__(self, sender: str, content: str, index: int, current_run: bool):
+        self.sender = sender
+        self.content = content
+        self.index = index
+        self.current_run = current_run
+
+    def render(self, content: Optional[str] = None) -> str:
+        return f"[{self.sender}]: \n{self.content if content is None else content}"
+
+
+def assemble_context(
+    items: List[ContextItem],
+    query: str,
+    budget_tokens: Optional[int],
+) -> List[str]:
+    """
+    Pick and render the agent outputs that fit in `budget_tokens`.
+
+    Args:
+        items: candidate outputs, in chat order
+        query: the current user query (drives relevance of older outputs)
+        budget_tokens: tokens available for the rendered outputs,
+            None means unlimited (legacy behaviour)
+
+    Returns:
+        Rendered "[sender]: \\ncontent" blocks in chat order; if anything
+        was left out, a final note says how many outputs were omitted.
+        The blocks, note included, add up to at most budget_tokens.
+    """
+    if budget_tokens is None:
+        return [item.render() for item in items]
+
+    query_words = _keywords(query)
+
+    def rank(item: ContextItem):
+        if item.current_run:
+            return (0, 0, -item.index)
+        if item.sender == SUMMARY_SENDER:
+            return (1, 0, -item.index)
+        relevance = len(query_words & _keywords(item.content))
+        return (2, -relevance, -item.index)
+
+    if sum(count_tokens(item.render()) for item in items) <= budget_tokens:
+        return [item.render() for item in items]
+
+    # Something will be left out: reserve room for the note saying so (sized
+    # for the largest possible count) before filling the budget - unless the
+    # budget is too small for even the note
+    note_tokens = count_tokens(_omitted_note(len(items)))
+    with_note = note_tokens <= budget_tokens
+    remaining = max(0, budget_tokens - note_tokens if with_note else budget_tokens)
+    kept = {}
+    for item in sorted(items, key=rank):
+        rendered = item.render()
+        cost = count_tokens(rendered)
+        if cost <= remaining:
+            kept[item.index] = rendered
+            remaining -= cost
+            continue
+        header_cost = count_tokens(item.render(""))
+        if remaining - header_cost >= MIN_CONDENSED_TOKENS:
+            condensed = item.render(truncate_to_tokens(item.content, remaining - header_cost))
+            cost = count_tokens(condensed)
+            if cost <= remaining:
+                kept[item.index] = condensed
+                remaining -= cost
+
+    blocks = [kept[item.index] for item in items if item.index in kept]
+    omitted = len(items) - len(blocks)
+    if omitted and with_note:
+        blocks.append(_omitted_note(omitted))
+    return blocks
+
+
+def _omitted_note(omitted: int) -> str:
+    return f"[{omitted} earlier agent output(s) omitted to fit the context budget]"
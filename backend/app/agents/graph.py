@@ -0,0 +1,326 @@
+"""
+Graph helpers for assistant graph_json.
+
+graph_json looks like:
+{
+    "nodes": [{"id": "planner", "type": "agent", ...}, ...],
+    "edges": [{"from": "planner", "to": "researcher"}, ...]
+}
+
+Edges coming from the studio use "from"/"to", the frontend helper
+createGraphEdge uses "source"/"target" - both are accepted here.
+
+Conditional routing:
+- an edge may carry a "condition", matched against the output of its
+  source node (see condition_matches); a node whose incoming edges are
+  all inactive is skipped, and so is everything only reachable through it
+- a node of type "router" classifies the run's input into a route label
+  (regex rules or a tiny LLM call, see app.agents.router); its outgoing
+  edges name the route they belong to in "condition"
+
+    {"id": "route", "type": "router", "mode": "rules", "default": "research",
+     "rules": [{"pattern": "^(hi|hello|thanks)\\b", "route": "chat"}]}
+    {"from": "route", "to": "writer",  "condition": "chat"}
+    {"from": "route", "to": "planner", "condition": "research"}
+
+This module turns the edges into a dependency map so the runtime can
+schedule agents as a DAG (independent branches run concurrently) and
+so the assistants router can reject broken graphs when they are saved.
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.llm.providers import PROVIDER_NAMES
+
+# Optional node fields forwarded to acall_llm_with_tools() for that agent
+LLM_OPTION_KEYS = ("provider", "model", "max_tokens", "temperature", "timeout_s")
+
+# Node types the runtime executes (anything else, e.g. studio input/output nodes, is ignored)
+RUNNABLE_NODE_TYPES = ("agent", "router")
+ROUTER_MODES = ("rules", "llm")
+
+
+class GraphValidationError(ValueError):
+    """
+    Raised when graph_json cannot be executed as a DAG
+    (unknown node ids, duplicate ids, cycles ...).
+    """
+    pass
+
+
+def _edge_endpoints(edge: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+    """ Return (source, target) for an edge in either naming style """
+    source = edge.get("from", edge.get("source"))
+    target = edge.get("to", edge.get("target"))
+    return source, target
+
+
+def get_agent_nodes(graph_json: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """ All nodes of type 'agent', in the order they are stored """
+    nodes = (graph_json or {}).get("nodes", []) or []
+    return [n for n in nodes if n.get("type") == "agent"]
+
+
+def get_runnable_nodes(graph_json: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """ All agent and router nodes, in the order they are stored """
+    nodes = (graph_json or {}).get("nodes", []) or []
+    return [n for n in nodes if n.get("type") in RUNNABLE_NODE_TYPES]
+
+
+def build_upstream_map(graph_json: Dict[str, Any]) -> Dict[str, List[str]]:
+    """
+    Map every agent / router node id to the ids of its direct upstream nodes.
+
+    - edges pointing at unknown / non-runnable nodes are ignored
+    - a graph with no edges at all keeps the legacy behaviour:
+      agents are chained in list order (a -> b -> c)
+
+    returns:
+        {"planner": [], "researcher": ["planner"], "writer": ["researcher"]}
+    """
+    agent_nodes = get_runnable_nodes(graph_json)
+    agent_ids = [n.get("id", "agent") for n in agent_nodes]
+    upstream: Dict[str, List[str]] = {agent_id: [] for agent_id in agent_ids}
+
+    edges = (graph_json or {}).get("edges", []) or []
+    if not edges:
+        for prev_id, next_id in zip(agent_ids, agent_ids[1:]):
+            upstream[next_id].append(prev_id)
+        return upstream
+
+    for edge in edges:
+        source, target = _edge_endpoints(edge)
+        if source not in upstream or target not in upstream:
+            continue
+        if source not in upstream[target]:
+            upstream[target].append(source)
+    return upstream
+
+
+def topological_order(upstream: Dict[str, List[str]]) -> List[str]:
+    """
+    Kahn's algorithm over the upstream map.
+
+    Ties are broken by the insertion order of `upstream` (i.e. the node
+    order in graph_json) so the result is deterministic.
+
+    Raises GraphValidationError if the graph contains a cycle.
+    """
+    remaining = {node_id: len(deps) for node_id, deps in upstream.items()}
+    downstream: Dict[str, List[str]] = {node_id: [] for node_id in upstream}
+    for node_id, deps in upstream.items():
+        for dep in deps:
+            downstream[dep].append(node_id)
+
+    ready = [node_id for node_id, count in remaining.items() if count == 0]
+    order: List[str] = []
+    while ready:
+        node_id = ready.pop(0)
+        order.append(node_id)
+        for child in downstream[node_id]:
+            remaining[child] -= 1
+            if remaining[child] == 0:
+                ready.append(child)
+
+    if len(order) != len(upstream):
+        stuck = [node_id for node_id in upstream if node_id not in order]
+        raise GraphValidationError(f"Graph contains a cycle between nodes: {stuck}")
+    return order
+
+
+def edge_conditions(graph_json: Dict[str, Any]) -> Dict[Tuple[str, str], str]:
+    """ {(source, target): condition} for every edge that has a condition """
+    conditions: Dict[Tuple[str, str], str] = {}
+    for edge in (graph_json or {}).get("edges", []) or []:
+        condition = edge.get("condition")
+        if condition:
+            conditions[_edge_endpoints(edge)] = condition
+    return conditions
+
+
+def condition_matches(condition: Optional[str], output: Optional[str]) -> bool:
+    """
+    Whether an edge with `condition` is taken, given its source node's output.
+
+    - empty / None:       always
+    - "regex:<pattern>":  the pattern is found in the output (case-insensitive)
+    - "contains:<text>":  the output contains text (case-insensitive)
+    - "a|b|...":          the output equals one of the labels (case-insensitive),
+                          i.e. the route chosen by a router node
+    """
+    if not condition:
+        return True
+    output = output or ""
+    if condition.startswith("regex:"):
+        return re.search(condition[len("regex:"):], output, re.IGNORECASE) is not None
+    if condition.startswith("contains:"):
+        return condition[len("contains:"):].strip().lower() in output.lower()
+    labels = {label.strip().lower() for label in condition.split("|") if label.strip()}
+    return output.strip().lower() in labels
+
+
+def route_labels(condition: Optional[str]) -> List[str]:
+    """ Route labels named by a plain ("a|b") condition - none for regex: / contains: """
+    if not condition or condition.startswith(("regex:", "contains:")):
+        return []
+    return [label.strip() for label in condition.split("|") if label.strip()]
+
+
+def collect_ancestors(upstream: Dict[str, List[str]], node_id: str) -> Set[str]:
+    """ All transitive upstream node ids of `node_id` """
+    seen: Set[str] = set()
+    stack = list(upstream.get(node_id, []))
+    while stack:
+        current = stack.pop()
+        if current in seen:
+            continue
+        seen.add(current)
+        stack.extend(upstream.get(current, []))
+    return seen
+
+
+def _validate_node_settings(node: Dict[str, Any]) -> None:
+    """ Check the optional per-node runtime settings """
+    context_tokens = node.get("context_tokens")
+    if context_tokens is not None:
+        if isinstance(context_tokens, bool) or not isinstance(context_tokens, int) or context_tokens <= 0:
+            raise GraphValidationError(f"Node '{node['id']}': context_tokens must be a positive integer")
+    provider = node.get("provider")
+    if provider is not None and provider not in PROVIDER_NAMES:
+        raise GraphValidationError(
+            f"Node '{node['id']}': provider must be one of {', '.join(PROVIDER_NAMES)}"
+        )
+    model = node.get("model")
+    if model is not None and (not isinstance(model, str) or not model.strip()):
+        raise GraphValidationError(f"Node '{node['id']}': model must be a non-empty string")
+    max_tokens = node.get("max_tokens")
+    if max_tokens is not None:
+        if isinstance(max_tokens, bool) or not isinstance(max_tokens, int) or max_tokens <= 0:
+            raise GraphValidationError(f"Node '{node['id']}': max_tokens must be a positive integer")
+    temperature = node.get("temperature")
+    if temperature is not None:
+        if isinstance(temperature, bool) or not isinstance(temperature, (int, float)) or not 0 <= temperature <= 2:
+            raise GraphValidationError(f"Node '{node['id']}': temperature must be a number between 0 and 2")
+    timeout_s = node.get("timeout_s")
+    if timeout_s is not None:
+        if isinstance(timeout_s, bool) or not isinstance(timeout_s, (int, float)) or timeout_s <= 0:
+            raise GraphValidationError(f"Node '{node['id']}': timeout_s must be a positive number")
+    if node.get("type") == "router":
+        _validate_router(node)
+
+
+def _validate_pattern(owner: str, pattern: Any) -> None:
+    if not isinstance(pattern, str) or not pattern:
+        raise GraphValidationError(f"{owner}: pattern must be a non-empty string")
+    try:
+        re.compile(pattern)
+    except re.error as e:
+        raise GraphValidationError(f"{owner}: invalid regex {pattern!r} ({e})")
+
+
+def _validate_router(node: Dict[str, Any]) -> None:
+    """ mode, rules, routes and default of a router node """
+    owner = f"Router '{node['id']}'"
+    mode = node.get("mode", "rules")
+    if mode not in ROUTER_MODES:
+        raise GraphValidationError(f"{owner}: mode must be one of {', '.join(ROUTER_MODES)}")
+    rules = node.get("rules", [])
+    if not isinstance(rules, list):
+        raise GraphValidationError(f"{owner}: rules must be a list")
+    for rule in rules:
+        if not isinstance(rule, dict) or not isinstance(rule.get("route"), str) or not rule["route"]:
+            raise GraphValidationError(f"{owner}: every rule needs a 'pattern' and a 'route'")
+        _validate_pattern(owner, rule.get("pattern"))
+    routes = node.get("routes")
+    if routes is not None:
+        if not isinstance(routes, (list, dict)) or not all(isinstance(r, str) and r for r in routes):
+            raise GraphValidationError(f"{owner}: routes must be a list (or label -> description object) of labels")
+    default = node.get("default")
+    if default is not None and (not isinstance(default, str) or not default):
+        raise GraphValidationError(f"{owner}: default must be a non-empty string")
+    if mode == "rules" and not rules and default is None:
+        raise GraphValidationError(f"{owner}: a rules router needs rules or a default route")
+
+
+def node_llm_options(node: Dict[str, Any]) -> Dict[str, Any]:
+    """ The LLM overrides set on a node (provider, model, max_tokens ...), unset ones omitted """
+    return {key: node[key] for key in LLM_OPTION_KEYS if node.get(key) is not None}
+
+
+def validate_graph(graph_json: Dict[str, Any]) -> None:
+    """
+    Validate graph_json before it is saved.
+
+    Checks:
+    - nodes / edges are lists
+    - every node has a unique id
+    - optional node settings (context_tokens, provider, model, max_tokens,
+      temperature, timeout_s) are well formed
+    - router nodes have a valid mode / rules, and an LLM router has
+      routes to choose from (its own "routes" or its edges' conditions)
+    - every edge references existing nodes and is not a self loop;
+      regex conditions compile
+    - the agent graph is acyclic
+
+    Raises GraphValidationError with a human readable message.
+    """
+    if not isinstance(graph_json, dict):
+        raise GraphValidationError("graph_json must be an object")
+
+    nodes = graph_json.get("nodes", [])
+    edges = graph_json.get("edges", [])
+    if not isinstance(nodes, list):
+        raise GraphValidationError("graph_json.nodes must be a list")
+    if not isinstance(edges, list):
+        raise GraphValidationError("graph_json.edges must be a list")
+
+    node_ids: Set[str] = set()
+    for node in nodes:
+        if not isinstance(node, dict) or not node.get("id"):
+            raise GraphValidationError("Every node must be an object with an 'id'")
+        if node["id"] in node_ids:
+            raise GraphValidationError(f"Duplicate node id '{node['id']}'")
+        node_ids.add(node["id"])
+        _validate_node_settings(node)
+
+    for edge in edges:
+        if not isinstance(edge, dict):
+            raise GraphValidationError("Every edge must be an object")
+        source, target = _edge_endpoints(edge)
+        if source not in node_ids or target not in node_ids:
+            raise GraphValidationError(f"Edge {source!r} -> {target!r} references an unknown node")
+        if source == target:
+            raise GraphValidationError(f"Edge {source!r} -> {target!r} is a self loop")
+        condition = edge.get("condition")
+        if condition is not None:
+            if not isinstance(condition, str):
+                raise GraphValidationError(f"Edge {source!r} -> {target!r}: condition must be a string")
+            if condition.startswith("regex:"):
+                _validate_pattern(f"Edge {source!r} -> {target!r}", condition[len("regex:"):])
+
+    for node in nodes:
+        if node.get("type") == "router" and node.get("mode", "rules") == "llm":
+            outgoing = [edge.get("condition") for edge in edges if _edge_endpoints(edge)[0] == node["id"]]
+            if not router_routes(node, outgoing):
+                raise GraphValidationError(
+                    f"Router '{node['id']}': an llm router needs 'routes' or route labels on its outgoing edges"
+                )
+
+    topological_order(build_upstream_map(graph_json))
+
+
+def router_routes(node: Dict[str, Any], outgoing_conditions: List[Optional[str]]) -> List[str]:
+    """
+    Labels a router can choose from: its "routes" (list, or object of
+    label -> description), else the labels of its outgoing edge conditions.
+    """
+    routes = node.get("routes")
+    if routes:
+        return list(routes)
+    labels: List[str] = []
+    for condition in outgoing_conditions:
+        for label in route_labels(condition):
+            if label not in labels:
+                labels.append(label)
+    return labels
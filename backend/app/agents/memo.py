@@ -0,0 +1,142 @@
+"""
+Run-scoped tool result memo shared by every agent of one run.
+
+Planner, researchers and writer of the same run often issue the same
+Tavily query or Gmail search again. arun_assistant_graph() creates one
+RunToolMemo per run and hands it to every agent:
+
+- an identical (tool, arguments, config) call made later in the run gets
+  the earlier result instead of calling the tool again
+- a call identical to one still in flight (parallel branches) waits for
+  that call instead of starting its own
+- index() renders a compact list of what has been fetched so far; it is
+  added to the system prompt of agents that have tools, so they can skip
+  redundant calls altogether
+
+Only calls the tool allows to be reused within a run are memoized
+(ToolDefinition.is_run_reusable - no side effects such as gmail "draft"),
+and error results are not kept. The memo holds the results of calls the
+process-wide tool cache does not serve (tools with run_memo but no
+cache_ttl such as gmail reads, or any reusable tool when TOOL_CACHE_ENABLED
+is off); for calls that cache does serve it only coalesces identical calls
+in flight and lists them in the index, so no result is held twice. Unlike
+the process-wide cache it has no TTL or size limit: it lives exactly as
+long as the run.
+
+Single event loop: the memo is used from the run's asyncio tasks only.
+"""
+
+import asyncio
+import json
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.tools.cache import make_cache_key
+from app.tools.definitions import TOOL_REGISTRY
+
+# Index rendering limits (keep the prompt addition small)
+INDEX_MAX_ENTRIES = 12
+INDEX_PREVIEW_CHARS = 160
+
+
+class MemoEntry:
+    """
+    One fetched result: who asked for it, an index preview and - unless the
+    process-wide tool cache keeps it - the result itself (else None)
+    """
+    __slots__ = ("tool_name", "arguments", "agent_id", "result", "preview", "hits")
+
+    def __init__(self, tool_name: str, arguments: Dict[str, Any], agent_id: str, result: str, keep_result: bool):
+        self.tool_name = tool_name
+        self.arguments = arguments
+        self.agent_id = agent_id
+        self.result = result if keep_result else None
+        preview = " ".join(result.split())
+        if len(preview) > INDEX_PREVIEW_CHARS:
+            preview = preview[:INDEX_PREVIEW_CHARS].rstrip() + "..."
+        self.preview = preview
+        self.hits = 0
+
+
+class RunToolMemo:
+    """
+    Usage:
+        memo = RunToolMemo()
+        result, reused = await memo.call(agent_id, "tavily", args, config, lambda: registry.aexecute(...))
+        memo.index(exclude_agent="writer")   # "" when nothing was fetched
+    """
+    def __init__(self):
+        self._entries: Dict[str, MemoEntry] = {}
+        self._in_flight: Dict[str, "asyncio.Future[str]"] = {}
+        self.hits = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def call(
+        self,
+        agent_id: str,
+        tool_name: str,
+        arguments: Dict[str, Any],
+        config: Optional[Dict[str, Any]],
+        execute: Callable[[], Awaitable[str]],
+    ) -> Tuple[str, bool]:
+        """
+        Result of the call (memoized or fresh) and whether it was reused.
+        `execute` runs the tool for real; it is only awaited on a miss.
+        """
+        tool = TOOL_REGISTRY.get(tool_name)
+        if tool is None or not tool.is_run_reusable(arguments):
+            return await execute(), False
+        # Results the process-wide tool cache keeps are fetched from it again
+        keep_result = TOOL_REGISTRY.cache is None or not tool.is_cacheable(arguments)
+
+        key = make_cache_key(tool_name, arguments, config)
+        entry = self._entries.get(key)
+        if entry is not None and entry.result is not None:
+            entry.hits += 1
+            self.hits += 1
+            return entry.result, True
+
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            # shield: a cancelled waiter must not cancel the agent that owns the call
+            result = await asyncio.shield(pending)
+            self.hits += 1
+            return result, True
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            result = await execute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else was waiting
+            raise
+        else:
+            future.set_result(result)
+            if key not in self._entries and not (result or "").startswith("Error"):
+                self._entries[key] = MemoEntry(tool_name, arguments, agent_id, result or "", keep_result)
+        finally:
+            self._in_flight.pop(key, None)
+        return result, False
+
+    def index(self, exclude_agent: Optional[str] = None) -> str:
+        """
+        Compact listing of the results fetched so far in this run (latest
+        INDEX_MAX_ENTRIES, previews only). Entries fetched by `exclude_agent`
+        are left out. Empty string when there is nothing to list.
+        """
+        entries: List[MemoEntry] = [e for e in self._entries.values() if e.agent_id != exclude_agent]
+        if not entries:
+            return ""
+        lines = [
+            "Tool results already fetched earlier in this run (calling the same tool with the "
+            "same arguments returns the same result - don't repeat these calls):"
+        ]
+        for entry in entries[-INDEX_MAX_ENTRIES:]:
+            arguments = json.dumps(entry.arguments, sort_keys=True, default=str)
+            lines.append(f"- {entry.tool_name} {arguments} (by {entry.agent_id}): {entry.preview}")
+        return "\n".join(lines)
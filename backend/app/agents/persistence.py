@@ -0,0 +1,215 @@
+"""
+How arun_assistant_graph() persists a run's messages and timeline steps.
+
+RUN_PERSISTENCE_MODE:
+- "immediate" (default): every message is committed (and refreshed) as
+  soon as it exists - the user message before the first agent starts, each
+  agent's output before its downstream agents start. Live events carry the
+  message ids and GET /runs/{id} shows a running run's messages.
+- "write_behind" (opt-in): messages and steps are buffered in memory and
+  written in one transaction at the end of the run, together with the run
+  status. The agent loop never waits on the database between agents.
+  With RUN_PERSISTENCE_CHECKPOINT_EVERY > 0, every N buffered rows are
+  also flushed as an intermediate checkpoint in the background (at most one
+  in flight, the run does not wait for it). Live "agent_completed" events
+  carry message_id None; ids are set once the run has been persisted.
+
+The immediate writer uses the caller's (sync) Session; every DB call goes
+through asyncio.to_thread and at most one runs at a time. Write-behind
+batches run next to the agent loop (checkpoints), so they never touch the
+caller's Session: each batch is written through a short-lived Session of
+its own in a worker thread - or, with the async engine enabled
+(DATABASE_ASYNC_ENABLED), through a short-lived AsyncSession, no worker
+thread. Batches commit with expire_on_commit off, so the run's messages
+stay loaded instead of being re-SELECTed one by one afterwards.
+"""
+
+import asyncio
+from datetime import datetime
+from typing import List, Optional, Sequence
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core.config import settings
+from app.core.tracing import span
+from app.db.models import Message, Run, RunStep
+from app.db.session import AsyncSessionLocal, SessionLocal
+
+PERSISTENCE_MODES = ("immediate", "write_behind")
+
+
+def _save_message(db: Session, message: Message) -> Message:
+    """ Persist one message (blocking - called through asyncio.to_thread) """
+    with span("db.save_message", **{"message.sender": message.sender}):
+        db.add(message)
+        db.commit()
+        db.refresh(message)
+    return message
+
+
+def _save_agent_output(db: Session, message: Message, steps: List[RunStep]) -> Message:
+    """ Persist an agent's message and its timeline steps in one commit (blocking) """
+    with span("db.save_message", **{"message.sender": message.sender, "run.steps": len(steps)}):
+        for step in steps:
+            step.run_id = message.run_id
+        db.add(message)
+        db.add_all(steps)
+        db.commit()
+        db.refresh(message)
+    return message
+
+
+def _save_steps(db: Session, run_id: int, steps: List[RunStep]) -> None:
+    """ Persist timeline steps of a node that produces no message (routers) """
+    if not steps:
+        return
+    for step in steps:
+        step.run_id = run_id
+    db.add_all(steps)
+    db.commit()
+
+
+def _complete_run(db: Session, run: Run) -> None:
+    """ Mark the run completed (blocking - called through asyncio.to_thread) """
+    run.status = "completed"
+    run.completed_at = datetime.utcnow()
+    db.commit()
+    db.refresh(run)
+
+
+def _complete_run_statement(run_id: int, completed_at: datetime):
+    return update(Run).where(Run.id == run_id).values(status="completed", completed_at=completed_at)
+
+
+def _commit_batch(rows: List[object], run_id: Optional[int] = None, completed_at: Optional[datetime] = None) -> None:
+    """
+    Insert buffered rows (and mark run `run_id` completed when given) in one
+    transaction on a Session of its own (blocking - called through asyncio.to_thread)
+    """
+    with span("db.save_batch", **{"batch.rows": len(rows), "batch.final": run_id is not None}):
+        with SessionLocal(expire_on_commit=False) as session:
+            session.add_all(rows)
+            if run_id is not None:
+                session.execute(_complete_run_statement(run_id, completed_at))
+            session.commit()
+
+
+async def _acommit_batch(
+    session_factory, rows: List[object], run_id: Optional[int] = None, completed_at: Optional[datetime] = None,
+) -> None:
+    """ _commit_batch() through an AsyncSession """
+    with span("db.save_batch", **{"batch.rows": len(rows), "batch.final": run_id is not None, "batch.async": True}):
+        async with session_factory() as session:
+            session.add_all(rows)
+            if run_id is not None:
+                await session.execute(_complete_run_statement(run_id, completed_at))
+            await session.commit()
+
+
+class ImmediateRunWriter:
+    """ Commit every message / step as it is produced (the pre write-behind behaviour) """
+    def __init__(self, db: Session, run: Run):
+        self.db = db
+        self.run = run
+
+    async def add_message(self, message: Message, steps: Sequence[RunStep] = ()) -> None:
+        if steps:
+            await asyncio.to_thread(_save_agent_output, self.db, message, list(steps))
+        else:
+            await asyncio.to_thread(_save_message, self.db, message)
+
+    async def add_steps(self, steps: Sequence[RunStep]) -> None:
+        await asyncio.to_thread(_save_steps, self.db, self.run.id, list(steps))
+
+    async def complete(self) -> None:
+        await asyncio.to_thread(_complete_run, self.db, self.run)
+
+    async def abort(self) -> None:
+        pass
+
+
+class WriteBehindRunWriter:
+    """
+    Buffer messages / steps and write them in batches.
+
+    Usage:
+        writer = WriteBehindRunWriter(run, checkpoint_every=0)   # session_factory=AsyncSessionLocal to write async
+        await writer.add_message(message, steps)   # returns immediately
+        ...
+        await writer.complete()                    # one transaction: rows + run status
+        # or, if the run failed:
+        await writer.abort()                       # persist what was produced so far
+    """
+    def __init__(self, run: Run, checkpoint_every: int = 0, session_factory=None):
+        self.run = run
+        self.checkpoint_every = max(0, checkpoint_every)
+        self.session_factory = session_factory
+        self._buffer: List[object] = []
+        self._checkpoint: Optional[asyncio.Task] = None
+        self.checkpoints = 0
+
+    async def add_message(self, message: Message, steps: Sequence[RunStep] = ()) -> None:
+        self._buffer.append(message)
+        await self.add_steps(steps)
+
+    async def add_steps(self, steps: Sequence[RunStep]) -> None:
+        for step in steps:
+            step.run_id = self.run.id
+        self._buffer.extend(steps)
+        self._maybe_checkpoint()
+
+    def _maybe_checkpoint(self) -> None:
+        if not self.checkpoint_every or len(self._buffer) < self.checkpoint_every:
+            return
+        if self._checkpoint is not None and not self._checkpoint.done():
+            return  # one in flight at a time - the next add or complete() picks the rest up
+        rows, self._buffer = self._buffer, []
+        self._checkpoint = asyncio.create_task(self._write(rows))
+        self.checkpoints += 1
+
+    async def _write(self, rows: List[object], run: Optional[Run] = None) -> None:
+        run_id = run.id if run is not None else None
+        completed_at = datetime.utcnow() if run is not None else None
+        if self.session_factory is not None:
+            await _acommit_batch(self.session_factory, rows, run_id, completed_at)
+        else:
+            await asyncio.to_thread(_commit_batch, rows, run_id, completed_at)
+        if run is not None:
+            # The caller's Run object belongs to its own session: set the new values as already committed
+            set_committed_value(run, "status", "completed")
+            set_committed_value(run, "completed_at", completed_at)
+
+    async def _wait_checkpoint(self) -> None:
+        if self._checkpoint is not None:
+            task, self._checkpoint = self._checkpoint, None
+            await task
+
+    async def complete(self) -> None:
+        """ Write everything still buffered and mark the run completed, in one transaction """
+        await self._wait_checkpoint()
+        rows, self._buffer = self._buffer, []
+        await self._write(rows, self.run)
+
+    async def abort(self) -> None:
+        """ Best effort: persist what the run produced before it failed (the run is marked failed by the caller) """
+        try:
+            await self._wait_checkpoint()
+            rows, self._buffer = self._buffer, []
+            if rows:
+                await self._write(rows)
+        except Exception as e:
+            print(f"[WARNING] Could not persist the messages of failed run {self.run.id}: {e}")
+
+
+def make_run_writer(db: Session, run: Run, mode: Optional[str] = None):
+    """ Writer for RUN_PERSISTENCE_MODE (or `mode`) """
+    mode = mode or settings.RUN_PERSISTENCE_MODE
+    if mode not in PERSISTENCE_MODES:
+        raise ValueError(f"Unknown RUN_PERSISTENCE_MODE '{mode}' (expected one of {', '.join(PERSISTENCE_MODES)})")
+    if mode == "immediate":
+        return ImmediateRunWriter(db, run)
+    return WriteBehindRunWriter(
+        run, settings.RUN_PERSISTENCE_CHECKPOINT_EVERY, session_factory=AsyncSessionLocal,
+    )
@@ -0,0 +1,74 @@
+"""
+Router nodes: pick a route for the run so downstream agents can be pruned.
+
+A router looks at the run's input (the user's message) and returns one
+route label; the runtime then only follows outgoing edges whose
+"condition" names that label (see app.agents.graph.condition_matches).
+
+Modes:
+- "rules" (default): the first rule whose regex matches the input wins,
+  otherwise "default". No LLM call at all.
+- "llm": one tiny classification call (temperature 0, ROUTER_MAX_TOKENS
+  completion tokens unless the node sets max_tokens; model / provider
+  overrides are honoured). Unrecognised answers or errors fall back to
+  "default" (or the first route).
+
+    {"id": "route", "type": "router", "mode": "llm",
+     "routes": {"chat": "greetings, thanks, small talk",
+                "research": "questions that need facts or tools"},
+     "default": "research"}
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.llm.client import LLMResponse, acall_llm_with_tools
+
+# Completion cap of an LLM router call - a route label is a couple of tokens
+ROUTER_MAX_TOKENS = 8
+
+DEFAULT_ROUTER_PROMPT = "Classify the user's message so it can be sent to the right workflow."
+
+
+def route_by_rules(node: Dict[str, Any], text: str) -> Optional[str]:
+    """ Route of the first matching rule, else the node's default (None if it has none) """
+    for rule in node.get("rules", []) or []:
+        if re.search(rule["pattern"], text or "", re.IGNORECASE):
+            return rule["route"]
+    return node.get("default")
+
+
+def _router_messages(node: Dict[str, Any], routes: List[str], text: str) -> List[Dict[str, Any]]:
+    descriptions = node.get("routes") if isinstance(node.get("routes"), dict) else {}
+    options = "\n".join(
+        f"- {route}: {descriptions[route]}" if descriptions.get(route) else f"- {route}"
+        for route in routes
+    )
+    system = (
+        f"{node.get('system_prompt') or DEFAULT_ROUTER_PROMPT}\n\n"
+        f"Routes:\n{options}\n\n"
+        "Reply with exactly one route label from the list and nothing else."
+    )
+    return [{"role": "system", "content": system}, {"role": "user", "content": text or ""}]
+
+
+def parse_route(answer: Optional[str], routes: List[str]) -> Optional[str]:
+    """ The route named in an LLM answer: exact label first, else the earliest label mentioned """
+    answer = (answer or "").strip().strip(".\"'`").lower()
+    for route in routes:
+        if answer == route.lower():
+            return route
+    found = [(answer.find(route.lower()), route) for route in routes if route.lower() in answer]
+    return min(found)[1] if found else None
+
+
+async def route_with_llm(
+    node: Dict[str, Any],
+    routes: List[str],
+    text: str,
+    llm_options: Dict[str, Any],
+) -> Tuple[Optional[str], LLMResponse]:
+    """ One classification call; returns (route or None if unrecognised, response) """
+    options = {"max_tokens": ROUTER_MAX_TOKENS, "temperature": 0.0, **llm_options}
+    response = await acall_llm_with_tools(messages=_router_messages(node, routes, text), tools=None, **options)
+    return parse_route(response.content, routes), response
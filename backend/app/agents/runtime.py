@@ -6,13 +6,24 @@ the LLM decides when to call tools, we execute them and feed result back
     
 """
 
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Callable, Awaitable
 from sqlalchemy.orm import Session
 from datetime import datetime
+import asyncio
 import json, time
 
-from app.db.models import Assistant, Run, Message
-from app.llm.client import LLMResponse, call_llm_with_tools, build_tool_result_message, build_assistant_tool_call_message
+from app.core.config import settings
+from app.core.tracing import span, current_span
+from app.db.models import Assistant, Run, Message, RunStep
+from app.agents.graph import (
+    get_runnable_nodes, build_upstream_map, topological_order, collect_ancestors, node_llm_options,
+    edge_conditions, condition_matches, router_routes,
+)
+from app.agents.router import route_by_rules, route_with_llm
+from app.agents.context import ContextItem, assemble_context, count_tokens
+from app.agents.memo import RunToolMemo
+from app.agents.persistence import make_run_writer
+from app.llm.client import LLMResponse, acall_llm_with_tools, build_tool_result_message, build_assistant_tool_call_message, resolve_model
 from app.tools.definitions import TOOL_REGISTRY
 # Import registry to trigger tool registrations
 import app.tools.registry  # noqa: F401
@@ -22,11 +33,34 @@ MAX_TOOL_ITERATIONS = 10
 
 AGENT_DELAY_SECONDS = 0  # Removed delay for faster execution
 
+# Receives live run events (used by the streaming /runs endpoint):
+#   {"type": "agent_started",   "agent_id", "role"}
+#   {"type": "token",           "agent_id", "delta"}
+#   {"type": "tool_call",       "agent_id", "tool_call_id", "name", "arguments"}
+#   {"type": "tool_result",     "agent_id", "tool_call_id", "name", "result"}
+#   {"type": "agent_completed", "agent_id", "message_id", "content", "tools_used"}
+#   {"type": "route_selected",  "agent_id", "route"}      (router nodes)
+#   {"type": "agent_skipped",   "agent_id"}               (pruned by edge conditions)
+RunEventCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+
+# Upper bound on agents of one run executing at the same time (independent DAG branches)
+MAX_PARALLEL_AGENTS = settings.GRAPH_MAX_PARALLEL_AGENTS
+
+# Tool calls returned in one LLM turn run concurrently, bounded + individually timed out
+MAX_PARALLEL_TOOL_CALLS = settings.TOOL_MAX_PARALLEL_CALLS
+TOOL_CALL_TIMEOUT_SECONDS = settings.TOOL_CALL_TIMEOUT_SECONDS
+
+# Default prompt budget per agent node (graph nodes can override with "context_tokens")
+CONTEXT_TOKEN_BUDGET = settings.CONTEXT_TOKEN_BUDGET
+# Room for the context markers + chat message framing
+CONTEXT_OVERHEAD_TOKENS = 32
+
 def _build_chat_messages(
     system_prompt: str,
     history: List[Message],
     agent_outputs_as_context: bool = True,
     has_tools: bool = False,  # Add this parameter
+    token_budget: Optional[int] = None,
 )-> List[Dict[str, Any]]:
     """
     Build chat messages for the LLM.
@@ -36,18 +70,24 @@ def _build_chat_messages(
         history: List of message objects from pervious chat
         agent_output_as_context: Whether to include agent output as context
         has_tools: Whether this agent has access to tools
+        token_budget: Max tokens for the whole prompt (system + context + query).
+            Agent outputs are selected / condensed to fit, see
+            app.agents.context.assemble_context. None = include everything.
     """
     messages = []
     
     # Separate user query and agent outputs
     user_query = ""
-    agent_outputs = []
+    agent_outputs: List[ContextItem] = []
     
-    for m in history:
+    for index, m in enumerate(history):
         if m.sender == "user":
             user_query = m.content
+            # Everything before the latest user message belongs to earlier runs
+            for item in agent_outputs:
+                item.current_run = False
         else:
-            agent_outputs.append(f"[{m.sender}]: \n{m.content}")
+            agent_outputs.append(ContextItem(m.sender, m.content, index, current_run=True))
             
     # Build system prompt with context from other agents
     full_system = system_prompt
@@ -62,12 +102,17 @@ def _build_chat_messages(
         full_system = f"{full_system}{tool_instruction}"
     
     if agent_outputs_as_context and agent_outputs:
-        context = "\n\n".join ([
-            " * Previous Agent output * ",
-            *agent_outputs,
-            " * End of Previous Agent output * ",
-        ])
-        full_system = f"{full_system}\n\n{context}"
+        context_budget = None
+        if token_budget is not None:
+            context_budget = token_budget - count_tokens(full_system) - count_tokens(user_query) - CONTEXT_OVERHEAD_TOKENS
+        context_blocks = assemble_context(agent_outputs, user_query, context_budget)
+        if context_blocks:
+            context = "\n\n".join ([
+                " * Previous Agent output * ",
+                *context_blocks,
+                " * End of Previous Agent output * ",
+            ])
+            full_system = f"{full_system}\n\n{context}"
         
     # Add system message
         
@@ -82,16 +127,160 @@ def _build_chat_messages(
     return messages
 
 
-def run_agent_with_tools(
+def _record_step(
+    steps: Optional[List[RunStep]],
+    agent_id: str,
+    step_type: str,
+    name: str,
+    started_at: datetime,
+    started: float,
+    **fields: Any,
+) -> None:
+    """
+    Append a RunStep for an LLM / tool call that began at `started_at`
+    (`started` is its time.perf_counter() value). run_id is filled in when
+    the agent's output is saved, so the tool loop itself never touches the DB.
+    """
+    if steps is None:
+        return
+    steps.append(RunStep(
+        agent_id=agent_id,
+        step_type=step_type,
+        name=name,
+        started_at=started_at,
+        ended_at=datetime.utcnow(),
+        duration_ms=round((time.perf_counter() - started) * 1000, 3),
+        **fields,
+    ))
+
+
+def _tools_used_from_history(tool_call_history: List[List[str]]) -> List[str]:
+    """ Unique tool names (in first-use order) from the "name:args" call signatures """
+    tools_used = []
+    for call_list in tool_call_history:
+        for call_sig in call_list:
+            tool_name = call_sig.split(":")[0]
+            if tool_name not in tools_used:
+                tools_used.append(tool_name)
+    return tools_used
+
+
+async def _execute_tool_call(
+    tc: Dict[str, Any],
+    tool_configs: Dict[str, Dict[str, Any]],
+    agent_id: str,
+    limiter: asyncio.Semaphore,
+    on_event: Optional[RunEventCallback] = None,
+    steps: Optional[List[RunStep]] = None,
+    tool_memo: Optional[RunToolMemo] = None,
+) -> str:
+    """
+    Execute one tool call under the turn's concurrency limit and timeout.
+    With a run memo, a call identical to an earlier one of the run reuses its result.
+    """
+    tool_name = tc["name"]
+    tool_args = tc["arguments"]
+    
+    if on_event is not None:
+        await on_event({
+            "type": "tool_call",
+            "agent_id": agent_id,
+            "tool_call_id": tc["id"],
+            "name": tool_name,
+            "arguments": tool_args,
+        })
+    
+    # Get config for this tool (api keys, set)
+    config = tool_configs.get(tool_name, {})
+    
+    async def _run_tool() -> str:
+        return await asyncio.wait_for(
+            TOOL_REGISTRY.aexecute(tool_name, tool_args, config=config),
+            timeout=TOOL_CALL_TIMEOUT_SECONDS,
+        )
+    
+    async with limiter:
+        started_at, started = datetime.utcnow(), time.perf_counter()
+        timed_out = reused = False
+        with span("tool.call", **{"tool.name": tool_name, "agent.id": agent_id}) as tool_span:
+            try:
+                if tool_memo is not None:
+                    result, reused = await tool_memo.call(agent_id, tool_name, tool_args, config, _run_tool)
+                else:
+                    result = await _run_tool()
+            except asyncio.TimeoutError:
+                print(f"[WARNING] Tool {tool_name} timed out after {TOOL_CALL_TIMEOUT_SECONDS}s")
+                result = f"Error executing {tool_name}: timed out after {TOOL_CALL_TIMEOUT_SECONDS} seconds"
+                timed_out = True
+            is_error = (result or "").startswith("Error")
+            tool_span.set_attributes(**{
+                "tool.result_chars": len(result or ""),
+                "tool.error": is_error,
+                "tool.timed_out": timed_out,
+                "tool.memo_hit": reused,
+            })
+        _record_step(
+            steps, agent_id, "tool", tool_name, started_at, started,
+            result_chars=len(result or ""),
+            error=result if is_error else None,
+            step_metadata={"tool_call_id": tc["id"], "timed_out": timed_out, "memo_hit": reused},
+        )
+    
+    if on_event is not None:
+        await on_event({
+            "type": "tool_result",
+            "agent_id": agent_id,
+            "tool_call_id": tc["id"],
+            "name": tool_name,
+            "result": result,
+        })
+    return result
+
+
+async def _execute_tool_calls(
+    tool_calls: List[Dict[str, Any]],
+    tool_configs: Dict[str, Dict[str, Any]],
+    agent_id: str,
+    on_event: Optional[RunEventCallback] = None,
+    steps: Optional[List[RunStep]] = None,
+    tool_memo: Optional[RunToolMemo] = None,
+) -> List[str]:
+    """
+    Dispatch every tool call of one LLM turn concurrently.
+    
+    At most MAX_PARALLEL_TOOL_CALLS run at the same time and each call is
+    capped at TOOL_CALL_TIMEOUT_SECONDS (a timeout becomes an error string
+    for the LLM instead of failing the agent).
+    
+    Returns:
+        Results in the same order as `tool_calls`, so tool messages can be
+        appended in tool_call_id order.
+    """
+    limiter = asyncio.Semaphore(max(1, MAX_PARALLEL_TOOL_CALLS))
+    return await asyncio.gather(*[
+        _execute_tool_call(tc, tool_configs, agent_id, limiter, on_event, steps, tool_memo)
+        for tc in tool_calls
+    ])
+
+
+async def arun_agent_with_tools(
     system_prompt: str,
     history: List[Message],
     tool_names: List[str],
     tool_configs: Dict[str, Dict[str, Any]],
     agent_id: str="agent",   
+    on_event: Optional[RunEventCallback] = None,
+    context_tokens: Optional[int] = None,
+    steps: Optional[List[RunStep]] = None,
+    llm_options: Optional[Dict[str, Any]] = None,
+    tool_memo: Optional[RunToolMemo] = None,
 )-> Tuple[str, List[str]]:  # Return (output, tools_used)
     """
     Run a single agent with LLM-Driven tool calling loop
     
+    Async: every LLM call and tool call is awaited, so while this agent
+    waits on Groq / Tavily / Gmail the event loop serves other agents and runs.
+    
     this is th core of the architecture:
     1. send tools schema to LLM
     2. LLM decides to call tools or not
@@ -104,16 +293,24 @@ def run_agent_with_tools(
         tool_names: List of tool names to use
         tool_config: Configuration for each tool
         agent_id: Unique identifier for the agent
+        on_event: Optional callback for live events; when set, LLM calls are
+            streamed and every content delta is emitted as a "token" event
+        context_tokens: Token budget for the initial prompt (None = unlimited)
+        steps: Optional list collecting a RunStep per LLM / tool call
+            (timings, tokens, result size, error) for the run timeline
+        llm_options: Per-agent acall_llm_with_tools() overrides: provider,
+            model, max_tokens, temperature, timeout_s (see node_llm_options)
+        tool_memo: Run-scoped memo shared with the other agents of the run:
+            repeated calls reuse earlier results and an index of what was
+            already fetched is added to the system prompt
         
     Returns:
-        Final text response from the agent
+        (final text response from the agent, names of the tools it used)
     
     """
     
     # get tool schemas for only the tools this agent is allowed to call
     tool_schemas = TOOL_REGISTRY.get_openai_schemas_list(tool_names)
-    print(f"[DEBUG] Agent {agent_id} has access to {len(tool_schemas)} tools: {tool_names}")
-    print(f"[DEBUG] Available tools in registry: {list(TOOL_REGISTRY._tools.keys())}")
     if len(tool_schemas) == 0 and len(tool_names) > 0:
         print(f"[WARNING] Tool names requested but no schemas found! Check if tools are registered.")
     
@@ -122,62 +319,87 @@ def run_agent_with_tools(
         system_prompt, 
         history,
         agent_outputs_as_context=True,
-        has_tools=len(tool_schemas) > 0  # Automatically detect if tools are available
+        has_tools=len(tool_schemas) > 0,  # Automatically detect if tools are available
+        token_budget=context_tokens,
     )
     
+    if tool_memo is not None and tool_schemas and messages and messages[0]["role"] == "system":
+        fetched = tool_memo.index(exclude_agent=agent_id)
+        if fetched:
+            messages[0]["content"] = f"{messages[0]['content']}\n\n{fetched}"
+    
+    llm_calls = 0
+    llm_options = llm_options or {}
+    provider = llm_options.get("provider")
+    model_name = resolve_model(provider, llm_options.get("model"))
+    
+    async def _call_llm(tools: Optional[List[Dict[str, Any]]]) -> LLMResponse:
+        """ One LLM call (recorded as a step), streamed as token events when someone is listening """
+        nonlocal llm_calls
+        llm_calls += 1
+        step_metadata = {"call": llm_calls, "tools_offered": len(tools or []), "provider": provider or settings.LLM_PROVIDER}
+        started_at, started = datetime.utcnow(), time.perf_counter()
+        try:
+            if on_event is None:
+                response = await acall_llm_with_tools(messages=messages, tools=tools, **llm_options)
+            else:
+                async def _on_token(delta: str) -> None:
+                    await on_event({"type": "token", "agent_id": agent_id, "delta": delta})
+                
+                response = await acall_llm_with_tools(
+                    messages=messages, tools=tools, stream=True, on_token=_on_token, **llm_options,
+                )
+        except Exception as e:
+            _record_step(steps, agent_id, "llm", model_name, started_at, started,
+                         error=str(e), step_metadata=step_metadata)
+            raise
+        
+        prompt_tokens, completion_tokens = response.prompt_tokens, response.completion_tokens
+        if prompt_tokens is None and not response.cached and steps is not None:
+            # Provider didn't report usage (e.g. some streams) - estimate it
+            prompt_tokens = sum(count_tokens(m.get("content") or "") for m in messages)
+            completion_tokens = count_tokens(response.content)
+            step_metadata["tokens_estimated"] = True
+        step_metadata["cache_hit"] = response.cached
+        step_metadata["tool_calls"] = len(response.tool_calls)
+        _record_step(
+            steps, agent_id, "llm", model_name, started_at, started,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            result_chars=len(response.content or ""),
+            step_metadata=step_metadata,
+        )
+        return response
+    
     # tool calling loop
     tool_call_history = []  # Track tool calls to detect loops
     
+    agent_span = current_span()
+    
     for iteration in range(MAX_TOOL_ITERATIONS):
-        print(f"[DEBUG] Agent {agent_id} - Tool loop iteration {iteration + 1}")
+        agent_span.set_attribute("agent.iterations", iteration + 1)
         
         # If we're close to max iterations, force a final response
         if iteration >= MAX_TOOL_ITERATIONS - 2:
-            print(f"[DEBUG] Approaching max iterations, requesting final response from LLM")
             messages.append({
                 "role": "user",
                 "content": "You have gathered sufficient information. Please provide your final response now based on all the tool results above. Do not call any more tools."
             })
             # Remove tools from this call to force text response
-            response: LLMResponse = call_llm_with_tools(
-                messages=messages,
-                tools=None,  # Force text-only response
-            )
+            response: LLMResponse = await _call_llm(None)  # Force text-only response
             if response.has_content:
-                content_length = len(response.content) if response.content else 0
-                print(f"[DEBUG] Agent {agent_id} returned final response ({content_length} chars)")
-                # Extract unique tool names from history
-                tools_used = []
-                for call_list in tool_call_history:
-                    for call_sig in call_list:
-                        tool_name = call_sig.split(":")[0]
-                        if tool_name not in tools_used:
-                            tools_used.append(tool_name)
+                tools_used = _tools_used_from_history(tool_call_history)
                 return response.content, tools_used
         
         # call LLM with tools
-        response: LLMResponse = call_llm_with_tools(
-            messages = messages,
-            tools = tool_schemas if tool_schemas else None,
-        )
+        response: LLMResponse = await _call_llm(tool_schemas if tool_schemas else None)
         # if LLM returned content (no tool calls), we're done
         if response.has_content and not response.has_tool_calls:
-            content_length = len(response.content) if response.content else 0
-            print(f"[DEBUG] Agent {agent_id} returned final response ({content_length} chars)")
-            # Extract unique tool names from history
-            tools_used = []
-            for call_list in tool_call_history:
-                for call_sig in call_list:
-                    tool_name = call_sig.split(":")[0]  # Extract tool name from signature
-                    if tool_name not in tools_used:
-                        tools_used.append(tool_name)
+            tools_used = _tools_used_from_history(tool_call_history)
             return response.content, tools_used
         
         # if LLM wants to call tools
         if response.has_tool_calls:
-            tool_call_count = len(response.tool_calls or [])
-            print(f"[DEBUG] Agent {agent_id} requested {tool_call_count} tool call(s)")
-            
             # Detect duplicate tool calls (infinite loop detection)
             current_calls = []
             for tc in response.tool_calls:
@@ -192,18 +414,9 @@ def run_agent_with_tools(
                     "content": "You have already searched for this information. Based on the tool results you have received, please provide your final response now. Do not call any more tools."
                 })
                 # Force text-only response
-                final_response: LLMResponse = call_llm_with_tools(
-                    messages=messages,
-                    tools=None,
-                )
+                final_response: LLMResponse = await _call_llm(None)
                 if final_response.has_content:
-                    # Extract unique tool names from history
-                    tools_used = []
-                    for call_list in tool_call_history:
-                        for call_sig in call_list:
-                            tool_name = call_sig.split(":")[0]
-                            if tool_name not in tools_used:
-                                tools_used.append(tool_name)
+                    tools_used = _tools_used_from_history(tool_call_history)
                     return final_response.content, tools_used
                 # If still no content, break
                 break
@@ -213,24 +426,14 @@ def run_agent_with_tools(
             # add assistant message with tool calls to conversation 
             messages.append(build_assistant_tool_call_message(response.tool_calls))
             
-            # Execute each tool and add results
-            for tc in response.tool_calls:
-                tool_name = tc["name"]
-                tool_args = tc["arguments"]
-                tool_id = tc["id"]
-                
-                # Get config for this tool (api keys, set)
-                config = tool_configs.get(tool_name, {})
-                
-                print(f"[DEBUG] Executing tool:{tool_name}({json.dumps(tool_args)[:100]}...)")
-                
-                # Execute the tool
-                result = TOOL_REGISTRY.execute(tool_name, tool_args, config=config)
-                
-                print(f"[DEBUG] Tool {tool_name} result: {result[:200] if result else 'EMPTY'}...")
-                
-                # Addd tool results to conversation
-                messages.append(build_tool_result_message(tool_id, result))
+            # Execute all tool calls of this turn concurrently, results come back in call order
+            results = await _execute_tool_calls(
+                response.tool_calls, tool_configs, agent_id, on_event, steps, tool_memo,
+            )
+            
+            # Addd tool results to conversation (same order as tool_call ids)
+            for tc, result in zip(response.tool_calls, results):
+                messages.append(build_tool_result_message(tc["id"], result))
             
             # After adding tool results, inject a reminder to provide final response
             # This helps the LLM understand it should synthesize the results
@@ -257,34 +460,232 @@ def run_agent_with_tools(
     })
     
     # Final attempt without tools
-    final_response: LLMResponse = call_llm_with_tools(
-        messages=messages,
-        tools=None,  # No tools, force text response
-    )
+    final_response: LLMResponse = await _call_llm(None)  # No tools, force text response
     
     if final_response.has_content and final_response.content:
-        content_length = len(final_response.content) if final_response.content else 0
-        print(f"[DEBUG] Agent {agent_id} returned final response after max iterations ({content_length} chars)")
-        return final_response.content
+        return final_response.content, _tools_used_from_history(tool_call_history)
     
     # Last resort: return error with context
-    return f"[Agent] {agent_id} reached maximum tool iterations ({MAX_TOOL_ITERATIONS}) without completing. Made {len(tool_call_history)} tool call attempts."
+    return (
+        f"[Agent] {agent_id} reached maximum tool iterations ({MAX_TOOL_ITERATIONS}) without completing. Made {len(tool_call_history)} tool call attempts.",
+        _tools_used_from_history(tool_call_history),
+    )
+
+
+def _resolve_agent_tools(
+    agent_id: str,
+    tools_by_agent: Dict[str, List[Dict[str, Any]]],
+) -> Tuple[List[str], Dict[str, Dict[str, Any]]]:
+    """
+    Turn the resolved tool list of one agent into (tool_names, tool_configs)
+    for arun_agent_with_tools. Tools that aren't connected are skipped.
+    """
+    agent_tool_configs = tools_by_agent.get(agent_id, [])
+
+    tool_names = []
+    tool_configs = {}
+
+    for tool_info in agent_tool_configs:
+        if tool_info.get("kind") == "user_tool":
+            template_key = tool_info.get("template_key")
+            tool_status = tool_info.get("status", "pending")
+
+            # Skip tools that aren't connected
+            if tool_status != "connected":
+                print(f"[WARNING] Skipping tool '{template_key}' - status is '{tool_status}', not 'connected'")
+                continue
+
+            if template_key:
+                tool_names.append(template_key)
+                # Config is retrieved from database via tool_resolver
+                raw_config = tool_info.get("config", {})
+                # Check if config has nested structure matching template_key
+                if isinstance(raw_config, dict):
+                    if template_key in raw_config:
+                        # Nested: {"tavily": {"api_key": "..."}}
+                        tool_configs[template_key] = raw_config[template_key]
+                    else:
+                        # Flat config - use as is
+                        tool_configs[template_key] = raw_config
+                else:
+                    # Not a dict - use empty config
+                    tool_configs[template_key] = {}
+
+    return tool_names, tool_configs
 
 
-def run_assistant_graph(
+async def _execute_agent_node(
+    node: Dict[str, Any],
+    history: List[Message],
+    tools_by_agent: Dict[str, List[Dict[str, Any]]],
+    on_event: Optional[RunEventCallback] = None,
+    steps: Optional[List[RunStep]] = None,
+    tool_memo: Optional[RunToolMemo] = None,
+) -> Tuple[str, List[str]]:
+    """
+    Run one agent node (tool loop + one retry on empty output).
+
+    Does not touch the database so it can safely run concurrently
+    with other independent nodes of the same run; its LLM / tool calls
+    are collected in `steps` and saved with the agent's message.
+
+    Returns:
+        (llm_output, tools_used)
+    """
+    agent_id = node.get("id", "agent")
+    system_prompt = node.get("system_prompt", "")
+    role_name = node.get("role", agent_id)
+    context_tokens = node.get("context_tokens") or CONTEXT_TOKEN_BUDGET
+    llm_options = node_llm_options(node)
+
+    tool_names, tool_configs = _resolve_agent_tools(agent_id, tools_by_agent)
+
+    with span("agent", **{"agent.id": agent_id, "agent.role": role_name, "agent.tools": len(tool_names),
+                          "agent.provider": llm_options.get("provider") or settings.LLM_PROVIDER}) as agent_span:
+        llm_output, tools_used = await _run_agent_node_attempts(
+            agent_id, system_prompt, role_name, history, tool_names, tool_configs, on_event, context_tokens, steps,
+            llm_options, tool_memo,
+        )
+        agent_span.set_attributes(**{"agent.output_chars": len(llm_output), "agent.tools_used": tools_used})
+    return llm_output, tools_used
+
+
+async def _run_agent_node_attempts(
+    agent_id: str,
+    system_prompt: str,
+    role_name: str,
+    history: List[Message],
+    tool_names: List[str],
+    tool_configs: Dict[str, Dict[str, Any]],
+    on_event: Optional[RunEventCallback],
+    context_tokens: int,
+    steps: Optional[List[RunStep]],
+    llm_options: Dict[str, Any],
+    tool_memo: Optional[RunToolMemo],
+) -> Tuple[str, List[str]]:
+    """ Tool loop + one retry on empty output; errors become the agent's output """
+    # Run agent with tool loop
+    tools_used = []
+    try:
+        llm_output, tools_used = await arun_agent_with_tools(
+            system_prompt=system_prompt,
+            history=history,
+            tool_names=tool_names,
+            tool_configs=tool_configs,
+            agent_id=agent_id,
+            on_event=on_event,
+            context_tokens=context_tokens,
+            steps=steps,
+            llm_options=llm_options,
+            tool_memo=tool_memo,
+        )
+
+        # Handle empty output
+        if not llm_output or not llm_output.strip():
+            print(f"[WARNING] Agent {agent_id} returned empty output")
+            current_span().set_attribute("agent.retried", True)
+
+            # Retry once
+            llm_output, retry_tools = await arun_agent_with_tools(
+                system_prompt=system_prompt,
+                history=history,
+                tool_names=tool_names,
+                tool_configs=tool_configs,
+                agent_id=agent_id,
+                on_event=on_event,
+                context_tokens=context_tokens,
+                steps=steps,
+                llm_options=llm_options,
+                tool_memo=tool_memo,
+            )
+            # Merge tools used from retry
+            tools_used.extend([t for t in retry_tools if t not in tools_used])
+
+            # If still empty, use a default message
+            if not llm_output or not llm_output.strip():
+                llm_output = f"[Agent] {agent_id} could not produce a response after multiple attempts"
+
+    except Exception as e:
+        print(f"[ERROR] Exception in agent {agent_id}: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        llm_output = f"[Error in {role_name}: {str(e)}]"
+        tools_used = []  # No tools used if error occurred
+        current_span().record_error(e)
+
+    return llm_output, tools_used
+
+
+async def _execute_router_node(
+    node: Dict[str, Any],
+    text: str,
+    outgoing_conditions: List[Optional[str]],
+    steps: Optional[List[RunStep]] = None,
+) -> str:
+    """
+    Pick the route of a router node (regex rules or one tiny LLM call).
+    Falls back to the node's default (or its first route) when nothing
+    matches or the LLM call fails. Recorded as a "router" step.
+    """
+    router_id = node.get("id", "router")
+    mode = node.get("mode", "rules")
+    routes = router_routes(node, outgoing_conditions)
+    fallback = node.get("default") or (routes[0] if routes else "")
+    step_fields: Dict[str, Any] = {}
+    step_metadata: Dict[str, Any] = {"mode": mode}
+    started_at, started = datetime.utcnow(), time.perf_counter()
+    
+    with span("router", **{"router.id": router_id, "router.mode": mode}) as router_span:
+        if mode == "llm":
+            try:
+                route, response = await route_with_llm(node, routes, text, node_llm_options(node))
+                step_fields = {"prompt_tokens": response.prompt_tokens, "completion_tokens": response.completion_tokens}
+                step_metadata.update({"answer": (response.content or "")[:100], "cache_hit": response.cached})
+            except Exception as e:
+                print(f"[WARNING] Router {router_id} failed, using default route: {e}")
+                router_span.record_error(e)
+                route = None
+                step_fields = {"error": str(e)}
+        else:
+            route = route_by_rules(node, text)
+        route = route or fallback
+        router_span.set_attribute("router.route", route)
+    
+    step_metadata["route"] = route
+    _record_step(steps, router_id, "router", mode, started_at, started, step_metadata=step_metadata, **step_fields)
+    return route
+
+
+async def arun_assistant_graph(
     db:Session,
     assistant: Assistant,
     run: Run,
     previous_messages: List[Message] = None,
     tools_by_agent: Dict[str, List[Dict[str, Any]]] = None,
+    on_event: Optional[RunEventCallback] = None,
 )-> List[Message]:
     """ 
     Execute the full assistant graph with LLM-driven tool calling.
     
-    This processes each agent node in sequence , where each agent can:
+    Agent nodes are scheduled as a DAG built from graph_json["edges"]:
+    a node starts as soon as all of its upstream agents have finished,
+    so independent branches (e.g. several researchers hanging off one
+    planner) run concurrently as asyncio tasks.
+    
+    Router nodes pick a route for the run's input and edges may carry
+    conditions (see app.agents.graph): a node runs only if at least one
+    of its incoming edges is taken, otherwise it is skipped - together
+    with everything downstream that has no other way in. Each agent can:
     use tools via the agentic tool loop
-    see outputs from previous agents
-    produce a response that subsequent agents can see
+    see the outputs of its upstream agents (and only those)
+    produce a response that its downstream agents can see
+    
+    Messages and timeline steps go through a run writer (see
+    app.agents.persistence): by default each one is committed as it is
+    produced; RUN_PERSISTENCE_MODE=write_behind buffers them and writes
+    them in one transaction when the run completes, so agents never wait
+    on the database. Database writes go through asyncio.to_thread so the
+    event loop never blocks on the (sync) SQLAlchemy session.
     
     Args:
         db:Database session
@@ -298,6 +699,8 @@ def run_assistant_graph(
                     ....
                 ]
             }
+        on_event: Optional async callback receiving live events
+            (agent_started, token, tool_call, tool_result, agent_completed)
     Returns:
         List of messages created during the run
     """
@@ -307,10 +710,7 @@ def run_assistant_graph(
     if tools_by_agent is None:
         tools_by_agent = {}
     
-    print(f"[DEBUG] run_assistant_graph called with tools_by_agent: {tools_by_agent}")
-        
     graph = assistant.graph_json or {}
-    nodes = graph.get("nodes", [])
     messages_for_this_run: List[Message] = previous_messages.copy()
     
     # 1. create initial user message
@@ -322,131 +722,139 @@ def run_assistant_graph(
          message_metadata = None,
          created_at = datetime.utcnow(),
     )
-    db.add(user_message)
-    db.commit()
-    db.refresh(user_message)
+    writer = make_run_writer(db, run)
+    await writer.add_message(user_message)
     messages_for_this_run.append(user_message)
+    base_history = messages_for_this_run.copy()
     
-    # 2 Get agent node
+    outputs_by_agent: Dict[str, Message] = {}
+    # Output text of every settled node (route label for routers), None = skipped
+    results: Dict[str, Optional[str]] = {}
+    running: Dict[asyncio.Task, str] = {}
+    limiter = asyncio.Semaphore(max(1, MAX_PARALLEL_AGENTS))
+    # Identical tool calls made by several agents of this run are only executed once
+    tool_memo = RunToolMemo()
+    completed = False
     
-    agent_nodes = [n for n in nodes if n.get("type") == "agent"]
-    print(f"[DEBUG] Found {len(agent_nodes)} agent nodes to process")
+    def _edge_taken(source: str, target: str) -> bool:
+        return results.get(source) is not None and condition_matches(conditions.get((source, target)), results[source])
     
-    # 3 Process each agent
-    for idx, node in enumerate(agent_nodes):
-        # Removed delay between agents for faster execution
-        
-        agent_id = node.get("id", "agent")
-        system_prompt = node.get("system_prompt", "")
-        role_name = node.get("role", agent_id)
-        
-        print(f"[DEBUG] Processing agent {idx+1}/{len(agent_nodes)}: {agent_id} ({role_name})")
-        
-        # Get tools for this agent
-        agent_tool_configs = tools_by_agent.get(agent_id, [])
+    async def _run_node(node: Dict[str, Any], history: List[Message]) -> Tuple[str, List[str], List[RunStep]]:
+        if node.get("type") == "router":
+            steps: List[RunStep] = []
+            node_id = node.get("id", "router")
+            outgoing = [conditions.get((node_id, target)) for target, deps in upstream.items() if node_id in deps]
+            route = await _execute_router_node(node, run.input_text, outgoing, steps)
+            return route, [], steps
+        async with limiter:
+            if on_event is not None:
+                agent_id = node.get("id", "agent")
+                await on_event({"type": "agent_started", "agent_id": agent_id, "role": node.get("role", agent_id)})
+            steps: List[RunStep] = []
+            llm_output, tools_used = await _execute_agent_node(node, history, tools_by_agent, on_event, steps, tool_memo)
+            return llm_output, tools_used, steps
+    
+    try:
+        # 2 Build the DAG of agent nodes (inside the try: a stored graph with a
+        # cycle fails the run through writer.abort() like any other error)
         
-        # Extract tool names and configs
-        tool_names = []
-        tool_configs = {}
+        agent_nodes = get_runnable_nodes(graph)
+        nodes_by_id = {n.get("id", "agent"): n for n in agent_nodes}
+        upstream = build_upstream_map(graph)
+        topological_order(upstream)  # raises GraphValidationError on cycles
+        conditions = edge_conditions(graph)
+        current_span().set_attribute("run.agents", len(agent_nodes))
         
-        for tool_info in agent_tool_configs:
-            if tool_info.get("kind") == "user_tool":
-                template_key = tool_info.get("template_key")
-                tool_status = tool_info.get("status", "pending")
+        # 3 Process agents as soon as their upstream agents are done
+        node_order = list(nodes_by_id.keys())
+        pending = list(node_order)
+        while pending or running:
+            # Start every node whose upstream nodes have all settled (finished or skipped);
+            # skipping a node can settle others, so repeat until nothing changes
+            progressed = True
+            while progressed:
+                progressed = False
+                for agent_id in list(pending):
+                    deps = upstream[agent_id]
+                    if not all(dep in results for dep in deps):
+                        continue
+                    pending.remove(agent_id)
+                    progressed = True
+                    if deps and not any(_edge_taken(dep, agent_id) for dep in deps):
+                        results[agent_id] = None
+                        if on_event is not None:
+                            await on_event({"type": "agent_skipped", "agent_id": agent_id})
+                        continue
+                    ancestors = collect_ancestors(upstream, agent_id)
+                    history = base_history + [
+                        outputs_by_agent[a] for a in nodes_by_id if a in ancestors and a in outputs_by_agent
+                    ]
+                    task = asyncio.create_task(_run_node(nodes_by_id[agent_id], history))
+                    running[task] = agent_id
+            
+            if not running:
+                break
+            
+            done, _ = await asyncio.wait(list(running.keys()), return_when=asyncio.FIRST_COMPLETED)
+            # Persist agents finishing together in graph order (deterministic transcripts)
+            for task in sorted(done, key=lambda t: node_order.index(running[t])):
+                agent_id = running.pop(task)
+                llm_output, tools_used, steps = task.result()
                 
-                # Skip tools that aren't connected
-                if tool_status != "connected":
-                    print(f"[WARNING] Skipping tool '{template_key}' - status is '{tool_status}', not 'connected'")
+                if nodes_by_id[agent_id].get("type") == "router":
+                    # A route is control flow, not a message downstream agents should read
+                    await writer.add_steps(steps)
+                    results[agent_id] = llm_output
+                    if on_event is not None:
+                        await on_event({"type": "route_selected", "agent_id": agent_id, "route": llm_output})
                     continue
                 
-                if template_key:
-                    tool_names.append(template_key)
-                    # Config is retrieved from database via tool_resolver
-                    raw_config = tool_info.get("config", {})
-                    # Check if config has nested structure matching template_key
-                    if isinstance(raw_config, dict):
-                        if template_key in raw_config:
-                            # Nested: {"tavily": {"api_key": "..."}}
-                            tool_configs[template_key] = raw_config[template_key]
-                        elif "api_key" in raw_config or "gmail_credentials" in raw_config or any(k.startswith("_") for k in raw_config.keys()):
-                            # Flat config - use as is
-                            tool_configs[template_key] = raw_config
-                        else:
-                            # Empty or unknown structure - use as is
-                            tool_configs[template_key] = raw_config
-                    else:
-                        # Not a dict - use empty config
-                        tool_configs[template_key] = {}
-        
-        print(f"[DEBUG] Agent {agent_id} tools: {tool_names}")
-        print(f"[DEBUG] Agent {agent_id} tool_configs keys: {list(tool_configs.keys())}")
-        for tk, tc in tool_configs.items():
-            print(f"[DEBUG]   Tool '{tk}' config keys: {list(tc.keys()) if isinstance(tc, dict) else 'NOT A DICT'}")
-        
-        # Run agent with tool loop
-        tools_used = []
-        try:
-            llm_output, tools_used = run_agent_with_tools(
-                system_prompt=system_prompt,
-                history=messages_for_this_run,
-                tool_names=tool_names,
-                tool_configs=tool_configs,
-                agent_id=agent_id,
-            )
-            
-            # Handle empty output
-            if not llm_output or not llm_output.strip():
-                print(f"[WARNING] Agent {agent_id} returned empty output")
+                # Save agent message with tool metadata
+                message_metadata = None
+                if tools_used:
+                    message_metadata = {"tools_used": tools_used}
                 
-                # Retry once
-                llm_output, retry_tools = run_agent_with_tools(
-                    system_prompt=system_prompt,
-                    history=messages_for_this_run,
-                    tool_names=tool_names,
-                    tool_configs=tool_configs,
-                    agent_id=agent_id,
+                agent_message = Message(
+                    run_id=run.id,
+                    sender=agent_id,
+                    content=llm_output,
+                    message_metadata=message_metadata,
+                    created_at=datetime.utcnow(),
                 )
-                # Merge tools used from retry
-                tools_used.extend([t for t in retry_tools if t not in tools_used])
+                await writer.add_message(agent_message, steps)
+                outputs_by_agent[agent_id] = agent_message
+                results[agent_id] = llm_output
+                messages_for_this_run.append(agent_message)
                 
-                # If still empty, use a default message
-                if not llm_output or not llm_output.strip():
-                    llm_output = f"[Agent] {agent_id} could not produce a response after multiple attempts"
-                
-        except Exception as e:
-            print(f"[ERROR] Exception in agent {agent_id}: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            llm_output = f"[Error in {role_name}: {str(e)}]"
-            tools_used = []  # No tools used if error occurred
-        
-        # Save agent message with tool metadata
-        message_metadata = None
-        if tools_used:
-            message_metadata = {"tools_used": tools_used}
-        
-        agent_message = Message(
-            run_id=run.id,
-            sender=agent_id,
-            content=llm_output,
-            message_metadata=message_metadata,
-            created_at=datetime.utcnow(),
-        )
-        db.add(agent_message)
-        db.commit()
-        db.refresh(agent_message)
-        messages_for_this_run.append(agent_message)
+                if on_event is not None:
+                    await on_event({
+                        "type": "agent_completed",
+                        "agent_id": agent_id,
+                        "message_id": agent_message.id,
+                        "content": llm_output,
+                        "tools_used": tools_used,
+                    })
+        completed = True
+    finally:
+        # Don't leave orphaned agents running if the run is aborted
+        for task in running:
+            task.cancel()
+        if not completed:
+            # Keep what the failed run produced (the caller marks the run failed)
+            await writer.abort()
+    
+    current_span().set_attributes(**{
+        "run.tool_memo_entries": len(tool_memo),
+        "run.tool_memo_hits": tool_memo.hits,
+        "run.skipped_nodes": sum(1 for output in results.values() if output is None),
+    })
     
-# 4. Mark run completed
-    run.status = "completed"
-    run.completed_at = datetime.utcnow()
-    db.commit()
-    db.refresh(run)
+    # 4. Mark run completed (write-behind: this is the run's single write transaction)
+    await writer.complete()
     
     return messages_for_this_run
 
 
-
 # LEGACY SUPPORT (for backwards compatibility during migration)
 
 def _build_prompt_for_agent(
@@ -455,7 +863,7 @@ def _build_prompt_for_agent(
 )->str:
     """ 
     DEPREACATED: kept for backwards compatibiltiy.
-    Use run_agent_with_tools() instead.
+    Use arun_agent_with_tools() instead.
     """
     
     system_prompt = agent_node.get("system_prompt", "")
@@ -0,0 +1,47 @@
+"""
+Shared keep-alive HTTP client for outbound tool calls (Tavily, weather, MCP).
+
+Tool handlers used to open an httpx.AsyncClient per call, paying a new
+TCP / TLS handshake every time. They now share one pooled client (limits:
+TOOL_HTTP_MAX_CONNECTIONS / TOOL_HTTP_MAX_KEEPALIVE) and pass their own
+timeout per request. aclose_http_client() closes it at app shutdown, next
+to the LLM providers' clients (see app.llm.providers.aclose_providers).
+
+An httpx.AsyncClient's connections belong to the event loop they were
+opened on, so a client is created per loop; in the app that is one.
+"""
+
+import asyncio
+from typing import Optional
+
+import httpx
+
+from app.core.config import settings
+
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """ The pooled client of the running event loop (created on first use) """
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.TOOL_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.TOOL_HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=settings.TOOL_HTTP_KEEPALIVE_SECONDS,
+            ),
+            timeout=httpx.Timeout(30.0, connect=10.0),
+        )
+        _client_loop = loop
+    return _client
+
+
+async def aclose_http_client() -> None:
+    """ Close the pooled client (app shutdown) """
+    global _client, _client_loop
+    client, _client, _client_loop = _client, None, None
+    if client is not None and not client.is_closed:
+        await client.aclose()
@@ -0,0 +1,288 @@
+"""
+Lightweight span tracing for the run hot path.
+
+Spans nest run -> agent -> llm call -> tool call through a contextvar, so
+concurrent agents / tool calls (asyncio tasks copy the context they were
+created in) end up under the right parent without passing spans around.
+
+Usage:
+    from app.core.tracing import span
+
+    with span("llm.call", model=model) as s:
+        response = await acall(...)
+        s.set_attribute("llm.tool_calls", len(response.tool_calls))
+
+Exporters (TRACING_EXPORTER):
+- "file":   OTLP/JSON (ExportTraceServiceRequest) lines appended to TRACING_FILE_PATH
+- "memory": finished spans kept in IN_MEMORY_EXPORTER (tests, debugging)
+
+When TRACING_ENABLED is false span() returns a shared no-op object: no ids,
+no clock reads, no allocations beyond the caller's keyword arguments.
+Callers should keep attributes cheap (or guard them with tracing_enabled()).
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from app.core.config import settings
+
+SERVICE_NAME = "multi-agent-backend"
+
+# Spans buffered by the tracer before they are handed to the exporter
+EXPORT_BATCH_SIZE = 64
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """ One timed operation; use through span() """
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_span_id", "attributes",
+                 "start_ns", "end_ns", "status", "status_message", "_token")
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_span_id = parent.span_id if parent is not None else None
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.status = "OK"
+        self.status_message: Optional[str] = None
+        self._token = None
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        if self.end_ns is None:
+            return None
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def record_error(self, error: BaseException) -> None:
+        self.status = "ERROR"
+        self.status_message = f"{type(error).__name__}: {error}"
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.end_ns = time.time_ns()
+        if exc is not None:
+            self.record_error(exc)
+        _current_span.reset(self._token)
+        _TRACER.finish(self)
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        """ Flat representation used by the in-memory exporter """
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "status_message": self.status_message,
+            "attributes": dict(self.attributes),
+        }
+
+
+class _NoopSpan:
+    """ Returned by span() when tracing is disabled """
+
+    __slots__ = ()
+
+    duration_ms = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, **attributes: Any) -> None:
+        pass
+
+    def record_error(self, error: BaseException) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+# Exporters
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_otlp_value(v) for v in value]}}
+    return {"stringValue": str(value)}
+
+
+def _otlp_span(s: Span) -> Dict[str, Any]:
+    data = {
+        "traceId": s.trace_id,
+        "spanId": s.span_id,
+        "name": s.name,
+        "kind": 1,  # SPAN_KIND_INTERNAL
+        "startTimeUnixNano": str(s.start_ns),
+        "endTimeUnixNano": str(s.end_ns),
+        "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items()],
+        "status": {"code": 2 if s.status == "ERROR" else 1},
+    }
+    if s.parent_span_id:
+        data["parentSpanId"] = s.parent_span_id
+    if s.status_message:
+        data["status"]["message"] = s.status_message
+    return data
+
+
+class OTLPJsonFileExporter:
+    """
+    Appends one OTLP/JSON ExportTraceServiceRequest per batch (JSON lines),
+    the format of the OpenTelemetry collector's file exporter.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        request = {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+                "scopeSpans": [{
+                    "scope": {"name": "app.core.tracing"},
+                    "spans": [_otlp_span(s) for s in spans],
+                }],
+            }]
+        }
+        line = json.dumps(request, separators=(",", ":"))
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+class InMemoryExporter:
+    """ Keeps the last `max_spans` finished spans (as dicts) """
+    def __init__(self, max_spans: int = 10000):
+        self._spans: Deque[Dict[str, Any]] = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        with self._lock:
+            self._spans.extend(s.to_dict() for s in spans)
+
+    def get_finished_spans(self, trace_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [s for s in self._spans if trace_id is None or s["trace_id"] == trace_id]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._spans.clear()
+
+
+class _Tracer:
+    """ Buffers finished spans and hands them to the exporter in batches """
+    def __init__(self):
+        self.exporter = None
+        self._buffer: List[Span] = []
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def finish(self, s: Span) -> None:
+        with self._lock:
+            self._buffer.append(s)
+            # Flush when a trace's root span ends so traces show up promptly
+            if s.parent_span_id is not None and len(self._buffer) < EXPORT_BATCH_SIZE:
+                return
+            batch, self._buffer = self._buffer, []
+        self._export(batch)
+
+    def flush(self) -> None:
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if batch:
+            self._export(batch)
+
+    def _export(self, batch: List[Span]) -> None:
+        try:
+            self.exporter.export(batch)
+        except Exception as e:
+            print(f"[WARNING] Failed to export {len(batch)} span(s): {e}")
+
+
+_TRACER = _Tracer()
+
+# Always available so tests can switch to it with configure_tracing("memory")
+IN_MEMORY_EXPORTER = InMemoryExporter()
+
+
+def configure_tracing(exporter: Optional[str], file_path: Optional[str] = None) -> None:
+    """
+    Select the exporter: "file", "memory" or None (disabled).
+    Pending spans of the previous exporter are flushed first.
+    """
+    if _TRACER.enabled:
+        _TRACER.flush()
+    if exporter == "file":
+        _TRACER.exporter = OTLPJsonFileExporter(file_path or settings.TRACING_FILE_PATH)
+    elif exporter == "memory":
+        _TRACER.exporter = IN_MEMORY_EXPORTER
+    elif exporter is None:
+        _TRACER.exporter = None
+    else:
+        raise ValueError(f"Unknown tracing exporter '{exporter}' (expected 'file' or 'memory')")
+
+
+def tracing_enabled() -> bool:
+    return _TRACER.enabled
+
+
+def span(name: str, **attributes: Any):
+    """
+    Context manager timing `name` as a child of the current span.
+    Returns a no-op span when tracing is disabled.
+    """
+    if _TRACER.exporter is None:
+        return _NOOP_SPAN
+    return Span(name, _current_span.get(), attributes)
+
+
+def current_span():
+    """ The innermost active span (a no-op span outside of any span / when disabled) """
+    return _current_span.get() or _NOOP_SPAN
+
+
+def flush_tracing() -> None:
+    """ Export buffered spans now (app shutdown) """
+    if _TRACER.enabled:
+        _TRACER.flush()
+
+
+if settings.TRACING_ENABLED:
+    configure_tracing(settings.TRACING_EXPORTER, settings.TRACING_FILE_PATH)
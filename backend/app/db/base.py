@@ -1,3 +1,40 @@
+from sqlalchemy import inspect, text
 from sqlalchemy.orm import declarative_base
 
 Base = declarative_base()
+
+
+def ensure_indexes(bind) -> None:
+    """
+    Create indexes declared on the models that are missing in the database.
+    create_all() only creates indexes together with new tables, so indexes
+    added to existing tables later would otherwise never be created.
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+
+
+def ensure_columns(bind) -> None:
+    """
+    Add nullable columns declared on the models that are missing in existing
+    tables (create_all() never alters a table that already exists).
+    NOT NULL columns would need a default / backfill and are only reported.
+    """
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    quote = bind.dialect.identifier_preparer.quote
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        present = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in present:
+                continue
+            if not column.nullable:
+                print(f"[WARNING] Column {table.name}.{column.name} is missing and NOT NULL - add it manually")
+                continue
+            column_type = column.type.compile(dialect=bind.dialect)
+            with bind.begin() as conn:
+                conn.execute(text(f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column_type}"))
+            print(f"[INFO] Added column {table.name}.{column.name}")
@@ -0,0 +1,50 @@
+"""
+Storage of message bodies.
+
+Short bodies stay inline in messages.content. Bodies of at least
+MESSAGE_COMPRESS_MIN_CHARS characters are zlib-compressed into the
+message_blobs table (messages.content is left empty and
+messages.content_codec says how the blob is encoded). Every message also
+keeps content_chars and a short content_preview, so list endpoints can
+show a message without reading its body at all.
+
+Message.content hides all of this: setting it picks the storage, reading
+it returns the text (loading and decompressing the blob on first access).
+SQL readers that select columns directly use decode_content().
+"""
+
+import zlib
+from typing import Optional
+
+from app.core.config import settings
+
+CODEC_ZLIB = "zlib"
+
+
+def make_preview(text: str, limit: Optional[int] = None) -> str:
+    """ First `limit` characters of `text` on one line ("..." when cut) """
+    limit = settings.MESSAGE_PREVIEW_CHARS if limit is None else limit
+    preview = " ".join(text.split())
+    if len(preview) > limit:
+        preview = preview[:limit].rstrip() + "..."
+    return preview
+
+
+def should_compress(text: str) -> bool:
+    """ Whether a body is large enough to go to the blob table (MESSAGE_COMPRESS_MIN_CHARS, 0 = never) """
+    threshold = settings.MESSAGE_COMPRESS_MIN_CHARS
+    return threshold > 0 and len(text) >= threshold
+
+
+def compress_content(text: str) -> bytes:
+    return zlib.compress(text.encode("utf-8"), settings.MESSAGE_COMPRESSION_LEVEL)
+
+
+def decode_content(inline: Optional[str], codec: Optional[str], data: Optional[bytes]) -> str:
+    """ Text of a message from its stored columns (inline content, codec, blob data) """
+    if codec is None:
+        return inline or ""
+    if codec == CODEC_ZLIB and data is not None:
+        return zlib.decompress(data).decode("utf-8")
+    print(f"[WARNING] Unreadable message body (codec {codec!r}, blob {'missing' if data is None else 'present'})")
+    return inline or ""
@@ -1,9 +1,10 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, Float, Index, LargeBinary
 from sqlalchemy.orm import relationship
-from sqlalchemy.dialects.postgresql import JSONB
 
 from app.db.base import Base
+from app.db.types import JSONType
+from app.db.content import CODEC_ZLIB, compress_content, decode_content, make_preview, should_compress
 
 
 class Assistant(Base):
@@ -13,7 +14,7 @@ class Assistant(Base):
     name = Column(String(255), nullable=False)
     description = Column(Text, nullable=True)
     spec = Column(Text, nullable=True)
-    graph_json = Column(JSONB, nullable=False)
+    graph_json = Column(JSONType, nullable=False)
     
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -28,6 +29,12 @@ class Chat(Base):
     id = Column(Integer, primary_key = True, index =True)
     assistant_id = Column(Integer, ForeignKey("assistants.id"), nullable = False)
     title = Column(String(255), nullable = True)
+    
+    # Rolling summary of the conversation, updated after each run by a cheap model.
+    # summary_run_id is the last run folded into it; later runs are loaded verbatim.
+    summary = Column(Text, nullable = True)
+    summary_run_id = Column(Integer, nullable = True)
+    
     created_at = Column(DateTime, default = datetime.utcnow, nullable = False)
     updated_at = Column(DateTime, default = datetime.utcnow, onupdate = datetime.utcnow, nullable = False)
     
@@ -42,7 +49,7 @@ class Run(Base):
     
     id = Column(Integer, primary_key = True, index = True)
     assistant_id = Column(Integer, ForeignKey("assistants.id"), nullable = False)
-    chat_id = Column(Integer, ForeignKey("chats.id"), nullable = True)
+    chat_id = Column(Integer, ForeignKey("chats.id"), nullable = True, index = True)
     status = Column(String(50), default="created", nullable = False)
     input_text = Column(Text, nullable=False)
     
@@ -52,21 +59,95 @@ class Run(Base):
     
     assistant = relationship("Assistant", back_populates = "runs")
     messages = relationship("Message", back_populates = "run",cascade = "all, delete-orphan")
+    steps = relationship("RunStep", back_populates = "run", cascade = "all, delete-orphan")
     chat = relationship("Chat", back_populates = "runs")
     
 class Message(Base):
     __tablename__ = "messages"
+    # (run_id, id): messages of a run / chat in id order - keyset pagination of
+    # chat transcripts reads page ids from this index alone
+    __table_args__ = (Index("ix_messages_run_id_id", "run_id", "id"),)
     
     id = Column(Integer, primary_key = True, index = True)
     run_id = Column(Integer, ForeignKey("runs.id"), nullable = False)
     
     sender = Column(String(100), nullable= False)
-    content = Column(Text ,nullable = False)
-    message_metadata = Column(JSONB, nullable = True)
+    # Body storage (see app.db.content): inline text, or "" with content_codec set
+    # when the body is compressed in message_blobs. Read / write it through .content
+    stored_content = Column("content", Text ,nullable = False)
+    content_codec = Column(String(10), nullable = True)
+    content_chars = Column(Integer, nullable = True)
+    content_preview = Column(Text, nullable = True)
+    message_metadata = Column(JSONType, nullable = True)
     
     created_at = Column(DateTime, default = datetime.utcnow, nullable = False)
     
     run = relationship("Run", back_populates = "messages")
+    blob = relationship("MessageBlob", uselist = False, cascade = "all, delete-orphan", passive_deletes = True)
+    
+    @property
+    def content(self) -> str:
+        """ The message text (the blob is loaded and decompressed on first access) """
+        text = self.__dict__.get("_text")
+        if text is None:
+            if self.content_codec is None:
+                return self.stored_content or ""
+            blob = self.blob
+            text = decode_content(self.stored_content, self.content_codec, blob.data if blob else None)
+            self.__dict__["_text"] = text
+        return text
+    
+    @content.setter
+    def content(self, text: str) -> None:
+        text = text or ""
+        self.__dict__["_text"] = text
+        self.content_chars = len(text)
+        self.content_preview = make_preview(text)
+        if should_compress(text):
+            self.stored_content = ""
+            self.content_codec = CODEC_ZLIB
+            self.blob = MessageBlob(data = compress_content(text))
+        else:
+            self.stored_content = text
+            self.content_codec = None
+            self.blob = None
+
+
+class MessageBlob(Base):
+    """ Compressed body of a large message (Message.content_codec says how it is encoded) """
+    __tablename__ = "message_blobs"
+    
+    message_id = Column(Integer, ForeignKey("messages.id", ondelete = "CASCADE"), primary_key = True)
+    data = Column(LargeBinary, nullable = False)
+    
+
+class RunStep(Base):
+    """
+    One timed step of a run: an LLM call or a tool call made by an agent.
+    Written by the agent tool loop, read by GET /runs/{id}/timeline.
+    """
+    __tablename__ = "run_steps"
+    
+    id = Column(Integer, primary_key = True, index = True)
+    run_id = Column(Integer, ForeignKey("runs.id", ondelete = "CASCADE"), nullable = False, index = True)
+    agent_id = Column(String(100), nullable = False)
+    
+    step_type = Column(String(20), nullable = False)     # "llm" | "tool"
+    name = Column(String(255), nullable = False)         # model name or tool name
+    
+    started_at = Column(DateTime, nullable = False)
+    ended_at = Column(DateTime, nullable = False)
+    duration_ms = Column(Float, nullable = False)
+    
+    prompt_tokens = Column(Integer, nullable = True)
+    completion_tokens = Column(Integer, nullable = True)
+    result_chars = Column(Integer, nullable = True)
+    error = Column(Text, nullable = True)
+    
+    # iteration, tool_call_id, cache_hit, timed_out ...
+    step_metadata = Column(JSONType, nullable = True)
+    
+    run = relationship("Run", back_populates = "steps")
     
     
 # MCP + Tooling models (NEW)
@@ -84,7 +165,7 @@ class MCPServer(Base):
     server_type = Column(String(50), nullable = False, default="http" )
     endpoint = Column(String(1024), nullable = True)
     
-    config_json = Column(JSONB, nullable = False)
+    config_json = Column(JSONType, nullable = False)
     
     created_at = Column(DateTime, default = datetime.utcnow, nullable = False)
     updated_at = Column(DateTime, default = datetime.utcnow, onupdate = datetime.utcnow, nullable = False)
@@ -102,7 +183,7 @@ class MCPTool(Base):
     name=  Column(String(255), nullable = False)
     description = Column(Text, nullable = True)
     
-    schema_json = Column(JSONB, nullable = True)
+    schema_json = Column(JSONType, nullable = True)
     enabled = Column(Boolean, default = True, nullable = False)
     
     created_at = Column(DateTime, default = datetime.utcnow, nullable = False)
@@ -122,7 +203,7 @@ class UserToolConnection(Base):
     
      # Store secrets + options here (API keys, tokens, etc.)
     # Never send this whole JSON to frontend
-    config_json = Column(JSONB, nullable = False)
+    config_json = Column(JSONType, nullable = False)
     
     status = Column(String(50), nullable = False, default = "pending")
     
@@ -1,24 +1,275 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import QueuePool
+import threading
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import sessionmaker, Session, SessionTransaction
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool, StaticPool
 
 from app.core.config import settings
 
+# Embedded single-node mode: DATABASE_URL=sqlite:///./agent.db
+IS_SQLITE = make_url(settings.DATABASE_URL).get_backend_name() == "sqlite"
+
+# Applied to every SQLite connection. WAL lets readers run next to the (single)
+# writer; synchronous=NORMAL only fsyncs at checkpoints (safe with WAL, a power
+# loss can drop the last commits, never corrupt the file)
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "foreign_keys": "ON",
+    "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+    "cache_size": -64000,  # KiB
+    "temp_store": "MEMORY",
+    "mmap_size": 256 * 1024 * 1024,
+}
+
+
+class PoolMetrics:
+    """
+    Checkout wait time and utilisation of one connection pool.
+    wait = time a caller spent in pool checkout, including connecting when
+    the pool had to open a connection; failed checkouts (pool timeout,
+    connect error) count as failures.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.failures = 0
+        self.waiting = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def start(self) -> None:
+        with self._lock:
+            self.waiting += 1
+
+    def finish(self, seconds: float, ok: bool) -> None:
+        with self._lock:
+            self.waiting -= 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            if ok:
+                self.checkouts += 1
+            else:
+                self.failures += 1
+
+    def stats(self, pool) -> dict:
+        in_use = pool.checkedout()
+        capacity = pool.size() + max(0, pool._max_overflow)
+        with self._lock:
+            attempts = self.checkouts + self.failures
+            return {
+                "pool_size": pool.size(),
+                "max_overflow": pool._max_overflow,
+                "in_use": in_use,
+                "idle": pool.checkedin(),
+                "overflow": max(0, pool.overflow()),
+                "utilisation": round(in_use / capacity, 3) if capacity else None,
+                "waiting": self.waiting,
+                "checkouts": self.checkouts,
+                "failures": self.failures,
+                "wait_ms_avg": round(self.wait_seconds_total / attempts * 1000, 3) if attempts else 0.0,
+                "wait_ms_max": round(self.wait_seconds_max * 1000, 3),
+            }
+
+
+def _instrumented(pool_class):
+    """ Subclass of a QueuePool class that times every checkout into PoolMetrics """
+    class InstrumentedPool(pool_class):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.metrics = PoolMetrics()
+
+        def recreate(self):
+            pool = super().recreate()
+            pool.metrics = self.metrics
+            return pool
+
+        def _do_get(self):
+            self.metrics.start()
+            started = time.perf_counter()
+            ok = False
+            try:
+                connection = super()._do_get()
+                ok = True
+                return connection
+            finally:
+                self.metrics.finish(time.perf_counter() - started, ok)
+
+    InstrumentedPool.__name__ = f"Instrumented{pool_class.__name__}"
+    return InstrumentedPool
+
+
+InstrumentedQueuePool = _instrumented(QueuePool)
+InstrumentedAsyncQueuePool = _instrumented(AsyncAdaptedQueuePool)
+
+
+def _pool_options() -> dict:
+    return {
+        "pool_size": settings.DB_POOL_SIZE,  # Number of connections to keep open
+        "max_overflow": settings.DB_MAX_OVERFLOW,  # Additional connections allowed beyond pool_size
+        "pool_recycle": settings.DB_POOL_RECYCLE_S,  # Reopen connections older than this (-1 = never)
+        "pool_timeout": settings.DB_POOL_TIMEOUT_S,  # Max wait for a free connection before erroring
+        "pool_pre_ping": True,  # Verify connections before use
+    }
+
+
+class WriteQueue:
+    """
+    First come, first served single-writer lock (SQLite allows one write
+    transaction at a time; queueing writers here instead of letting them
+    collide in SQLite avoids busy-timeout sleeps and "database is locked").
+    Re-entrant for its owner: the calling thread by default, or any object
+    passed as `owner` (SingleWriterSession passes itself, because a session
+    can flush in one worker thread and commit in another).
+
+    Usage:
+        with WRITE_QUEUE.hold():
+            connection.execute(...)
+
+        WRITE_QUEUE.acquire(owner)   # ... until the write transaction ends
+        WRITE_QUEUE.release(owner)
+    """
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._next_ticket = 0
+        self._serving = 0
+        self._owner = None
+        self._depth = 0
+        # metrics
+        self.writes = 0
+        self.waiting = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def acquire(self, owner=None) -> None:
+        """ Wait for the writer slot (FIFO); `owner` defaults to the calling thread """
+        owner = threading.get_ident() if owner is None else owner
+        with self._cond:
+            if self._owner == owner:
+                self._depth += 1
+                return
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            started = time.perf_counter()
+            self.waiting += 1
+            while ticket != self._serving:
+                self._cond.wait()
+            self.waiting -= 1
+            waited = time.perf_counter() - started
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+            self.writes += 1
+            self._owner = owner
+            self._depth = 1
+
+    def release(self, owner=None) -> None:
+        owner = threading.get_ident() if owner is None else owner
+        with self._cond:
+            if self._owner != owner:
+                raise RuntimeError("WriteQueue released by a non-owner")
+            self._depth -= 1
+            if self._depth == 0:
+                self._owner = None
+                self._serving += 1
+                self._cond.notify_all()
+
+    @contextmanager
+    def hold(self, owner=None):
+        self.acquire(owner)
+        try:
+            yield
+        finally:
+            self.release(owner)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "writes": self.writes,
+                "waiting": self.waiting,
+                "wait_ms_avg": round(self.wait_seconds_total / self.writes * 1000, 3) if self.writes else 0.0,
+                "wait_ms_max": round(self.wait_seconds_max * 1000, 3),
+            }
+
+
+WRITE_QUEUE = WriteQueue()
+
+
+class SingleWriterSession(Session):
+    """
+    Session that takes WRITE_QUEUE before its first write (flush or ORM
+    insert / update / delete) and keeps it until the transaction ends
+    (commit, rollback or close), i.e. for as long as SQLite's write lock
+    is held (SQLite mode).
+    """
+    _holds_writer = False
+
+    def _take_writer(self) -> None:
+        if not self._holds_writer:
+            WRITE_QUEUE.acquire(self)
+            self._holds_writer = True
+            if not self.in_transaction():
+                # Make sure a transaction exists whose end releases the queue
+                self.begin()
+
+    def flush(self, objects=None):
+        if self.new or self.dirty or self.deleted:
+            self._take_writer()
+        super().flush(objects)
+
+
+@event.listens_for(SingleWriterSession, "do_orm_execute")
+def _writer_for_dml(orm_execute_state) -> None:
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session._take_writer()
+
+
+@event.listens_for(SingleWriterSession, "after_transaction_end")
+def _release_writer(session: Session, transaction: SessionTransaction) -> None:
+    if transaction.parent is None and session._holds_writer:
+        session._holds_writer = False
+        WRITE_QUEUE.release(session)
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def _engine_options() -> dict:
+    if not IS_SQLITE:
+        return {"poolclass": InstrumentedQueuePool, **_pool_options()}
+    options = {
+        # Sessions move between the event loop and worker threads
+        "connect_args": {"check_same_thread": False, "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000},
+    }
+    if make_url(settings.DATABASE_URL).database in (None, "", ":memory:"):
+        # One shared connection, otherwise every connection gets its own empty database
+        options["poolclass"] = StaticPool
+    else:
+        options.update(poolclass=InstrumentedQueuePool, **_pool_options())
+    return options
+
+
 # Create engine with connection pooling for better performance
 engine = create_engine(
     settings.DATABASE_URL,
     echo=False,  # Disable SQL logging for performance (set True for debugging)
     future=True,
-    poolclass=QueuePool,
-    pool_size=5,  # Number of connections to keep open
-    max_overflow=10,  # Additional connections allowed beyond pool_size
-    pool_pre_ping=True,  # Verify connections before use
+    **_engine_options(),
 )
+if IS_SQLITE:
+    event.listen(engine, "connect", _set_sqlite_pragmas)
 
 SessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
     bind=engine,
+    class_=SingleWriterSession if IS_SQLITE else Session,
 )
 
 def get_db() -> Session:
@@ -30,4 +281,81 @@ def get_db() -> Session:
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def release_connection(db: Session) -> None:
+    """
+    End the session's current transaction so its connection goes back to
+    the pool, keeping loaded objects loaded (no expire). Used before a run's
+    agents start, so a long run doesn't hold a connection while it waits on LLMs.
+    """
+    expire_on_commit = db.expire_on_commit
+    db.expire_on_commit = False
+    try:
+        db.commit()
+    finally:
+        db.expire_on_commit = expire_on_commit
+
+
+def async_database_url(url: str) -> str:
+    """ DATABASE_URL with its driver swapped for asyncpg (postgresql+psycopg2:// -> postgresql+asyncpg://) """
+    scheme, sep, rest = url.partition("://")
+    if scheme.split("+")[0] in ("postgresql", "postgres"):
+        return f"postgresql+asyncpg{sep}{rest}"
+    return url
+
+
+# Optional async engine (DATABASE_ASYNC_ENABLED): used by async endpoints and
+# the run writer, so they don't borrow a worker thread per DB call.
+# Its pool has its own DB_POOL_SIZE / DB_MAX_OVERFLOW connections.
+async_engine = None
+AsyncSessionLocal = None
+
+if settings.DATABASE_ASYNC_ENABLED and IS_SQLITE:
+    # Its writes would bypass WRITE_QUEUE; SQLite runs everything on the sync engine
+    print("[WARNING] DATABASE_ASYNC_ENABLED is ignored with SQLite")
+elif settings.DATABASE_ASYNC_ENABLED:
+    try:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        async_engine = create_async_engine(
+            settings.DATABASE_ASYNC_URL or async_database_url(settings.DATABASE_URL),
+            echo=False,
+            poolclass=InstrumentedAsyncQueuePool,
+            **_pool_options(),
+        )
+        AsyncSessionLocal = async_sessionmaker(
+            async_engine,
+            autoflush=False,
+            expire_on_commit=False,
+        )
+    except Exception as e:
+        # Driver missing (pip install asyncpg) or unsupported URL: stay on the sync engine
+        print(f"[WARNING] Async database engine disabled: {e}")
+        async_engine = None
+        AsyncSessionLocal = None
+
+
+async def dispose_async_engine() -> None:
+    """ Close the async pool's connections (app shutdown) """
+    if async_engine is not None:
+        await async_engine.dispose()
+
+
+def _stats(pool) -> dict:
+    metrics = getattr(pool, "metrics", None)
+    return metrics.stats(pool) if metrics is not None else {"pool": type(pool).__name__}
+
+
+def pool_stats() -> dict:
+    """
+    Checkout wait / utilisation of the sync pool (and the async one when
+    enabled); in SQLite mode also the single-writer queue.
+    """
+    stats = {"sync": _stats(engine.pool)}
+    if async_engine is not None:
+        stats["async"] = _stats(async_engine.sync_engine.pool)
+    if IS_SQLITE:
+        stats["sqlite_writer"] = WRITE_QUEUE.stats()
+    return stats
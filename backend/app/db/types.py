@@ -0,0 +1,11 @@
+"""
+Column types that work on every supported database.
+
+JSONType is JSONB on PostgreSQL and the generic JSON type elsewhere
+(SQLite stores it as text), so the same models run on both.
+"""
+
+from sqlalchemy import JSON
+from sqlalchemy.dialects.postgresql import JSONB
+
+JSONType = JSON().with_variant(JSONB(), "postgresql")
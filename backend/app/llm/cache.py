@@ -0,0 +1,137 @@
+"""
+Exact-match LLM response cache (opt-in, LLM_CACHE_ENABLED).
+
+Regression runs, demo assistants and repeated playground inputs replay the
+same prompts; a hit here skips the Groq round-trip entirely.
+
+- key: SHA-256 of the canonical JSON of provider, messages, tools, model,
+  temperature and max_tokens - any difference is a miss
+- tier 1: in-memory LRU (LLM_CACHE_MAX_ENTRIES)
+- tier 2: optional SQLite file (LLM_CACHE_PATH), survives restarts;
+  disk hits are promoted to memory
+- value: LLMResponse content + tool calls (never raw_message)
+- only successful, non-empty, non-streamed completions are stored
+
+Thread safe: the sync client is used from worker threads.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+
+def make_llm_cache_key(
+    provider: str,
+    messages: List[Dict[str, Any]],
+    tools: Optional[List[Dict[str, Any]]],
+    model: str,
+    temperature: float,
+    max_tokens: Optional[int],
+) -> str:
+    """ Hash of everything that determines the completion """
+    request = {
+        "provider": provider,
+        "messages": messages,
+        "tools": tools or [],
+        "model": model,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+    }
+    canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Two tier (memory LRU + SQLite) cache of completion payloads.
+
+    Payloads are plain dicts: {"content": str | None, "tool_calls": [...]}
+
+    Usage:
+        cache = LLMResponseCache(max_entries=512, disk_path="llm_cache.sqlite3")
+        payload = cache.get(key)          # None on miss
+        cache.set(key, payload)
+    """
+    def __init__(self, max_entries: int, disk_path: Optional[str] = None):
+        self.max_entries = max(1, max_entries)
+        self.disk_path = disk_path or None
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.disk_path:
+            self._db = sqlite3.connect(self.disk_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY,"
+                " payload TEXT NOT NULL,"
+                " created_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """ Cached payload from memory, then disk; None on miss """
+        with self._lock:
+            payload = self._memory.get(key)
+            if payload is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return payload
+
+            if self._db is not None:
+                row = self._db.execute("SELECT payload FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    payload = json.loads(row[0])
+                    self._remember(key, payload)
+                    self.disk_hits += 1
+                    return payload
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, payload: Dict[str, Any]) -> None:
+        """ Store a payload in both tiers """
+        with self._lock:
+            self._remember(key, payload)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, payload, created_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(payload), time.time()),
+                )
+                self._db.commit()
+
+    def clear(self) -> None:
+        """ Drop every entry (memory and disk) and reset the counters """
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM llm_cache")
+                self._db.commit()
+            self.memory_hits = self.disk_hits = self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """ Hit / miss counters for monitoring """
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "entries": len(self._memory),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _remember(self, key: str, payload: Dict[str, Any]) -> None:
+        # Caller holds the lock
+        self._memory[key] = payload
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
@@ -1,10 +1,23 @@
-from typing import List, Dict, Any, Optional, Tuple
-from groq import Groq
+from typing import List, Dict, Any, Optional, Tuple, Callable, Awaitable
 from app.core.config import settings
+from app.core.tracing import span
+from app.llm.cache import LLMResponseCache, make_llm_cache_key
+from app.llm.providers import get_provider, LLMProvider
+from app.llm.ratelimit import (
+    get_rate_limiter, estimate_request_tokens, is_rate_limit_error, retry_after_from_headers, error_headers,
+)
+import asyncio
 import json
 import time
 
-_client = Groq(api_key=settings.Groq_API_KEY) if settings.Groq_API_KEY else None
+# Exact-match response cache, opt-in (see app.llm.cache)
+LLM_CACHE = LLMResponseCache(
+    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+    disk_path=settings.LLM_CACHE_PATH,
+) if settings.LLM_CACHE_ENABLED else None
+
+# Called with every content delta while a streamed completion is in flight
+TokenCallback = Callable[[str], Awaitable[None]]
 
 
 class LLMResponse:
@@ -14,6 +27,10 @@ class LLMResponse:
     - tool_calls: A list of tool calls the LLM wants to make
     
     Only one will be populated at a time.
+    
+    prompt_tokens / completion_tokens come from the API usage block
+    (None when the provider didn't report it); cached is True when the
+    response was served by LLM_CACHE.
     """
     
     def __init__(
@@ -21,10 +38,16 @@ class LLMResponse:
         content: Optional[str] = None,
         tool_calls: Optional[List[Dict[str, Any]]] = None,
         raw_message: Optional[Any] = None,
+        prompt_tokens: Optional[int] = None,
+        completion_tokens: Optional[int] = None,
+        cached: bool = False,
     ):
         self.content = content
         self.tool_calls = tool_calls or []
         self.raw_message = raw_message  # Keep original for debugging
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.cached = cached
     
     @property
     def has_tool_calls(self) -> bool:
@@ -36,6 +59,170 @@ class LLMResponse:
         """Check if LLM returned a text response."""
         return self.content is not None and bool(self.content.strip())
 
+    @property
+    def total_tokens(self) -> Optional[int]:
+        """ prompt + completion tokens, None if the usage wasn't reported """
+        if self.prompt_tokens is None or self.completion_tokens is None:
+            return None
+        return self.prompt_tokens + self.completion_tokens
+
+
+def _build_request_kwargs(
+    provider: LLMProvider,
+    messages: List[Dict[str, Any]],
+    tools: Optional[List[Dict[str, Any]]],
+    model: Optional[str],
+    max_tokens: Optional[int],
+    temperature: float,
+) -> Dict[str, Any]:
+    """ Build the chat.completions.create kwargs shared by the sync and async clients """
+    kwargs = {
+        "model": model or provider.default_model,
+        "messages": messages,
+        "temperature": temperature,
+    }
+    # Only add max_tokens if explicitly provided
+    if max_tokens is not None:
+        kwargs["max_tokens"] = max_tokens
+    
+    # Add tools if provided
+    if tools and len(tools) > 0:
+        kwargs["tools"] = tools
+        kwargs["tool_choice"] = "auto"  # Let LLM decide when to use tools
+    return kwargs
+
+
+def _parse_tool_call(tool_call_id: str, name: str, raw_arguments: Optional[str]) -> Dict[str, Any]:
+    """ Build the {"id", "name", "arguments"} dict the runtime works with """
+    # Parse the arguments JSON
+    try:
+        args = json.loads(raw_arguments or "{}")
+    except json.JSONDecodeError:
+        args = {}
+        print(f"[WARNING] Failed to parse tool arguments: {raw_arguments}")
+    return {
+        "id": tool_call_id,
+        "name": name,
+        "arguments": args,
+    }
+
+
+def _usage_tokens(usage: Any) -> Dict[str, Optional[int]]:
+    """ prompt / completion token counts of an API usage block (if any) """
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", None),
+        "completion_tokens": getattr(usage, "completion_tokens", None),
+    }
+
+
+def _parse_completion(resp: Any) -> LLMResponse:
+    """ Turn a chat completion into an LLMResponse (tool calls or content) """
+    if not resp.choices:
+        print("[WARNING] LLM returned no choices")
+        return LLMResponse(content="")
+    
+    usage = _usage_tokens(getattr(resp, "usage", None))
+    
+    message = resp.choices[0].message
+    
+    # Check if LLM wants to call tools
+    if message.tool_calls and len(message.tool_calls) > 0:
+        tool_calls = [
+            _parse_tool_call(tc.id, tc.function.name, tc.function.arguments)
+            for tc in message.tool_calls
+        ]
+        return LLMResponse(tool_calls=tool_calls, raw_message=message, **usage)
+    
+    # Otherwise, return the content
+    content = message.content or ""
+    
+    if not content.strip():
+        print(f"[WARNING] LLM returned empty content")
+    
+    return LLMResponse(content=content, raw_message=message, **usage)
+
+
+def _cache_key_for(provider: LLMProvider, kwargs: Dict[str, Any], bypass_cache: bool) -> Optional[str]:
+    """ Cache key of a request, or None if the cache is disabled / bypassed """
+    if LLM_CACHE is None or bypass_cache:
+        return None
+    return make_llm_cache_key(
+        provider.name,
+        kwargs["messages"],
+        kwargs.get("tools"),
+        kwargs["model"],
+        kwargs["temperature"],
+        kwargs.get("max_tokens"),
+    )
+
+
+def _response_from_cache(payload: Dict[str, Any]) -> LLMResponse:
+    return LLMResponse(content=payload.get("content"), tool_calls=payload.get("tool_calls"), cached=True)
+
+
+def _cache_response(cache_key: Optional[str], response: LLMResponse) -> None:
+    """ Store a usable response (empty ones are worth retrying, so they are skipped) """
+    if cache_key is None or not (response.has_content or response.has_tool_calls):
+        return
+    LLM_CACHE.set(cache_key, {"content": response.content, "tool_calls": response.tool_calls})
+
+
+async def _acache_lookup(cache_key: Optional[str]) -> Optional[Dict[str, Any]]:
+    """ LLM_CACHE.get() without blocking the event loop on the SQLite tier """
+    if cache_key is None:
+        return None
+    if LLM_CACHE.disk_path:
+        return await asyncio.to_thread(LLM_CACHE.get, cache_key)
+    return LLM_CACHE.get(cache_key)
+
+
+def llm_cache_stats() -> Dict[str, Any]:
+    """ Hit / miss counters of the response cache ({"enabled": False} when off) """
+    if LLM_CACHE is None:
+        return {"enabled": False}
+    return {"enabled": True, **LLM_CACHE.stats()}
+
+
+def _span_attributes(provider: LLMProvider, kwargs: Dict[str, Any], stream: bool) -> Dict[str, Any]:
+    """ Cheap request attributes for the llm.call span """
+    return {
+        "llm.provider": provider.name,
+        "llm.model": kwargs["model"],
+        "llm.messages": len(kwargs["messages"]),
+        "llm.tools": len(kwargs.get("tools") or []),
+        "llm.stream": stream,
+    }
+
+
+def _traced(
+    llm_span: Any, response: LLMResponse, cache_hit: bool = False, attempts: int = 0, throttled_s: float = 0.0,
+) -> LLMResponse:
+    """ Record the outcome of a call on its span and pass the response through """
+    llm_span.set_attributes(**{
+        "llm.cache_hit": cache_hit,
+        "llm.attempts": attempts,
+        "llm.throttled_s": round(throttled_s, 3),
+        "llm.tool_calls": len(response.tool_calls),
+        "llm.output_chars": len(response.content or ""),
+    })
+    return response
+
+
+def resolve_model(provider: Optional[str] = None, model: Optional[str] = None) -> str:
+    """ Model a call with these arguments will use (explicit model or the provider's default) """
+    return model or get_provider(provider).default_model
+
+
+def _rate_limit_wait(limiter: Any, error: Exception, attempt: int) -> Optional[float]:
+    """
+    Seconds to back off before retrying a rate limited call (Retry-After or
+    jittered exponential back-off, see app.llm.ratelimit), or None if
+    `error` is not a rate limit error.
+    """
+    if not is_rate_limit_error(error):
+        return None
+    return limiter.rate_limited(attempt, retry_after_from_headers(error_headers(error)))
+
 
 def call_llm_with_tools(
     messages: List[Dict[str, Any]],
@@ -44,21 +231,31 @@ def call_llm_with_tools(
     max_tokens: Optional[int] = None,  # Let API use default
     temperature: float = 0.6,
     retries: int = 3,
+    bypass_cache: bool = False,
+    provider: Optional[str] = None,
+    timeout_s: Optional[float] = None,
 ) -> LLMResponse:
     """
     Call LLM with optional tool definitions.
     
-    This is the NEW primary function for agentic tool calling.
+    Blocking version - the runtime uses acall_llm_with_tools(); this one is
+    kept for sync callers (call_llm, scripts).
     
     Args:
         messages: Chat history in OpenAI format
             [{"role": "system", "content": "..."}, {"role": "user", "content": "..."}]
         tools: Optional list of tool schemas in OpenAI format
             [{"type": "function", "function": {"name": "...", "description": "...", "parameters": {...}}}]
-        model: Model name (defaults to settings.LLM_Model)
+        model: Model name (defaults to the provider's default model)
         max_tokens: Maximum response tokens
         temperature: Sampling temperature
-        retries: Number of retries on rate limit
+        retries: Number of attempts (rate limited calls back off first)
+        bypass_cache: skip the response cache (LLM_CACHE_ENABLED) for this
+            request - neither read nor written
+        provider: "groq" / "openai" (see app.llm.providers), defaults to
+            settings.LLM_PROVIDER
+        timeout_s: Timeout of each request in seconds (None =
+            settings.LLM_REQUEST_TIMEOUT_SECONDS)
     
     Returns:
         LLMResponse with either content or tool_calls populated
@@ -76,82 +273,210 @@ def call_llm_with_tools(
         else:
             print(response.content)
     """
-    chosen_model = model or settings.LLM_Model
+    llm = get_provider(provider)
+    kwargs = _build_request_kwargs(llm, messages, tools, model, max_tokens, temperature)
     
-    if _client is None:
-        raise ValueError("Groq API key not configured. Please set GROQ_API_KEY in your .env file.")
+    with span("llm.call", **_span_attributes(llm, kwargs, stream=False)) as llm_span:
+        cache_key = _cache_key_for(llm, kwargs, bypass_cache)
+        if cache_key is not None:
+            cached = LLM_CACHE.get(cache_key)
+            if cached is not None:
+                return _traced(llm_span, _response_from_cache(cached), cache_hit=True)
+        
+        limiter = get_rate_limiter(llm.name)
+        reserved_tokens = estimate_request_tokens(kwargs["messages"], kwargs.get("max_tokens"))
+        throttled = 0.0
+        # Tokens are reserved once per call (retries only take a request slot)
+        # and returned if no attempt succeeds
+        settled = False
     
-    for attempt in range(retries):
         try:
-            # Build request kwargs
-            kwargs = {
-                "model": chosen_model,
-                "messages": messages,
-                "temperature": temperature,
-            }
-            # Only add max_tokens if explicitly provided
-            if max_tokens is not None:
-                kwargs["max_tokens"] = max_tokens
-            
-            # Add tools if provided
-            if tools and len(tools) > 0:
-                kwargs["tools"] = tools
-                kwargs["tool_choice"] = "auto"  # Let LLM decide when to use tools
-            
-            # Make the API call
-            resp = _client.chat.completions.create(**kwargs)
-            
-            if not resp.choices:
-                print("[WARNING] LLM returned no choices")
-                return LLMResponse(content="")
-            
-            message = resp.choices[0].message
-            
-            # Check if LLM wants to call tools
-            if message.tool_calls and len(message.tool_calls) > 0:
-                tool_calls = []
-                for tc in message.tool_calls:
-                    # Parse the arguments JSON
-                    try:
-                        args = json.loads(tc.function.arguments)
-                    except json.JSONDecodeError:
-                        args = {}
-                        print(f"[WARNING] Failed to parse tool arguments: {tc.function.arguments}")
-                    
-                    tool_calls.append({
-                        "id": tc.id,
-                        "name": tc.function.name,
-                        "arguments": args,
-                    })
+            for attempt in range(retries):
+                try:
+                    # Wait for our turn in the shared RPM / TPM budget, then make the API call
+                    throttled += limiter.acquire(reserved_tokens if attempt == 0 else 0)
+                    resp = llm.complete(kwargs, timeout=timeout_s)
+                    response = _parse_completion(resp)
+                    limiter.record_usage(reserved_tokens, response.total_tokens)
+                    settled = True
+                    _cache_response(cache_key, response)
+                    return _traced(llm_span, response, attempts=attempt + 1, throttled_s=throttled)
                 
-                print(f"[DEBUG] LLM requested {len(tool_calls)} tool call(s): {[tc['name'] for tc in tool_calls]}")
-                return LLMResponse(tool_calls=tool_calls, raw_message=message)
-            
-            # Otherwise, return the content
-            content = message.content or ""
-            
-            if not content.strip():
-                print(f"[WARNING] LLM returned empty content")
-            
-            return LLMResponse(content=content, raw_message=message)
-            
-        except Exception as e:
-            error_str = str(e).lower()
-            print(f"[ERROR] LLM call failed (attempt {attempt + 1}/{retries}): {e}")
+                except Exception as e:
+                    print(f"[ERROR] LLM call failed (attempt {attempt + 1}/{retries}): {e}")
+                
+                    # Check if it's a rate limit error
+                    wait_time = _rate_limit_wait(limiter, e, attempt)
+                    if wait_time is not None and attempt < retries - 1:
+                        print(f"[INFO] Rate limited! Waiting {wait_time:.1f}s before retry...")
+                        time.sleep(wait_time)
+                        throttled += wait_time
+                        continue
+                
+                    # For other errors or last retry, raise
+                    if attempt == retries - 1:
+                        raise
+        finally:
+            if not settled:
+                limiter.release(reserved_tokens)
+    
+        return LLMResponse(content="")
+
+
+async def _consume_stream(stream: Any, on_token: Optional[TokenCallback]) -> LLMResponse:
+    """
+    Accumulate a streamed completion into an LLMResponse.
+    
+    Content deltas are forwarded to `on_token` as they arrive; tool call
+    fragments are merged by their index (id / name arrive first, the
+    arguments JSON may be split over several chunks).
+    """
+    content_parts: List[str] = []
+    partial_calls: Dict[int, Dict[str, Any]] = {}
+    usage: Dict[str, Optional[int]] = {}
+    
+    async for chunk in stream:
+        # Groq reports usage on the last chunk under x_groq, OpenAI-style APIs as chunk.usage
+        chunk_usage = getattr(chunk, "usage", None) or getattr(getattr(chunk, "x_groq", None), "usage", None)
+        if chunk_usage is not None:
+            usage = _usage_tokens(chunk_usage)
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+        
+        if delta.content:
+            content_parts.append(delta.content)
+            if on_token is not None:
+                await on_token(delta.content)
+        
+        for tc in delta.tool_calls or []:
+            call = partial_calls.setdefault(tc.index, {"id": None, "name": None, "arguments": ""})
+            if tc.id:
+                call["id"] = tc.id
+            if tc.function is not None:
+                if tc.function.name:
+                    call["name"] = tc.function.name
+                if tc.function.arguments:
+                    call["arguments"] += tc.function.arguments
+    
+    if partial_calls:
+        tool_calls = [
+            _parse_tool_call(call["id"], call["name"], call["arguments"])
+            for _, call in sorted(partial_calls.items())
+        ]
+        return LLMResponse(tool_calls=tool_calls, **usage)
+    
+    content = "".join(content_parts)
+    if not content.strip():
+        print(f"[WARNING] LLM returned empty content")
+    return LLMResponse(content=content, **usage)
+
+
+async def acall_llm_with_tools(
+    messages: List[Dict[str, Any]],
+    tools: Optional[List[Dict[str, Any]]] = None,
+    model: Optional[str] = None,
+    max_tokens: Optional[int] = None,  # Let API use default
+    temperature: float = 0.6,
+    retries: int = 3,
+    stream: bool = False,
+    on_token: Optional[TokenCallback] = None,
+    bypass_cache: bool = False,
+    provider: Optional[str] = None,
+    timeout_s: Optional[float] = None,
+) -> LLMResponse:
+    """
+    Async version of call_llm_with_tools().
+    
+    This is the primary function for agentic tool calling: while a request is
+    in flight the event loop is free to serve other runs, and rate limit
+    back-off uses asyncio.sleep instead of blocking a worker thread.
+    
+    Same arguments and return value as call_llm_with_tools(), plus:
+        stream: request a streamed completion; the returned LLMResponse is
+            the same as in non-streaming mode
+        on_token: async callback receiving each content delta (stream only)
+    
+    Streamed responses are not written to the response cache, but a
+    stream request is still served from it: on a hit the cached content
+    is passed to `on_token` as a single delta.
+    
+    Every attempt first waits for its slot in the provider's shared rate
+    limiter (app.llm.ratelimit); the estimated tokens are reserved by the
+    first attempt only and returned when the call fails. A rate limited call is only retried while
+    nothing has been streamed yet, so callers never see duplicated tokens.
+    
+    Example:
+        response = await acall_llm_with_tools(messages, tools=tool_schemas)
+        
+        async def on_token(delta): print(delta, end="")
+        response = await acall_llm_with_tools(messages, stream=True, on_token=on_token)
+    """
+    llm = get_provider(provider)
+    kwargs = _build_request_kwargs(llm, messages, tools, model, max_tokens, temperature)
+    
+    with span("llm.call", **_span_attributes(llm, kwargs, stream=stream)) as llm_span:
+        cache_key = _cache_key_for(llm, kwargs, bypass_cache)
+        cached = await _acache_lookup(cache_key)
+        if cached is not None:
+            response = _response_from_cache(cached)
+            if stream and on_token is not None and response.has_content:
+                await on_token(response.content)
+            return _traced(llm_span, response, cache_hit=True)
+        
+        limiter = get_rate_limiter(llm.name)
+        reserved_tokens = estimate_request_tokens(kwargs["messages"], kwargs.get("max_tokens"))
+        throttled = 0.0
+        # Tokens are reserved once per call (retries only take a request slot)
+        # and returned if no attempt succeeds - also when the call is cancelled
+        settled = False
+    
+        try:
+            for attempt in range(retries):
+                streamed_any = False
             
-            # Check if it's a rate limit error
-            if "rate" in error_str or "limit" in error_str or "429" in error_str:
-                if attempt < retries - 1:
-                    wait_time = (attempt + 1) * 5  # 5s, 10s, 15s
-                    print(f"[INFO] Rate limited! Waiting {wait_time}s before retry...")
-                    time.sleep(wait_time)
-                    continue
+                async def _tracking_on_token(delta: str) -> None:
+                    nonlocal streamed_any
+                    streamed_any = True
+                    if on_token is not None:
+                        await on_token(delta)
             
-            # For other errors or last retry, raise
-            if attempt == retries - 1:
-                raise
+                try:
+                    throttled += await limiter.aacquire(reserved_tokens if attempt == 0 else 0)
+                    if stream:
+                        chunks = await llm.acomplete(kwargs, stream=True, timeout=timeout_s)
+                        response = await _consume_stream(chunks, _tracking_on_token)
+                    else:
+                        resp = await llm.acomplete(kwargs, timeout=timeout_s)
+                        response = _parse_completion(resp)
+                    limiter.record_usage(reserved_tokens, response.total_tokens)
+                    settled = True
+                    if not stream and cache_key is not None:
+                        if LLM_CACHE.disk_path:
+                            await asyncio.to_thread(_cache_response, cache_key, response)
+                        else:
+                            _cache_response(cache_key, response)
+                    return _traced(llm_span, response, attempts=attempt + 1, throttled_s=throttled)
+                
+                except Exception as e:
+                    print(f"[ERROR] LLM call failed (attempt {attempt + 1}/{retries}): {e}")
+                    if streamed_any:
+                        raise
+                
+                    wait_time = _rate_limit_wait(limiter, e, attempt)
+                    if wait_time is not None and attempt < retries - 1:
+                        print(f"[INFO] Rate limited! Waiting {wait_time:.1f}s before retry...")
+                        await asyncio.sleep(wait_time)
+                        throttled += wait_time
+                        continue
+                
+                    if attempt == retries - 1:
+                        raise
+        finally:
+            if not settled:
+                limiter.release(reserved_tokens)
     
-    return LLMResponse(content="")
+        return LLMResponse(content="")
 
 
 def build_tool_result_message(tool_call_id: str, result: str) -> Dict[str, Any]:
@@ -0,0 +1,263 @@
+"""
+LLM providers behind call_llm_with_tools / acall_llm_with_tools.
+
+- "groq":   the groq SDK (api.groq.com, or LLM_BASE_URL)
+- "openai": any OpenAI-compatible chat-completions server over plain
+            HTTP (vLLM, llama.cpp, Ollama, LM Studio ... on the same box)
+
+Each provider owns one sync and one async httpx client with keep-alive
+and pool limits from settings (LLM_POOL_*), created on first use and
+shared by every call, so requests reuse warm connections instead of
+paying a TCP / TLS handshake each time.
+
+Selection: settings.LLM_PROVIDER by default, or per graph node with the
+node field "provider".
+
+Both providers return objects with the groq SDK's attribute shape
+(resp.choices[0].message.tool_calls[0].function.name, chunk.choices[0].delta ...)
+so client.py parses them the same way.
+"""
+
+import json
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+from groq import Groq, AsyncGroq
+
+from app.core.config import settings
+
+# Names accepted by get_provider() and by the "provider" field of graph nodes
+PROVIDER_NAMES = ("groq", "openai")
+
+
+class LLMProviderError(Exception):
+    """
+    Non-2xx answer from an OpenAI-compatible server.
+    Carries status_code, so rate limits (429) are retried like Groq's.
+    """
+    def __init__(self, status_code: int, message: str, headers: Optional[Dict[str, str]] = None):
+        super().__init__(f"HTTP {status_code}: {message}")
+        self.status_code = status_code
+        self.message = message
+        self.headers = headers or {}
+
+
+def _pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.LLM_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.LLM_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=settings.LLM_POOL_KEEPALIVE_SECONDS,
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(settings.LLM_REQUEST_TIMEOUT_SECONDS, connect=10.0)
+
+
+class LLMProvider(ABC):
+    """
+    Base class - a provider implements default_model, complete() and
+    acomplete() (an incomplete subclass fails when it is instantiated).
+
+    complete(kwargs)                -> completion (blocking)
+    acomplete(kwargs, stream=False) -> completion, or an async iterator of
+                                       chunks when stream=True
+    `kwargs` are chat.completions.create arguments (model, messages, tools ...);
+    `timeout` (seconds) overrides LLM_REQUEST_TIMEOUT_SECONDS for one request.
+    """
+    name = ""
+
+    @property
+    @abstractmethod
+    def default_model(self) -> str:
+        ...
+
+    @abstractmethod
+    def complete(self, kwargs: Dict[str, Any], timeout: Optional[float] = None) -> Any:
+        ...
+
+    @abstractmethod
+    async def acomplete(self, kwargs: Dict[str, Any], stream: bool = False, timeout: Optional[float] = None) -> Any:
+        ...
+
+    async def aclose(self) -> None:
+        pass
+
+
+class GroqProvider(LLMProvider):
+    name = "groq"
+
+    def __init__(self):
+        self._client: Optional[Groq] = None
+        self._async_client: Optional[AsyncGroq] = None
+        if settings.Groq_API_KEY:
+            self._client = Groq(
+                api_key=settings.Groq_API_KEY,
+                base_url=settings.LLM_BASE_URL,
+                http_client=httpx.Client(limits=_pool_limits(), timeout=_timeout()),
+            )
+            self._async_client = AsyncGroq(
+                api_key=settings.Groq_API_KEY,
+                base_url=settings.LLM_BASE_URL,
+                http_client=httpx.AsyncClient(limits=_pool_limits(), timeout=_timeout()),
+            )
+
+    @property
+    def default_model(self) -> str:
+        return settings.LLM_Model
+
+    def _check_configured(self) -> None:
+        if self._client is None:
+            raise ValueError("Groq API key not configured. Please set GROQ_API_KEY in your .env file.")
+
+    @staticmethod
+    def _request_options(timeout: Optional[float]) -> Dict[str, Any]:
+        return {"timeout": timeout} if timeout is not None else {}
+
+    def complete(self, kwargs: Dict[str, Any], timeout: Optional[float] = None) -> Any:
+        self._check_configured()
+        return self._client.chat.completions.create(**kwargs, **self._request_options(timeout))
+
+    async def acomplete(self, kwargs: Dict[str, Any], stream: bool = False, timeout: Optional[float] = None) -> Any:
+        self._check_configured()
+        options = self._request_options(timeout)
+        if stream:
+            return await self._async_client.chat.completions.create(**kwargs, stream=True, **options)
+        return await self._async_client.chat.completions.create(**kwargs, **options)
+
+    async def aclose(self) -> None:
+        if self._async_client is not None:
+            await self._async_client.close()
+        if self._client is not None:
+            self._client.close()
+
+
+class _Obj:
+    """ Read-only attribute view of a JSON object; missing keys read as None """
+    __slots__ = ("_data",)
+
+    def __init__(self, data: Dict[str, Any]):
+        self._data = data
+
+    def __getattr__(self, key: str) -> Any:
+        return _wrap(self._data.get(key))
+
+
+def _wrap(value: Any) -> Any:
+    if isinstance(value, dict):
+        return _Obj(value)
+    if isinstance(value, list):
+        return [_wrap(v) for v in value]
+    return value
+
+
+class OpenAICompatibleProvider(LLMProvider):
+    """ POST {OPENAI_COMPAT_BASE_URL}/chat/completions with httpx """
+    name = "openai"
+
+    def __init__(self):
+        self.base_url = (settings.OPENAI_COMPAT_BASE_URL or "").rstrip("/")
+        headers = {"Content-Type": "application/json"}
+        if settings.OPENAI_COMPAT_API_KEY:
+            headers["Authorization"] = f"Bearer {settings.OPENAI_COMPAT_API_KEY}"
+        self._http = httpx.Client(headers=headers, limits=_pool_limits(), timeout=_timeout())
+        self._async_http = httpx.AsyncClient(headers=headers, limits=_pool_limits(), timeout=_timeout())
+
+    @property
+    def default_model(self) -> str:
+        return settings.OPENAI_COMPAT_MODEL
+
+    @property
+    def _url(self) -> str:
+        if not self.base_url:
+            raise ValueError("OpenAI-compatible provider not configured. Please set OPENAI_COMPAT_BASE_URL in your .env file.")
+        return f"{self.base_url}/chat/completions"
+
+    @staticmethod
+    def _error(resp: httpx.Response, body: bytes) -> LLMProviderError:
+        try:
+            message = json.loads(body).get("error", {}).get("message") or body.decode("utf-8", "replace")
+        except Exception:
+            message = body.decode("utf-8", "replace")
+        return LLMProviderError(resp.status_code, message[:500], dict(resp.headers))
+
+    @staticmethod
+    def _request_options(timeout: Optional[float]) -> Dict[str, Any]:
+        return {"timeout": httpx.Timeout(timeout, connect=min(10.0, timeout))} if timeout is not None else {}
+
+    def complete(self, kwargs: Dict[str, Any], timeout: Optional[float] = None) -> Any:
+        resp = self._http.post(self._url, json=kwargs, **self._request_options(timeout))
+        if resp.status_code != 200:
+            raise self._error(resp, resp.content)
+        return _Obj(resp.json())
+
+    async def acomplete(self, kwargs: Dict[str, Any], stream: bool = False, timeout: Optional[float] = None) -> Any:
+        options = self._request_options(timeout)
+        if not stream:
+            resp = await self._async_http.post(self._url, json=kwargs, **options)
+            if resp.status_code != 200:
+                raise self._error(resp, resp.content)
+            return _Obj(resp.json())
+
+        payload = {**kwargs, "stream": True, "stream_options": {"include_usage": True}}
+        request = self._async_http.build_request("POST", self._url, json=payload, **options)
+        resp = await self._async_http.send(request, stream=True)
+        if resp.status_code != 200:
+            body = await resp.aread()
+            await resp.aclose()
+            raise self._error(resp, body)
+        return self._iter_chunks(resp)
+
+    @staticmethod
+    async def _iter_chunks(resp: httpx.Response) -> AsyncIterator[_Obj]:
+        """ Server-sent events -> chunk objects, until "data: [DONE]" """
+        try:
+            async for line in resp.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                yield _Obj(json.loads(data))
+        finally:
+            await resp.aclose()
+
+    async def aclose(self) -> None:
+        await self._async_http.aclose()
+        self._http.close()
+
+
+_PROVIDER_CLASSES = {
+    "groq": GroqProvider,
+    "openai": OpenAICompatibleProvider,
+}
+_providers: Dict[str, LLMProvider] = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider(name: Optional[str] = None) -> LLMProvider:
+    """
+    Shared provider instance for `name` (default settings.LLM_PROVIDER),
+    created on first use.
+
+    Raises ValueError for unknown provider names.
+    """
+    name = name or settings.LLM_PROVIDER
+    provider = _providers.get(name)
+    if provider is not None:
+        return provider
+    if name not in _PROVIDER_CLASSES:
+        raise ValueError(f"Unknown LLM provider '{name}' (expected one of {', '.join(PROVIDER_NAMES)})")
+    with _providers_lock:
+        if name not in _providers:
+            _providers[name] = _PROVIDER_CLASSES[name]()
+        return _providers[name]
+
+
+async def aclose_providers() -> None:
+    """ Close the pooled HTTP clients (app shutdown) """
+    for provider in list(_providers.values()):
+        await provider.aclose()
+    _providers.clear()
@@ -0,0 +1,281 @@
+"""
+Process-wide LLM rate limiter (requests / tokens per minute).
+
+Every LLM request goes through the limiter of its provider before it is
+sent, so concurrent runs share one budget instead of each discovering the
+provider's limit on its own and backing off in lock step.
+
+- two token buckets: requests (LLM_RATE_LIMIT_RPM) and tokens
+  (LLM_RATE_LIMIT_TPM), refilled continuously; 0 disables a bucket
+- reservations are made under a lock and may push a bucket below zero,
+  so callers are served in arrival order (FIFO) - a later caller's wait
+  includes the debt of everyone before it
+- a request reserves its estimated tokens (prompt chars / 4 + max_tokens)
+  once, on its first attempt - retries only take a request slot; the
+  estimate is corrected with the real usage once the response is in, or
+  returned with release() when every attempt failed
+- a 429 pauses the whole limiter for Retry-After (or the provider's
+  x-ratelimit-reset-* headers) plus jitter; without such a header the
+  retry waits an exponential back-off with full jitter
+
+Works for both the sync and the async client: acquire() sleeps with
+time.sleep, aacquire() with asyncio.sleep.
+"""
+
+import asyncio
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, List, Mapping, Optional
+
+import httpx
+from groq import RateLimitError
+
+from app.core.config import settings
+
+# Rough prompt estimate used for the reservation (corrected afterwards)
+CHARS_PER_TOKEN = 4
+
+# Completion tokens reserved when the request doesn't set max_tokens
+DEFAULT_COMPLETION_TOKENS = 512
+
+# Exponential back-off without Retry-After: base * 2^attempt, capped
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 30.0
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+def estimate_request_tokens(messages: List[Dict[str, Any]], max_tokens: Optional[int]) -> int:
+    """ Tokens a request will count against the TPM budget (prompt estimate + completion cap) """
+    chars = sum(len(m.get("content") or "") for m in messages)
+    return chars // CHARS_PER_TOKEN + 1 + (max_tokens or DEFAULT_COMPLETION_TOKENS)
+
+
+def _parse_duration(value: Optional[str]) -> Optional[float]:
+    """ Seconds of a header value: "7", "7.5", "2m59.56s", "450ms" ... (None if unparsable) """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    scale = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+    return sum(float(amount) * scale[unit] for amount, unit in parts)
+
+
+def retry_after_from_headers(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """
+    Seconds the provider asks us to wait: Retry-After, else the reset time
+    of whichever x-ratelimit bucket is exhausted. None when not present.
+    """
+    if not headers:
+        return None
+    lowered = {str(k).lower(): v for k, v in headers.items()}
+    retry_after = _parse_duration(lowered.get("retry-after"))
+    if retry_after is not None:
+        return retry_after
+
+    waits = []
+    for bucket in ("requests", "tokens"):
+        remaining = lowered.get(f"x-ratelimit-remaining-{bucket}")
+        if remaining is not None and str(remaining).strip() in ("0", "0.0"):
+            reset = _parse_duration(lowered.get(f"x-ratelimit-reset-{bucket}"))
+            if reset is not None:
+                waits.append(reset)
+    return max(waits) if waits else None
+
+
+def error_headers(error: Exception) -> Optional[Mapping[str, str]]:
+    """ Response headers carried by an SDK / provider exception, if any """
+    headers = getattr(error, "headers", None)
+    if headers:
+        return headers
+    response = getattr(error, "response", None)
+    return getattr(response, "headers", None)
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """
+    Whether the provider answered HTTP 429: the Groq SDK's RateLimitError, an
+    error with status_code 429 (LLMProviderError ...) or an httpx
+    HTTPStatusError for a 429 response. The error text is never inspected -
+    "limit exceeded for context length" is not a rate limit.
+    """
+    if isinstance(error, RateLimitError):
+        return True
+    if getattr(error, "status_code", None) == 429:
+        return True
+    return isinstance(error, httpx.HTTPStatusError) and error.response.status_code == 429
+
+
+def backoff_seconds(attempt: int, retry_after: Optional[float] = None) -> float:
+    """
+    Wait before retry number `attempt` (0 based).
+    Retry-After + up to 10% jitter when the provider told us, else full
+    jitter over an exponential window.
+    """
+    if retry_after is not None:
+        return retry_after + random.uniform(0, max(0.1, retry_after * 0.1))
+    window = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt))
+    return random.uniform(0, window)
+
+
+class _Bucket:
+    """ Token bucket holding up to `per_minute`, refilled at per_minute / 60 per second """
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = float(per_minute)
+
+    def refill(self, elapsed: float) -> None:
+        self.level = min(self.capacity, self.level + elapsed * self.rate)
+
+    def take(self, amount: float) -> float:
+        """ Deduct `amount` (the level may go negative); seconds until it is covered """
+        amount = min(amount, self.capacity)  # a single oversize request must not wait forever
+        self.level -= amount
+        return 0.0 if self.level >= 0 else -self.level / self.rate
+
+
+class RateLimiter:
+    """
+    Usage:
+        limiter = get_rate_limiter("groq")
+        await limiter.aacquire(estimated_tokens)     # or limiter.acquire() in sync code
+        ...
+        limiter.record_usage(estimated_tokens, actual_tokens)
+        # or, if the request failed without usage:
+        limiter.release(estimated_tokens)
+        # on a 429:
+        wait = limiter.rate_limited(attempt, retry_after_from_headers(error_headers(e)))
+    """
+    def __init__(self, name: str, rpm: int, tpm: int):
+        self.name = name
+        self._requests = _Bucket(rpm) if rpm > 0 else None
+        self._tokens = _Bucket(tpm) if tpm > 0 else None
+        self._lock = threading.Lock()
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        # metrics
+        self.requests = 0
+        self.delayed = 0
+        self.wait_seconds = 0.0
+        self.rate_limited_count = 0
+        self.waiting = 0
+
+    def _refill(self, now: float) -> None:
+        # Caller holds the lock
+        elapsed = now - self._updated
+        self._updated = now
+        for bucket in (self._requests, self._tokens):
+            if bucket is not None:
+                bucket.refill(elapsed)
+
+    def reserve(self, tokens: int) -> float:
+        """ Reserve one request + `tokens`; returns the seconds to wait before sending """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = max(0.0, self._paused_until - now)
+            if self._requests is not None:
+                wait = max(wait, self._requests.take(1))
+            if self._tokens is not None:
+                wait = max(wait, self._tokens.take(tokens))
+            self.requests += 1
+            if wait > 0:
+                self.delayed += 1
+                self.wait_seconds += wait
+            return wait
+
+    def record_usage(self, reserved_tokens: int, actual_tokens: Optional[int]) -> None:
+        """ Correct the token bucket once the real usage of a request is known """
+        if self._tokens is None or actual_tokens is None:
+            return
+        with self._lock:
+            self._tokens.level = min(self._tokens.capacity, self._tokens.level + reserved_tokens - actual_tokens)
+
+    def release(self, reserved_tokens: int) -> None:
+        """ Return the tokens of a request that failed without usage (429, timeout, 5xx, cancelled) """
+        self.record_usage(reserved_tokens, 0)
+
+    def rate_limited(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        The provider answered 429: pause every caller until the limit resets
+        and return the back-off (with jitter) before this caller retries.
+        """
+        wait = backoff_seconds(attempt, retry_after)
+        with self._lock:
+            self.rate_limited_count += 1
+            if retry_after is not None:
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+        return wait
+
+    def stats(self) -> Dict[str, Any]:
+        """ Current budget and counters for monitoring """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            return {
+                "rpm_limit": int(self._requests.capacity) if self._requests else None,
+                "tpm_limit": int(self._tokens.capacity) if self._tokens else None,
+                "requests_available": round(self._requests.level, 2) if self._requests else None,
+                "tokens_available": round(self._tokens.level, 1) if self._tokens else None,
+                "paused_for_s": round(max(0.0, self._paused_until - now), 3),
+                "waiting": self.waiting,
+                "requests": self.requests,
+                "delayed": self.delayed,
+                "wait_seconds_total": round(self.wait_seconds, 3),
+                "rate_limited": self.rate_limited_count,
+            }
+
+    def _set_waiting(self, delta: int) -> None:
+        with self._lock:
+            self.waiting += delta
+
+    def acquire(self, tokens: int) -> float:
+        """ reserve() and block until the reservation is due; returns the seconds waited """
+        wait = self.reserve(tokens)
+        if wait > 0:
+            self._set_waiting(1)
+            try:
+                time.sleep(wait)
+            finally:
+                self._set_waiting(-1)
+        return wait
+
+    async def aacquire(self, tokens: int) -> float:
+        """ Async acquire(): waits with asyncio.sleep so the event loop keeps serving other runs """
+        wait = self.reserve(tokens)
+        if wait > 0:
+            self._set_waiting(1)
+            try:
+                await asyncio.sleep(wait)
+            finally:
+                self._set_waiting(-1)
+        return wait
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str) -> RateLimiter:
+    """ Shared limiter of a provider (limits from LLM_RATE_LIMIT_RPM / _TPM) """
+    limiter = _limiters.get(provider)
+    if limiter is not None:
+        return limiter
+    with _limiters_lock:
+        if provider not in _limiters:
+            _limiters[provider] = RateLimiter(provider, settings.LLM_RATE_LIMIT_RPM, settings.LLM_RATE_LIMIT_TPM)
+        return _limiters[provider]
+
+
+def rate_limit_stats() -> Dict[str, Any]:
+    """ stats() of every limiter created so far, by provider """
+    return {name: limiter.stats() for name, limiter in list(_limiters.items())}
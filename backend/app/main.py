@@ -1,11 +1,19 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.db.session import engine
-from app.db.base import Base
+from app.db.session import engine, dispose_async_engine, pool_stats
+from app.db.base import Base, ensure_columns, ensure_indexes
 from app.db import models
 from app.routers import assistants, run, chats, tools, mcp_servers
 from app.routers import google_oauth
+from app.services.run_queue import RUN_QUEUE
+from app.services.tool_resolver import tool_plan_cache_stats
+from app.core.http import aclose_http_client
+from app.core.tracing import flush_tracing
+from app.llm.client import llm_cache_stats
+from app.llm.providers import aclose_providers
+from app.llm.ratelimit import rate_limit_stats
+from app.tools.definitions import TOOL_REGISTRY
 
 
 app = FastAPI(title= "multi-agent")
@@ -19,6 +27,7 @@ app.add_middleware(
 )
 app.include_router(assistants.router)
 app.include_router(run.router)
+app.include_router(run.runs_router)
 app.include_router(chats.router)
 app.include_router(tools.router)
 app.include_router(mcp_servers.router)
@@ -28,8 +37,46 @@ app.include_router(google_oauth.router)
 @app.on_event("startup")
 def on_startup():
     Base.metadata.create_all(bind=engine)
+    ensure_columns(engine)
+    ensure_indexes(engine)
+
+
+@app.on_event("startup")
+async def start_run_queue():
+    await RUN_QUEUE.start()
+
+
+@app.on_event("shutdown")
+async def stop_run_queue():
+    await RUN_QUEUE.stop()
+    await aclose_providers()
+    await aclose_http_client()
+    await dispose_async_engine()
+    flush_tracing()
     
     
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
+
+
+@app.get("/health/cache")
+def cache_stats():
+    """ Hit / miss counters of the LLM response cache, the tool result cache and the tool plan cache """
+    return {
+        "llm": llm_cache_stats(),
+        "tools": TOOL_REGISTRY.cache.stats() if TOOL_REGISTRY.cache is not None else {"enabled": False},
+        "tool_plans": tool_plan_cache_stats(),
+    }
+
+
+@app.get("/health/rate-limit")
+def rate_limit_health():
+    """ Budget left, queued callers, throttling and 429 counters of the LLM rate limiters """
+    return rate_limit_stats()
+
+
+@app.get("/health/db-pool")
+def db_pool_health():
+    """ Connection pool utilisation and checkout wait times (sync engine, and async when enabled) """
+    return pool_stats()
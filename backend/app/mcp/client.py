@@ -1,10 +1,12 @@
 from difflib import restore
 from importlib import invalidate_caches
 from typing import Any, Dict, List, Optional
+import httpx
 import requests
 from sqlalchemy import false, true
 import json 
 
+from app.core.http import get_http_client
 from app.db.models import MCPServer
 
 
@@ -188,4 +190,55 @@ def call_mcp_tool(
         try:
             return json.dumps(results, indent = 2, ensure_ascii = False)
         except Exception as e:
-            return str(result)
\ No newline at end of file
+            return str(result)
+
+
+async def acall_mcp_tool(
+    server: MCPServer,
+    tool_name: str,
+    arguments: Dict[str, Any],
+)-> str:
+    """ 
+    Async version of call_mcp_tool() used by the agent runtime.
+    
+    Same wire protocol ({endpoint}/call with tool/arguments/config and an
+    {"ok": ..., "result": ..., "error": ...} envelope) and the same
+    MCPClientError semantics, but the HTTP request does not block the
+    event loop.
+    """
+    
+    base_url = server.endpoint.rstrip("/")
+    url = f"{base_url}/call"
+    
+    payload: Dict[str, Any] = {
+        "tool": tool_name,
+        "arguments": arguments,
+        "config": server.config_json or {},
+    }
+    
+    try:
+        resp = await get_http_client().post(url, json=payload, timeout=30)
+    except Exception as e:
+        raise MCPClientError(f"Failed to call MCp tool '{tool_name}' at {url}: {e}")
+    
+    if resp.status_code != 200:
+        raise MCPClientError(f"MCP server returned {resp.status_code} for {url}: {resp.text}")
+    
+    try:
+        data = resp.json()
+    except ValueError as e:
+        raise MCPClientError(f"Invalid JSON response from mcp server at {url}: {e}")
+    
+    ok = data.get("ok",False)
+    if not ok:
+        error_msg = data.get("error") or "Unknown MCP tool error" 
+        raise MCPClientError(f"MCP tool '{tool_name}' failed: {error_msg}")
+    result = data.get("result")
+    
+    # Normalize results to a string so we can pass it easily to the LLM
+    if isinstance(result,str):
+        return result
+    try:
+        return json.dumps(result, indent = 2, ensure_ascii = False)
+    except Exception:
+        return str(result)
@@ -7,6 +7,8 @@ from sqlalchemy.orm import Session
 from app.db.models import Assistant, Run, Message, Chat
 from app.schemas import AssistantCreate, AssistantRead, AssistantGraphUpdate
 from app.db.session import get_db
+from app.agents.graph import validate_graph, GraphValidationError
+from app.services.tool_resolver import invalidate_assistant_tools
 
 
 
@@ -138,6 +140,7 @@ def delete_assistant(
     # Cascade delete handles runs, chats, and messages automatically
     db.delete(assistant)
     db.commit()
+    invalidate_assistant_tools(assistant_id)
     
     return None
     
@@ -158,7 +161,10 @@ def update_assistant_graph(
                     "id":"planner",
                     "role":"planner",
                     "system_prompt":"your workflow plan",
-                    "tool_ids":[1,2,3]
+                    "tool_ids":[1,2,3],
+                    "model":"llama-3.1-8b-instant",   # optional LLM overrides:
+                    "max_tokens":400,                 # model, max_tokens, temperature,
+                    "temperature":0.2                 # timeout_s, provider
                 }
             ],
             "edges":[...]
@@ -168,11 +174,19 @@ def update_assistant_graph(
     assistant = db.query(Assistant).filter(Assistant.id == assistant_id).first()
     if not assistant:
         raise HTTPException(status_code=404, detail="Assistant not found")
+    
+    # Reject graphs the runtime cannot schedule (cycles, dangling edges ...)
+    try:
+        validate_graph(payload.graph_json)
+    except GraphValidationError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    
     assistant.graph_json = payload.graph_json
     assistant.updated_at = datetime.now()
     
     db.add(assistant)
     db.commit()
     db.refresh(assistant)
+    invalidate_assistant_tools(assistant_id)
     return assistant
     
\ No newline at end of file
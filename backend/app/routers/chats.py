@@ -1,7 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session, joinedload
 from app.db.session import get_db
 from app.db.models import Chat, Run, Message
+from app.schemas.schemas import ChatRead, MessagePage, MessageRead, RunWithMessages
+from app.services.chat_history import load_message_page
+
+# Page size of the chat transcript API
+MESSAGE_PAGE_DEFAULT = 50
+MESSAGE_PAGE_MAX = 200
 
 router = APIRouter(prefix="/assistants", tags=["chats"])
 
@@ -15,7 +22,10 @@ def list_chats(
 
 @router.get("/{assistant_id}/chats/{chat_id}")
 def get_chat(assistant_id: int, chat_id: int, db: Session = Depends(get_db)):
-    """Get chat with all runs and messages using eager loading (single query)."""
+    """
+    Get chat with all runs and messages using eager loading (single query).
+    Loads the whole transcript - long chats should use GET .../messages (paged).
+    """
     chat = db.query(Chat).filter(
         Chat.id == chat_id, 
         Chat.assistant_id == assistant_id
@@ -26,18 +36,62 @@ def get_chat(assistant_id: int, chat_id: int, db: Session = Depends(get_db)):
     
     # Use eager loading to fetch runs with messages in fewer queries
     runs = db.query(Run).options(
-        joinedload(Run.messages)
+        joinedload(Run.messages).selectinload(Message.blob)
     ).filter(Run.chat_id == chat_id).order_by(Run.created_at).all()
     
     # Flatten messages from all runs, sorted by creation time
     all_messages = []
     for run in runs:
         all_messages.extend(sorted(run.messages, key=lambda m: m.created_at))
-        
+    
+    # Serialise through the schemas: Message.content is a property over the
+    # stored columns (compressed bodies live in message_blobs)
+    return {
+        "chat": ChatRead.model_validate(chat),
+        "runs": [RunWithMessages.model_validate(run) for run in runs],
+        "messages": [MessageRead.model_validate(m) for m in all_messages],
+    }
+    
+@router.get("/{assistant_id}/chats/{chat_id}/messages", response_model=MessagePage)
+def list_chat_messages(
+    assistant_id: int,
+    chat_id: int,
+    before_id: Optional[int] = None,
+    after_id: Optional[int] = None,
+    limit: int = Query(MESSAGE_PAGE_DEFAULT, ge=1, le=MESSAGE_PAGE_MAX),
+    metadata_only: bool = False,
+    db: Session = Depends(get_db),
+):
+    """
+    One page of a chat's messages (keyset pagination, ascending id order).
+    
+    - no cursor: the latest `limit` messages (load this first)
+    - before_id: older messages, pass the previous page's before_id
+    - after_id: newer messages, pass the previous page's after_id
+    - metadata_only: leave out the content (content_chars + content_preview instead)
+    """
+    if before_id is not None and after_id is not None:
+        raise HTTPException(status_code=400, detail="Use either before_id or after_id, not both")
+    
+    chat_exists = db.query(Chat.id).filter(
+        Chat.id == chat_id,
+        Chat.assistant_id == assistant_id
+    ).first()
+    if not chat_exists:
+        raise HTTPException(status_code=404, detail="Chat not found")
+    
+    messages, has_more = load_message_page(
+        db, chat_id, limit,
+        before_id=before_id,
+        after_id=after_id,
+        with_content=not metadata_only,
+    )
     return {
-        "chat": chat,
-        "runs": runs,
-        "messages": all_messages,
+        "chat_id": chat_id,
+        "messages": messages,
+        "has_more": has_more,
+        "before_id": messages[0]["id"] if messages else before_id,
+        "after_id": messages[-1]["id"] if messages else after_id,
     }
     
 @router.delete("/{assistant_id}/chats/{chat_id}", status_code=204)
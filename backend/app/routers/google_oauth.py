@@ -5,6 +5,7 @@ from sqlalchemy.orm import Session
 
 from app.db.session import get_db
 from app.services.google_oauth import generate_google_oauth_url, exchange_code_for_tokens
+from app.services.tool_resolver import invalidate_tool_plans
 from app.core.config import settings
 from app.db import models
 
@@ -80,6 +81,7 @@ def google_callback(
                         
                         tool.status = "connected"
                         db.commit()
+                        invalidate_tool_plans("user_tool", tool.id)
                         
                         # redirect to frontend with success
                         frontend_url = f"{settings.Frontend_URL}/studio?success=gmail_connected"
@@ -89,6 +91,7 @@ def google_callback(
                         print(f"[WARNING] OAuth succeeded but email fetch failed: {e}")
                         tool.status = "connected"  # Still mark as connected, OAuth worked
                         db.commit()
+                        invalidate_tool_plans("user_tool", tool.id)
                         frontend_url = f"{settings.Frontend_URL}/studio?success=gmail_connected&warning=email_verification_failed"
                         return RedirectResponse(url=frontend_url)
                 
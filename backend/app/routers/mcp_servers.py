@@ -4,6 +4,7 @@ from typing import List, Dict, Any
 from sqlalchemy.orm import Session
 from app.db.session import get_db
 from app.services.mcp_tools import refresh_mcp_server_tools
+from app.services.tool_resolver import invalidate_tool_plans
 from app.db.models import MCPServer, MCPTool
 from app import schemas
 from app.db import models
@@ -46,6 +47,8 @@ def create_mcp_server(payload:MCPServerCreate, db:Session=Depends(get_db)):
     db.add(server)
     db.commit()
     db.refresh(server)
+    # A graph may already reference this id
+    invalidate_tool_plans("mcp_server", server.id)
     return server
     
     
@@ -112,4 +115,5 @@ def delete_mcp_server(server_id: int, db: Session = Depends(get_db)):
     # Delete the server
     db.delete(server)
     db.commit()
+    invalidate_tool_plans("mcp_server", server_id)
     return None
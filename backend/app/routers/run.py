@@ -1,113 +1,263 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
+import asyncio
+import json
+
+import anyio
 
 from typing import Dict, Any, Optional, List
-from app.db.session import get_db
-from app.db.models import Assistant, Run, Message, Chat
-from app.schemas.schemas import RunCreate, RunWithMessages
-from app.agents.runtime import run_assistant_graph
+from app.db.session import get_db, SessionLocal, AsyncSessionLocal
+from app.db.models import Run, Message, RunStep
+from app.schemas.schemas import RunCreate, RunWithMessages, RunTimeline, RunStepRead
 from app.schemas import RunRead, MessageRead
-from app.services.tool_resolver import resolve_tools_for_assistant
+from app.services.run_executor import (
+    create_run,
+    execute_run,
+    fail_run,
+    build_run_response,
+    error_message_from_exception,
+    run_response,
+    RunFailedError,
+)
+from app.services.run_queue import RUN_QUEUE, RunQueueFullError
 
 
 router = APIRouter(prefix="/assistants", tags=["runs"])
 
+# Run lookups that are not scoped to an assistant (status polling)
+runs_router = APIRouter(prefix="/runs", tags=["runs"])
+
 
 @router.post("/{assistant_id}/runs",response_model=RunWithMessages)
-def create_run_for_assistant(
+async def create_run_for_assistant(
     assistant_id: int,
     payload: RunCreate,
     db: Session = Depends(get_db),
 ):
-    assistant = db.query(Assistant).filter(Assistant.id == assistant_id).first()
-    if not assistant:
-        raise HTTPException(status_code=404, detail="Assistant not found")
-    chat_id = payload.chat_id
-
-    if chat_id:
-        chat = db.query(Chat).filter(Chat.id == chat_id).first()
-        if not chat:
-            raise HTTPException(status_code=404, detail="Chat not found")
-        
-    else:
-        chat = Chat(assistant_id = assistant.id,
-                    title = payload.input_text[:50],)
-        db.add(chat)
-        db.commit()
-        db.refresh(chat)
-        
-    previous_messages = []
-    
-    if chat_id:
-        previous_runs = db.query(Run).filter(Run.chat_id == chat_id).all()
-        for run in previous_runs:
-            run_messages = db.query(Message).filter(Message.run_id == run.id).order_by(Message.created_at).all()
-            previous_messages.extend(run_messages)
-            
-    run = Run(assistant_id = assistant.id,
-              chat_id = chat.id,
-              status = "running",
-              input_text = payload.input_text,
-              created_at = datetime.utcnow(),
-              completed_at = None,
-              error_message = None,
-              )
-    db.add(run)
-    db.commit()
-    db.refresh(run)
-    
-    tools_by_agent = resolve_tools_for_assistant(db=db, assistant=assistant)
+    """
+    POST /assistants/{assistant_id}/runs
+    
+    Async endpoint: the graph runs on the event loop (LLM + tool I/O is
+    awaited) and only the short DB steps are pushed to the threadpool, so a
+    long run no longer pins a worker thread for its whole duration.
+    """
+    assistant, run = await run_in_threadpool(create_run, db, assistant_id, payload)
     
     try:
-        messages = run_assistant_graph(db=db, assistant=assistant, run=run,previous_messages=previous_messages,tools_by_agent=tools_by_agent)
-    except Exception as e:
-        run.status = "failed"
-        error_msg = str(e)
-        # Extract more detailed error message for Groq API errors
-        if hasattr(e, 'body') and hasattr(e.body, 'get'):
-            try:
-                error_body = e.body
-                if isinstance(error_body, dict) and 'error' in error_body:
-                    error_detail = error_body['error']
-                    if isinstance(error_detail, dict) and 'message' in error_detail:
-                        error_msg = error_detail['message']
-            except:
-                pass
-        elif hasattr(e, 'message'):
-            error_msg = str(e.message)
-        run.error_message = error_msg
-        run.completed_at = datetime.utcnow()
-        db.add(run)
-        db.commit()
-        db.refresh(run)
-        raise HTTPException(status_code=500, detail=error_msg)
-
-    # Make sure run is refreshed (status 'completed')
-    db.refresh(run)
-    message_reads = [MessageRead.model_validate(m) for m in messages]
-    
-    # Return flat structure matching RunWithMessages schema
-    return RunWithMessages(
-        id=run.id,
-        assistant_id=run.assistant_id,
-        chat_id=run.chat_id,
-        status=run.status,
-        input_text=run.input_text,
-        created_at=run.created_at,
-        completed_at=run.completed_at,
-        error_message=run.error_message,
-        messages=message_reads,
-    )
-            
+        messages = await execute_run(db, assistant, run)
+    except RunFailedError as e:
+        raise HTTPException(status_code=500, detail=e.message)
+
+    return await run_in_threadpool(build_run_response, db, run, messages)
 
 
+@router.post("/{assistant_id}/runs/enqueue", response_model=RunRead, status_code=status.HTTP_202_ACCEPTED)
+async def enqueue_run_for_assistant(
+    assistant_id: int,
+    payload: RunCreate,
+    db: Session = Depends(get_db),
+):
+    """
+    POST /assistants/{assistant_id}/runs/enqueue
+    
+    Create the Run with status "queued" and return immediately; a
+    background worker executes it. Poll GET /runs/{run_id} for progress
+    and results.
+    
+    Returns 429 with a Retry-After header when the queue is full.
+    """
+    if RUN_QUEUE.is_full:
+        retry_after = RUN_QUEUE.retry_after_seconds()
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Run queue is full, please retry later",
+            headers={"Retry-After": str(retry_after)},
+        )
+    
+    _, run = await run_in_threadpool(create_run, db, assistant_id, payload, "queued")
+    
+    try:
+        RUN_QUEUE.submit(run.id)
+    except RunQueueFullError as e:
+        # Lost the race for the last slot while the row was being created
+        await run_in_threadpool(fail_run, db, run, "Run queue is full")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Run queue is full, please retry later",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    
+    return run
+
+
+@runs_router.get("/{run_id}", response_model=RunWithMessages)
+async def get_run(run_id: int):
+    """
+    GET /runs/{run_id}
+    
+    Status of a run (queued / running / completed / failed) with the
+    messages produced so far. Polled by clients, so it uses the async
+    engine when enabled (no worker thread per poll).
+    """
+    if AsyncSessionLocal is None:
+        return await run_in_threadpool(_get_run_sync, run_id)
+    
+    async with AsyncSessionLocal() as db:
+        run = await db.get(Run, run_id)
+        if not run:
+            raise HTTPException(status_code=404, detail="Run not found")
+        result = await db.execute(
+            select(Message)
+            .options(selectinload(Message.blob))
+            .where(Message.run_id == run.id)
+            .order_by(Message.created_at, Message.id)
+        )
+        return run_response(run, result.scalars().all())
+
 
+def _get_run_sync(run_id: int) -> RunWithMessages:
+    db = SessionLocal()
+    try:
+        run = db.query(Run).filter(Run.id == run_id).first()
+        if not run:
+            raise HTTPException(status_code=404, detail="Run not found")
+        messages = (
+            db.query(Message)
+            .options(selectinload(Message.blob))
+            .filter(Message.run_id == run.id)
+            .order_by(Message.created_at, Message.id)
+            .all()
+        )
+        return run_response(run, messages)
+    finally:
+        db.close()
 
 
+@runs_router.get("/{run_id}/timeline", response_model=RunTimeline)
+def get_run_timeline(run_id: int, db: Session = Depends(get_db)):
+    """
+    GET /runs/{run_id}/timeline
+    
+    Every LLM call and tool call of the run (agent, start / end, duration,
+    tokens, result size, error) in start order, plus totals - to see where
+    the time of a slow run went.
+    """
+    run = db.query(Run).filter(Run.id == run_id).first()
+    if not run:
+        raise HTTPException(status_code=404, detail="Run not found")
+    steps = db.query(RunStep).filter(RunStep.run_id == run.id).order_by(RunStep.started_at, RunStep.id).all()
+    
+    wall_time_ms = None
+    if run.completed_at:
+        wall_time_ms = (run.completed_at - run.created_at).total_seconds() * 1000
+    
+    return RunTimeline(
+        run_id=run.id,
+        status=run.status,
+        created_at=run.created_at,
+        completed_at=run.completed_at,
+        wall_time_ms=wall_time_ms,
+        llm_time_ms=sum(s.duration_ms for s in steps if s.step_type == "llm"),
+        tool_time_ms=sum(s.duration_ms for s in steps if s.step_type == "tool"),
+        prompt_tokens=sum(s.prompt_tokens or 0 for s in steps),
+        completion_tokens=sum(s.completion_tokens or 0 for s in steps),
+        steps=[RunStepRead.model_validate(s) for s in steps],
+    )
 
 
+def _fail_run_after_error(db: Session, run: Run, error_msg: str) -> None:
+    """ fail_run() on a session whose last transaction may have failed (blocking) """
+    db.rollback()
+    fail_run(db, run, error_msg)
 
 
+def _format_sse(event: Dict[str, Any]) -> str:
+    """ Encode one run event as a Server-Sent Events frame """
+    return f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
 
 
+@router.post("/{assistant_id}/runs/stream")
+async def stream_run_for_assistant(
+    assistant_id: int,
+    payload: RunCreate,
+):
+    """
+    POST /assistants/{assistant_id}/runs/stream
+    
+    Same as POST /assistants/{assistant_id}/runs but answers with a
+    text/event-stream that is fed while the graph runs:
+    
+        event: run_started      data: {"run_id", "chat_id"}
+        event: agent_started    data: {"agent_id", "role"}
+        event: token            data: {"agent_id", "delta"}
+        event: tool_call        data: {"agent_id", "tool_call_id", "name", "arguments"}
+        event: tool_result      data: {"agent_id", "tool_call_id", "name", "result"}
+        event: agent_completed  data: {"agent_id", "message_id", "content", "tools_used"}
+        event: run_completed    data: {"run": RunWithMessages}
+        event: run_failed       data: {"error"}
+    
+    The session is owned by the stream (not Depends(get_db)) because it
+    has to outlive the handler while the response body is produced. Every
+    stream ends with run_completed or run_failed (any error marks the run
+    failed); if the client disconnects, the run is cancelled and marked failed.
+    """
+    db = SessionLocal()
+    try:
+        assistant, run = await run_in_threadpool(create_run, db, assistant_id, payload)
+    except Exception:
+        db.close()
+        raise
+    
+    queue: asyncio.Queue = asyncio.Queue()
+    
+    async def on_event(event: Dict[str, Any]) -> None:
+        await queue.put(event)
+    
+    async def drive_run() -> None:
+        try:
+            messages = await execute_run(db, assistant, run, on_event=on_event)
+            response = await run_in_threadpool(build_run_response, db, run, messages)
+            await queue.put({"type": "run_completed", "run": response.model_dump(mode="json")})
+        except RunFailedError as e:
+            await queue.put({"type": "run_failed", "error": e.message})
+        except Exception as e:
+            # Failed outside the graph (building the response, a DB error on the
+            # final commit): the client still gets a terminal event
+            error_msg = error_message_from_exception(e)
+            try:
+                await run_in_threadpool(_fail_run_after_error, db, run, error_msg)
+            except Exception as db_error:
+                print(f"[ERROR] Could not mark run {run.id} failed: {db_error}")
+            await queue.put({"type": "run_failed", "error": error_msg})
+        finally:
+            await queue.put(None)
+    
+    async def event_stream():
+        task = asyncio.create_task(drive_run())
+        try:
+            yield _format_sse({"type": "run_started", "run_id": run.id, "chat_id": run.chat_id})
+            while True:
+                event = await queue.get()
+                if event is None:
+                    break
+                yield _format_sse(event)
+        finally:
+            # On a client disconnect the stream's own scope is cancelled too:
+            # shield the wait so the run is marked failed before the session closes
+            with anyio.CancelScope(shield=True):
+                if not task.done():
+                    task.cancel()
+                    try:
+                        await task
+                    except (asyncio.CancelledError, Exception):
+                        pass
+                db.close()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -11,6 +11,7 @@ from app.schemas.tools import (
     GmailConnectRequest,
 )
 from app.services.google_oauth import generate_google_oauth_url, verify_gmail_credentials, refresh_gmail_tokens
+from app.services.tool_resolver import invalidate_tool_plans
 
 router = APIRouter(prefix="/tools", tags=["tools"])
 
@@ -51,6 +52,8 @@ def create_user_tool(payload: UserToolConnectionCreate, db: Session = Depends(ge
         db.add(tool)
         db.commit()
         db.refresh(tool)
+        # A graph may already reference this id
+        invalidate_tool_plans("user_tool", tool.id)
         
         return tool
     except Exception as e:
@@ -74,6 +77,7 @@ def delete_user_tool(tool_id: int, db:Session = Depends(get_db)):
         )
     db.delete(tool)
     db.commit()
+    invalidate_tool_plans("user_tool", tool_id)
     return tool
 
 @router.delete("/",status_code=status.HTTP_204_NO_CONTENT)
@@ -81,6 +85,7 @@ def delete_all_tools(db:Session = Depends(get_db)):
     """ delete all user tool connections"""
     db.query(models.UserToolConnection).delete()
     db.commit()
+    invalidate_tool_plans("user_tool")
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
@@ -104,6 +109,7 @@ def connect_gmail_tool(
     db.add(tool)
     db.commit()
     db.refresh(tool)
+    invalidate_tool_plans("user_tool", tool.id)
     
     # Generate OAuth URL using backend's configured credentials
     state = f"gmail_tool_{tool.id}"
@@ -195,6 +201,7 @@ def verify_gmail_tool(tool_id: int, db: Session = Depends(get_db)):
             tool.status = "connected"
             db.commit()
             db.refresh(tool)
+            invalidate_tool_plans("user_tool", tool.id)
             
             return GmailConnectResponse(
                 id=tool.id,
@@ -213,6 +220,7 @@ def verify_gmail_tool(tool_id: int, db: Session = Depends(get_db)):
             auth_url = generate_google_oauth_url(state)
             db.commit()
             db.refresh(tool)
+            invalidate_tool_plans("user_tool", tool.id)
             
             return GmailConnectResponse(
                 id=tool.id,
@@ -231,6 +239,7 @@ def verify_gmail_tool(tool_id: int, db: Session = Depends(get_db)):
         auth_url = generate_google_oauth_url(state)
         db.commit()
         db.refresh(tool)
+        invalidate_tool_plans("user_tool", tool.id)
         
         return GmailConnectResponse(
             id=tool.id,
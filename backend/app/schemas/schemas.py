@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Union
 from pydantic import BaseModel, Field
 
 
@@ -70,6 +70,34 @@ class MessageRead(BaseModel):
     
     class Config:
         from_attributes = True
+
+
+class MessageMetaRead(BaseModel):
+    """ A message without its body, length + preview only (GET /assistants/{id}/chats/{chat_id}/messages?metadata_only=true) """
+    id: int
+    run_id: int
+    sender: str
+    content_chars: int
+    content_preview: Optional[str] = None
+    message_metadata: Optional[Any] = None
+    created_at: datetime
+
+
+class MessagePage(BaseModel):
+    """
+    Response returned by:
+    GET /assistants/{id}/chats/{chat_id}/messages
+    
+    messages are in ascending id order. has_more tells whether more messages
+    exist in the direction requested (older ones for the latest page and
+    before_id, newer ones for after_id); before_id / after_id are the cursors
+    for the next older / newer page (an empty page echoes the request's cursor).
+    """
+    chat_id: int
+    messages: List[Union[MessageRead, MessageMetaRead]]
+    has_more: bool
+    before_id: Optional[int] = None
+    after_id: Optional[int] = None
         
         
 # Run Schemas
@@ -108,6 +136,43 @@ class RunWithMessages(RunRead):
     """
     messages: List[MessageRead]
     
+class RunStepRead(BaseModel):
+    id: int
+    agent_id: str
+    step_type: str
+    name: str
+    started_at: datetime
+    ended_at: datetime
+    duration_ms: float
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    result_chars: Optional[int] = None
+    error: Optional[str] = None
+    step_metadata: Optional[Any] = None
+    
+    class Config:
+        from_attributes = True
+
+
+class RunTimeline(BaseModel):
+    """
+    Response returned by:
+    GET /runs/{id}/timeline
+    
+    steps are ordered by start time; the totals add up step durations
+    (parallel steps overlap, so they can exceed the run's wall time)
+    """
+    run_id: int
+    status: str
+    created_at: datetime
+    completed_at: Optional[datetime] = None
+    wall_time_ms: Optional[float] = None
+    llm_time_ms: float
+    tool_time_ms: float
+    prompt_tokens: int
+    completion_tokens: int
+    steps: List[RunStepRead]
+    
 class ChatBase(BaseModel):
     assistant_id: int
     title: Optional[str] = None
@@ -0,0 +1,193 @@
+"""
+Chat history loading for new runs.
+
+load_chat_history() fetches the earlier messages of a chat with one
+query (messages joined to their runs, filtered by chat, ordered by
+creation - backed by the runs.chat_id / messages (run_id, id) indexes) and
+returns lightweight HistoryMessage rows instead of session-bound ORM
+entities, so later commits never expire or lazily reload them.
+Compressed bodies come from the same query (outer join on message_blobs)
+and are decompressed here.
+
+The amount loaded can be capped by whole runs (last N turns) and / or
+by tokens (newest messages first, until the cap is reached).
+
+load_message_page() serves the chat transcript API one page at a time
+(keyset pagination on messages.id, see GET /assistants/{id}/chats/{chat_id}/messages).
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from app.agents.context import count_tokens
+from app.core.config import settings
+from app.db.content import decode_content
+from app.db.models import Message, MessageBlob, Run
+
+# Rows fetched per round-trip while walking back from the newest message under a token cap
+TOKEN_CAP_BATCH_SIZE = 200
+
+
+class HistoryMessage:
+    """
+    Read-only message row (same attributes as Message, not attached to a session).
+    id is None for transient prompt-only messages such as the chat summary.
+    """
+    __slots__ = ("id", "run_id", "sender", "content", "message_metadata", "created_at")
+
+    def __init__(
+        self,
+        id: Optional[int],
+        run_id: Optional[int],
+        sender: str,
+        content: str,
+        message_metadata: Any = None,
+        created_at: Optional[datetime] = None,
+    ):
+        self.id = id
+        self.run_id = run_id
+        self.sender = sender
+        self.content = content
+        self.message_metadata = message_metadata
+        self.created_at = created_at
+
+    def __repr__(self) -> str:
+        return f"HistoryMessage(id={self.id}, run_id={self.run_id}, sender={self.sender!r})"
+
+
+def load_chat_history(
+    db: Session,
+    chat_id: int,
+    exclude_run_id: Optional[int] = None,
+    after_run_id: Optional[int] = None,
+    last_runs: Optional[int] = None,
+    max_tokens: Optional[int] = None,
+) -> List[HistoryMessage]:
+    """
+    Earlier messages of chat `chat_id` in creation order, in one query.
+
+    Args:
+        exclude_run_id: leave out this run (the one being started)
+        after_run_id: only runs with a higher id ...
+        last_runs: ... and / or the last N runs of the chat
+            (given both, a run qualifies if it matches either - used with the
+            rolling summary: runs not folded into it + the most recent ones)
+        max_tokens: keep only the newest messages whose content fits in
+            this many tokens (None / 0 = no cap)
+    """
+    query = (
+        db.query(
+            Message.id, Message.run_id, Message.sender,
+            Message.stored_content, Message.content_codec, MessageBlob.data,
+            Message.message_metadata, Message.created_at,
+        )
+        .join(Run, Run.id == Message.run_id)
+        .outerjoin(MessageBlob, MessageBlob.message_id == Message.id)
+        .filter(Run.chat_id == chat_id)
+    )
+    if exclude_run_id is not None:
+        query = query.filter(Message.run_id != exclude_run_id)
+
+    run_filters = []
+    if after_run_id is not None:
+        run_filters.append(Message.run_id > after_run_id)
+    if last_runs is not None:
+        recent_runs = db.query(Run.id).filter(Run.chat_id == chat_id)
+        if exclude_run_id is not None:
+            recent_runs = recent_runs.filter(Run.id != exclude_run_id)
+        recent_runs = recent_runs.order_by(Run.id.desc()).limit(max(0, last_runs))
+        run_filters.append(Message.run_id.in_(recent_runs.subquery().select()))
+    if run_filters:
+        query = query.filter(or_(*run_filters))
+
+    if not max_tokens:
+        rows = query.order_by(Message.created_at, Message.id).all()
+        return [_history_message(row) for row in rows]
+
+    # Walk back from the newest message and stop reading once the cap is reached
+    kept: List[HistoryMessage] = []
+    used = 0
+    for row in query.order_by(Message.created_at.desc(), Message.id.desc()).yield_per(TOKEN_CAP_BATCH_SIZE):
+        message = _history_message(row)
+        used += count_tokens(message.content)
+        if used > max_tokens and kept:
+            break
+        kept.append(message)
+    kept.reverse()
+    return kept
+
+
+def _history_message(row) -> HistoryMessage:
+    content = decode_content(row.stored_content, row.content_codec, row.data)
+    return HistoryMessage(row.id, row.run_id, row.sender, content, row.message_metadata, row.created_at)
+
+
+def load_message_page(
+    db: Session,
+    chat_id: int,
+    limit: int,
+    before_id: Optional[int] = None,
+    after_id: Optional[int] = None,
+    with_content: bool = True,
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    One page of chat `chat_id`'s messages in ascending id order, and whether
+    more messages exist beyond it, in one query.
+
+    Without a cursor the page is the latest `limit` messages; before_id pages
+    towards older messages, after_id towards newer ones (at most one of them).
+    The page ids are picked from the messages (run_id, id) index with
+    LIMIT limit + 1 (the extra row only tells whether there is more), so
+    only the rows of the page itself are read from the table.
+    with_content=False returns content_chars and content_preview instead of
+    the content, without reading any body (inline or compressed).
+    """
+    page_ids = (
+        db.query(Message.id)
+        .join(Run, Run.id == Message.run_id)
+        .filter(Run.chat_id == chat_id)
+    )
+    if after_id is not None:
+        page_ids = page_ids.filter(Message.id > after_id).order_by(Message.id)
+    else:
+        if before_id is not None:
+            page_ids = page_ids.filter(Message.id < before_id)
+        page_ids = page_ids.order_by(Message.id.desc())
+    page_ids = page_ids.limit(limit + 1).subquery()
+
+    if with_content:
+        body = [Message.stored_content, Message.content_codec, MessageBlob.data]
+    else:
+        # Rows written before these columns existed fall back to the inline content
+        body = [
+            func.coalesce(Message.content_chars, func.length(Message.stored_content)).label("content_chars"),
+            func.coalesce(
+                Message.content_preview,
+                func.substr(Message.stored_content, 1, settings.MESSAGE_PREVIEW_CHARS),
+            ).label("content_preview"),
+        ]
+    query = db.query(
+        Message.id, Message.run_id, Message.sender, *body,
+        Message.message_metadata, Message.created_at,
+    )
+    if with_content:
+        query = query.outerjoin(MessageBlob, MessageBlob.message_id == Message.id)
+    rows = query.filter(Message.id.in_(page_ids.select())).order_by(Message.id).all()
+
+    has_more = len(rows) > limit
+    if has_more:
+        # The extra row is the one furthest in the direction of travel
+        rows = rows[:limit] if after_id is not None else rows[1:]
+
+    messages = []
+    for row in rows:
+        message = dict(row._mapping)
+        if with_content:
+            message["content"] = decode_content(
+                message.pop("stored_content"), message.pop("content_codec"), message.pop("data"),
+            )
+        messages.append(message)
+    return messages, has_more
@@ -0,0 +1,207 @@
+"""
+Rolling per-chat summary.
+
+After every completed run, the chat's summary is folded forward with the
+user input and agent outputs of that run - and of any earlier run not folded
+yet, see Chat.summary_run_id - by a cheap model (CHAT_SUMMARY_PROVIDER /
+CHAT_SUMMARY_MODEL, see summary_llm()).
+New runs then start from Chat.summary + the last few runs instead of
+reloading and resending the whole chat, so prompt size and DB reads stay
+roughly constant as a chat grows (see load_recent_chat_messages).
+"""
+
+import asyncio
+import weakref
+from typing import List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session, selectinload
+
+from app.agents.context import SUMMARY_SENDER, truncate_to_tokens
+from app.core.config import settings
+from app.db.models import Chat, Message, Run
+from app.db.session import SessionLocal
+from app.llm.client import acall_llm_with_tools, resolve_model
+from app.services.chat_history import HistoryMessage, load_chat_history
+
+# Per message cap when feeding a run into the summarizer
+SUMMARY_INPUT_TOKENS_PER_MESSAGE = 600
+
+# Summary model on Groq when CHAT_SUMMARY_MODEL is not set
+GROQ_SUMMARY_MODEL = "llama-3.1-8b-instant"
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You maintain a running summary of a conversation between a user and a team of AI agents. "
+    "Update the current summary with the new turn. Keep the facts, results, decisions, user "
+    "preferences and open questions that later turns may need; drop filler and formatting. "
+    "Answer with the updated summary only, in at most 250 words."
+)
+
+# Runs that will not get any more messages (anything else is still in progress)
+FINISHED_RUN_STATUSES = ("completed", "failed")
+
+# Keep references to in-flight summary tasks so they aren't garbage collected
+_pending_tasks: Set[asyncio.Task] = set()
+
+# One summary update at a time per chat, so consecutive runs don't overwrite each other
+_chat_locks: "weakref.WeakValueDictionary[int, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+def load_recent_chat_messages(db: Session, chat: Chat, exclude_run_id: Optional[int] = None) -> List[HistoryMessage]:
+    """
+    Messages to send as history for a new run in `chat`.
+
+    - if the chat has a summary: a transient "chat_summary" message followed by
+      the messages of the runs not folded into it yet and of the last
+      CHAT_SUMMARY_RECENT_RUNS runs
+    - otherwise: the earlier messages of the chat (last CHAT_HISTORY_MAX_RUNS
+      runs if set)
+
+    Either way at most CHAT_HISTORY_MAX_TOKENS of messages (newest first) are
+    loaded, with a single query, in creation order (see load_chat_history).
+    """
+    max_tokens = settings.CHAT_HISTORY_MAX_TOKENS or None
+    if chat.summary:
+        history = load_chat_history(
+            db, chat.id,
+            exclude_run_id=exclude_run_id,
+            after_run_id=chat.summary_run_id or 0,
+            last_runs=settings.CHAT_SUMMARY_RECENT_RUNS,
+            max_tokens=max_tokens,
+        )
+        # Prompt-only context, never persisted
+        return [HistoryMessage(None, None, SUMMARY_SENDER, chat.summary)] + history
+
+    return load_chat_history(
+        db, chat.id,
+        exclude_run_id=exclude_run_id,
+        last_runs=settings.CHAT_HISTORY_MAX_RUNS or None,
+        max_tokens=max_tokens,
+    )
+
+
+def summary_llm() -> Tuple[str, str]:
+    """
+    (provider, model) that updates chat summaries: CHAT_SUMMARY_PROVIDER or
+    LLM_PROVIDER, and CHAT_SUMMARY_MODEL or a default that belongs to that
+    provider (a Groq model name means nothing to an OpenAI-compatible server)
+    """
+    provider = settings.CHAT_SUMMARY_PROVIDER or settings.LLM_PROVIDER
+    model = settings.CHAT_SUMMARY_MODEL
+    if not model:
+        model = GROQ_SUMMARY_MODEL if provider == "groq" else resolve_model(provider)
+    return provider, model
+
+
+def _build_summary_prompt(previous_summary: Optional[str], turn: List[Message]) -> List[dict]:
+    lines = []
+    for m in turn:
+        speaker = "User" if m.sender == "user" else f"Agent {m.sender}"
+        lines.append(f"{speaker}: {truncate_to_tokens(m.content or '', SUMMARY_INPUT_TOKENS_PER_MESSAGE)}")
+    return [
+        {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+        {"role": "user", "content": (
+            f"Current summary:\n{previous_summary or '(empty - this is the first turn)'}\n\n"
+            "New turn:\n" + "\n\n".join(lines)
+        )},
+    ]
+
+
+def _load_unfolded_turns(db: Session, chat: Chat, run_id: int) -> Tuple[Optional[List[dict]], Optional[int]]:
+    """
+    Summary prompt for every run of `chat` after summary_run_id up to `run_id`,
+    and the last run it covers (blocking).
+
+    Runs are folded in id order and the fold stops before the first run that
+    is still in progress, so a run is never summarised half-written. Returns
+    (None, None) when there is nothing to fold.
+    """
+    folded_up_to = chat.summary_run_id or 0
+    runs = (
+        db.query(Run.id, Run.status)
+        .filter(Run.chat_id == chat.id, Run.id > folded_up_to, Run.id <= run_id)
+        .order_by(Run.id)
+        .all()
+    )
+    run_ids = []
+    for id_, status in runs:
+        if status not in FINISHED_RUN_STATUSES:
+            break
+        run_ids.append(id_)
+    if not run_ids:
+        return None, None
+
+    messages = (
+        db.query(Message)
+        .options(selectinload(Message.blob))
+        .filter(Message.run_id.in_(run_ids))
+        .order_by(Message.run_id, Message.created_at, Message.id)
+        .all()
+    )
+    if not messages:
+        return None, run_ids[-1]
+    return _build_summary_prompt(chat.summary, messages), run_ids[-1]
+
+
+async def update_chat_summary(chat_id: int, run_id: int) -> None:
+    """
+    Fold run `run_id` - and every earlier run of the chat not folded yet -
+    into the summary of chat `chat_id`.
+
+    Uses its own session (runs after the request that produced the run).
+    Catching up on earlier runs means a run whose own update failed, was
+    cancelled or finished after a later one is still folded by the next
+    update. Failures are logged and leave the previous summary in place.
+    """
+    lock = _chat_locks.get(chat_id)
+    if lock is None:
+        lock = _chat_locks[chat_id] = asyncio.Lock()
+    async with lock:
+        await _update_chat_summary(chat_id, run_id)
+
+
+async def _update_chat_summary(chat_id: int, run_id: int) -> None:
+    db = SessionLocal()
+    try:
+        chat = await asyncio.to_thread(lambda: db.query(Chat).filter(Chat.id == chat_id).first())
+        if not chat or (chat.summary_run_id is not None and chat.summary_run_id >= run_id):
+            return
+        # Reads (and decompresses) the message bodies - off the event loop
+        prompt, last_run_id = await asyncio.to_thread(_load_unfolded_turns, db, chat, run_id)
+        if last_run_id is None:
+            return
+
+        if prompt is None:
+            # Only empty runs to fold: move past them, the summary is unchanged
+            summary = chat.summary
+        else:
+            provider, model = summary_llm()
+            response = await acall_llm_with_tools(
+                messages=prompt,
+                provider=provider,
+                model=model,
+                max_tokens=settings.CHAT_SUMMARY_MAX_TOKENS,
+                temperature=0.2,
+            )
+            if not response.has_content:
+                return
+            summary = response.content.strip()
+
+        def _store() -> None:
+            chat.summary = summary
+            chat.summary_run_id = last_run_id
+            db.commit()
+
+        await asyncio.to_thread(_store)
+    except Exception as e:
+        print(f"[WARNING] Failed to update summary of chat {chat_id} with run {run_id}: {e}")
+    finally:
+        db.close()
+
+
+def schedule_chat_summary_update(chat_id: Optional[int], run_id: int) -> None:
+    """ Update the chat summary in the background (off the run's critical path) """
+    if not settings.CHAT_SUMMARY_ENABLED or not chat_id:
+        return
+    task = asyncio.create_task(update_chat_summary(chat_id, run_id))
+    _pending_tasks.add(task)
+    task.add_done_callback(_pending_tasks.discard)
@@ -0,0 +1,213 @@
+"""
+Run lifecycle helpers shared by the /runs endpoints and the background run queue.
+
+- create_run: validate assistant / chat and insert the Run row
+- load_run_context: chat history + resolved tools for a run
+- execute_run: run the graph and record failures on the Run row
+"""
+
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from app.agents.runtime import arun_assistant_graph, RunEventCallback
+from app.core.tracing import span
+from app.db.models import Assistant, Chat, Message, Run
+from app.db.session import release_connection
+from app.schemas.schemas import MessageRead, RunCreate, RunWithMessages
+from app.services.tool_resolver import resolve_tools_for_assistant
+from app.services.chat_summary import load_recent_chat_messages, schedule_chat_summary_update
+
+
+class RunFailedError(Exception):
+    """
+    Raised by execute_run() when the graph fails.
+    The Run row has already been marked failed; `message` is the
+    user facing error stored in Run.error_message.
+    """
+    def __init__(self, message: str):
+        super().__init__(message)
+        self.message = message
+
+
+def create_run(
+    db: Session,
+    assistant_id: int,
+    payload: RunCreate,
+    status: str = "running",
+) -> Tuple[Assistant, Run]:
+    """
+    Load the assistant / chat (creating a new chat if needed) and insert the Run row.
+    Blocking DB work.
+
+    Raises HTTPException(404) if the assistant or chat does not exist.
+    """
+    assistant = db.query(Assistant).filter(Assistant.id == assistant_id).first()
+    if not assistant:
+        raise HTTPException(status_code=404, detail="Assistant not found")
+    chat_id = payload.chat_id
+
+    if chat_id:
+        chat = db.query(Chat).filter(Chat.id == chat_id).first()
+        if not chat:
+            raise HTTPException(status_code=404, detail="Chat not found")
+
+    else:
+        chat = Chat(assistant_id = assistant.id,
+                    title = payload.input_text[:50],)
+        db.add(chat)
+        db.commit()
+        db.refresh(chat)
+
+    run = Run(assistant_id = assistant.id,
+              chat_id = chat.id,
+              status = status,
+              input_text = payload.input_text,
+              created_at = datetime.utcnow(),
+              completed_at = None,
+              error_message = None,
+              )
+    db.add(run)
+    db.commit()
+    db.refresh(run)
+    return assistant, run
+
+
+def load_run_context(
+    db: Session,
+    assistant: Assistant,
+    run: Run,
+) -> Tuple[List[Message], Dict[str, List[Dict[str, Any]]]]:
+    """
+    History of the run's chat (rolling summary + recent runs, see
+    load_recent_chat_messages; lightweight HistoryMessage rows) + tools
+    resolved per agent. Blocking DB work; the session's connection is
+    returned to the pool afterwards (the agents don't need it).
+
+    Returns:
+        (previous_messages, tools_by_agent)
+    """
+    previous_messages = []
+
+    if run.chat_id:
+        chat = db.query(Chat).filter(Chat.id == run.chat_id).first()
+        if chat:
+            previous_messages = load_recent_chat_messages(db, chat, exclude_run_id=run.id)
+
+    tools_by_agent = resolve_tools_for_assistant(db=db, assistant=assistant)
+    release_connection(db)
+    return previous_messages, tools_by_agent
+
+
+def error_message_from_exception(e: Exception) -> str:
+    """ Best-effort human readable message, unwrapping Groq API error bodies """
+    error_msg = str(e)
+    # Extract more detailed error message for Groq API errors
+    if hasattr(e, 'body') and hasattr(e.body, 'get'):
+        try:
+            error_body = e.body
+            if isinstance(error_body, dict) and 'error' in error_body:
+                error_detail = error_body['error']
+                if isinstance(error_detail, dict) and 'message' in error_detail:
+                    error_msg = error_detail['message']
+        except:
+            pass
+    elif hasattr(e, 'message'):
+        error_msg = str(e.message)
+    return error_msg
+
+
+def mark_run_running(db: Session, run: Run) -> None:
+    """ queued -> running (blocking) """
+    run.status = "running"
+    db.commit()
+    db.refresh(run)
+
+
+def fail_run(db: Session, run: Run, error_msg: str) -> None:
+    """ Mark the run failed (blocking) """
+    run.status = "failed"
+    run.error_message = error_msg
+    run.completed_at = datetime.utcnow()
+    db.add(run)
+    db.commit()
+    db.refresh(run)
+
+
+def build_run_response(db: Session, run: Run, messages: List[Message]) -> RunWithMessages:
+    """ Refresh the run and build the flat RunWithMessages payload (blocking) """
+    # Make sure run is refreshed (status 'completed')
+    db.refresh(run)
+    return run_response(run, messages)
+
+
+def run_response(run: Run, messages: List[Message]) -> RunWithMessages:
+    """ Flat RunWithMessages payload of a loaded run (no DB access) """
+    # Skip transient prompt-only messages (e.g. the chat summary) that were never persisted
+    message_reads = [MessageRead.model_validate(m) for m in messages if m.id is not None]
+
+    # Return flat structure matching RunWithMessages schema
+    return RunWithMessages(
+        id=run.id,
+        assistant_id=run.assistant_id,
+        chat_id=run.chat_id,
+        status=run.status,
+        input_text=run.input_text,
+        created_at=run.created_at,
+        completed_at=run.completed_at,
+        error_message=run.error_message,
+        messages=message_reads,
+    )
+
+
+async def execute_run(
+    db: Session,
+    assistant: Assistant,
+    run: Run,
+    on_event: Optional[RunEventCallback] = None,
+) -> List[Message]:
+    """
+    Execute a created (or queued) run end to end.
+
+    Loads the chat history and tools, runs the graph and, on error or
+    cancellation, marks the Run failed. On success the chat's rolling
+    summary is updated in the background. DB work goes through
+    asyncio.to_thread so the event loop stays free.
+
+    Returns:
+        The messages returned by arun_assistant_graph()
+
+    Raises:
+        RunFailedError if the graph failed (run already marked failed)
+    """
+    if run.status != "running":
+        await asyncio.to_thread(mark_run_running, db, run)
+
+    with span("run", **{"run.id": run.id, "assistant.id": assistant.id, "chat.id": run.chat_id or 0}) as run_span:
+        try:
+            with span("run.load_context"):
+                previous_messages, tools_by_agent = await asyncio.to_thread(load_run_context, db, assistant, run)
+            run_span.set_attribute("run.history_messages", len(previous_messages))
+            messages = await arun_assistant_graph(
+                db=db,
+                assistant=assistant,
+                run=run,
+                previous_messages=previous_messages,
+                tools_by_agent=tools_by_agent,
+                on_event=on_event,
+            )
+        except asyncio.CancelledError:
+            run_span.set_attribute("run.cancelled", True)
+            await asyncio.to_thread(fail_run, db, run, "Run cancelled")
+            raise
+        except Exception as e:
+            error_msg = error_message_from_exception(e)
+            run_span.record_error(e)
+            await asyncio.to_thread(fail_run, db, run, error_msg)
+            raise RunFailedError(error_msg) from e
+
+    schedule_chat_summary_update(run.chat_id, run.id)
+    return messages
@@ -0,0 +1,190 @@
+"""
+Background run queue.
+
+POST /assistants/{id}/runs/enqueue inserts a Run with status "queued" and
+hands its id to RUN_QUEUE; a fixed pool of asyncio worker tasks picks
+runs up and executes them with execute_run(). Clients poll GET /runs/{id}.
+
+Backpressure: once RUN_QUEUE_MAX_DEPTH runs are waiting, submit() raises
+RunQueueFullError carrying a Retry-After estimate derived from the
+average run duration and the number of workers.
+
+Several processes (uvicorn workers, a rolling restart) may hand the same
+queued run to their workers: a worker first claims the run with
+UPDATE runs SET status='running' WHERE id=:id AND status='queued' and
+skips it when another process got there first.
+"""
+
+import asyncio
+import math
+from collections import deque
+from typing import Deque, List, Optional
+
+from sqlalchemy import update
+
+from app.core.config import settings
+from app.db.models import Assistant, Run
+from app.db.session import SessionLocal
+from app.services.run_executor import execute_run, fail_run, RunFailedError
+
+
+class RunQueueFullError(Exception):
+    """ Raised when the queue is at max depth; `retry_after` is in seconds """
+    def __init__(self, retry_after: int):
+        super().__init__(f"Run queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class RunQueue:
+    """
+    Bounded asyncio queue of run ids + a pool of worker tasks.
+
+    Usage:
+        await RUN_QUEUE.start()      # app startup
+        RUN_QUEUE.submit(run.id)     # may raise RunQueueFullError
+        await RUN_QUEUE.stop()       # app shutdown
+    """
+
+    # Weight of the latest run in the moving average of run durations
+    _DURATION_SMOOTHING = 0.2
+
+    def __init__(self, workers: int, max_depth: int, initial_run_seconds: float = 30.0):
+        self.workers = max(1, workers)
+        self.max_depth = max(1, max_depth)
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._avg_run_seconds = initial_run_seconds
+        self._active = 0
+        # Queued runs found at startup that didn't fit in the queue, submitted as slots free up
+        self._backlog: Deque[int] = deque()
+
+    @property
+    def depth(self) -> int:
+        """ Runs waiting for a worker """
+        return self._queue.qsize() if self._queue is not None else 0
+
+    @property
+    def active(self) -> int:
+        """ Runs currently executing """
+        return self._active
+
+    @property
+    def is_full(self) -> bool:
+        return self.depth >= self.max_depth
+
+    def retry_after_seconds(self) -> int:
+        """ Rough time until a queue slot frees up """
+        waves = (self.depth + 1) / self.workers
+        return max(1, math.ceil(waves * self._avg_run_seconds))
+
+    async def start(self) -> None:
+        """ Create the queue, start the workers and re-enqueue runs left queued by a previous process """
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_depth)
+        self._tasks = [
+            asyncio.create_task(self._worker(i), name=f"run-worker-{i}")
+            for i in range(self.workers)
+        ]
+        self._backlog.extend(await asyncio.to_thread(_queued_run_ids))
+        self._refill()
+
+    async def stop(self) -> None:
+        """ Cancel the workers; runs still waiting stay "queued" in the DB """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        self._backlog.clear()
+
+    def submit(self, run_id: int) -> None:
+        """
+        Enqueue a run id without waiting.
+
+        Raises:
+            RuntimeError if the queue was not started
+            RunQueueFullError if max depth is reached
+        """
+        if self._queue is None:
+            raise RuntimeError("Run queue is not started")
+        try:
+            self._queue.put_nowait(run_id)
+        except asyncio.QueueFull:
+            raise RunQueueFullError(self.retry_after_seconds())
+
+    def _refill(self) -> None:
+        """ Move backlog runs into the queue while it has room """
+        while self._backlog and not self.is_full:
+            self._queue.put_nowait(self._backlog.popleft())
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            run_id = await self._queue.get()
+            self._active += 1
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            try:
+                await self._execute(run_id)
+            except asyncio.CancelledError:
+                raise
+            except RunFailedError:
+                pass  # already recorded on the Run row
+            except Exception as e:
+                print(f"[ERROR] run-worker-{index} failed on run {run_id}: {e}")
+            finally:
+                self._active -= 1
+                elapsed = loop.time() - started
+                self._avg_run_seconds += self._DURATION_SMOOTHING * (elapsed - self._avg_run_seconds)
+                self._queue.task_done()
+                self._refill()
+
+    async def _execute(self, run_id: int) -> None:
+        db = SessionLocal()
+        try:
+            loaded = await asyncio.to_thread(_claim_run, db, run_id)
+            if loaded is None:
+                return
+            run, assistant = loaded
+            if assistant is None:
+                await asyncio.to_thread(fail_run, db, run, "Assistant not found")
+                return
+            await execute_run(db, assistant, run)
+        finally:
+            db.close()
+
+
+def _claim_run(db, run_id: int):
+    """
+    Atomically move a run from queued to running and return (run, assistant),
+    or None if it is gone or was already picked up (by this or another process)
+    """
+    claimed = db.execute(
+        update(Run)
+        .where(Run.id == run_id, Run.status == "queued")
+        .values(status="running")
+    ).rowcount
+    db.commit()
+    if not claimed:
+        return None
+    run = db.query(Run).filter(Run.id == run_id).first()
+    assistant = db.query(Assistant).filter(Assistant.id == run.assistant_id).first()
+    return run, assistant
+
+
+def _queued_run_ids() -> List[int]:
+    """ Ids of runs still marked queued, oldest first """
+    db = SessionLocal()
+    try:
+        rows = db.query(Run.id).filter(Run.status == "queued").order_by(Run.created_at).all()
+        return [row[0] for row in rows]
+    finally:
+        db.close()
+
+
+# Global queue instance (started / stopped by app.main)
+
+RUN_QUEUE = RunQueue(
+    workers=settings.RUN_QUEUE_WORKERS,
+    max_depth=settings.RUN_QUEUE_MAX_DEPTH,
+)
@@ -1,62 +1,101 @@
-from typing import List, Optional, Dict, Any
+"""
+Tool resolution for runs: which tools (with which config) each agent of an
+assistant's graph gets.
+
+Only the rows named in the graph's tool_refs are read (one IN query per
+kind), and the resolved plan is cached per assistant:
+
+- the cache key includes the assistant's updated_at, so a graph change is
+  picked up even when it was made by another process
+- the routers that change tool connections / MCP servers call
+  invalidate_tool_plans(kind, id) (every plan referencing that row is
+  dropped); graph updates and assistant deletes call invalidate_assistant_tools()
+- TOOL_PLAN_CACHE_TTL_S bounds how long a plan can be stale when a row was
+  changed by another process (0 disables the cache)
+
+Cached plans are shared between runs: callers must treat them as read-only.
+"""
+
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
 from app.db.models import Assistant, UserToolConnection, MCPServer
 
-def resolve_tools_for_assistant(
-    db:Session,
-    assistant: Assistant,
-) -> Dict[str, List[Dict[str, Any]]]:
-    """ 
-    Given an Assistant (with graph_json), return a mapping:
-    {
-        "<agent_id>":[
-            {
-                "kind":"user_tool" | "mcp_server",
-                "id":1,
-                "template_key":"tavily",
-                "config":{
-                    ...}},
-                {
-                    "kind":"mcp_server",
-                    "id":2,
-                    "name":"filesystem MCP",
-                    "server_type":"stdio",
-                    "config":{...}
-                }
-            } ],
-        ...
-    }
-    """
-    
-    graph = assistant.graph_json or {}
-    nodes = graph.get("nodes",[])
-    
-    user_tools_by_id: Dict[int, UserToolConnection] = {
-        ut.id: ut for ut in db.query(UserToolConnection).all()
-    }
-    mcp_servers_by_id: Dict[int, MCPServer] = {
-        ms.id: ms for ms in db.query(MCPServer).all()
-    }
-    
-    resolved : Dict[str, List[Dict[str, Any]]] = {}
-    
-    for node in nodes:
+ToolPlan = Dict[str, List[Dict[str, Any]]]
+ToolRef = Tuple[str, int]  # ("user_tool" | "mcp_server", id)
+
+
+class _PlanEntry:
+    __slots__ = ("version", "plan", "refs", "expires_at")
+
+    def __init__(self, version: Any, plan: ToolPlan, refs: Set[ToolRef], expires_at: float):
+        self.version = version
+        self.plan = plan
+        self.refs = refs
+        self.expires_at = expires_at
+
+
+_plans: Dict[int, _PlanEntry] = {}
+_plans_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+def graph_tool_refs(graph: Dict[str, Any]) -> Set[ToolRef]:
+    """ (kind, id) of every tool referenced by the graph's nodes """
+    refs: Set[ToolRef] = set()
+    for node in graph.get("nodes", []) or []:
+        for ref in node.get("tool_refs") or []:
+            kind, ref_id = ref.get("kind"), ref.get("id")
+            if kind in ("user_tool", "mcp_server") and isinstance(ref_id, int):
+                refs.add((kind, ref_id))
+    return refs
+
+
+def _load_rows(db: Session, refs: Set[ToolRef]) -> Tuple[Dict[int, Any], Dict[int, Any]]:
+    """ The referenced tool connection / MCP server rows (only the columns the plan needs) """
+    user_tool_ids = sorted(ref_id for kind, ref_id in refs if kind == "user_tool")
+    mcp_server_ids = sorted(ref_id for kind, ref_id in refs if kind == "mcp_server")
+
+    user_tools_by_id: Dict[int, Any] = {}
+    if user_tool_ids:
+        rows = db.query(
+            UserToolConnection.id, UserToolConnection.template_key,
+            UserToolConnection.config_json, UserToolConnection.status,
+        ).filter(UserToolConnection.id.in_(user_tool_ids)).all()
+        user_tools_by_id = {row.id: row for row in rows}
+
+    mcp_servers_by_id: Dict[int, Any] = {}
+    if mcp_server_ids:
+        rows = db.query(
+            MCPServer.id, MCPServer.endpoint, MCPServer.config_json,
+        ).filter(MCPServer.id.in_(mcp_server_ids)).all()
+        mcp_servers_by_id = {row.id: row for row in rows}
+
+    return user_tools_by_id, mcp_servers_by_id
+
+
+def _build_plan(graph: Dict[str, Any], user_tools_by_id: Dict[int, Any], mcp_servers_by_id: Dict[int, Any]) -> ToolPlan:
+    resolved: ToolPlan = {}
+
+    for node in graph.get("nodes", []):
         agent_id = node.get("id")
         tool_refs = node.get("tool_refs") or []
-        
-        resolved_list: List[dict[str, Any]] = []
-        
+
+        resolved_list: List[Dict[str, Any]] = []
+
         for ref in tool_refs:
             kind = ref.get("kind")
             ref_id = ref.get("id")
-            
+
             if kind == "user_tool":
                 ut = user_tools_by_id.get(ref_id)
                 if not ut:
                     print(f"[WARNING] User tool with id {ref_id} not found in database")
                     continue
-                print(f"[DEBUG] Resolved user_tool: id={ut.id}, template_key={ut.template_key}, status={ut.status}")
                 resolved_list.append({
                     "kind":"user_tool",
                     "id":ut.id,
@@ -64,7 +103,7 @@ def resolve_tools_for_assistant(
                     "config":ut.config_json or {},
                     "status": ut.status,
                 })
-                
+
             elif kind == "mcp_server":
                 ms = mcp_servers_by_id.get(ref_id)
                 if not ms:
@@ -78,8 +117,83 @@ def resolve_tools_for_assistant(
                         "config_json":ms.config_json or {},
                     },
                 })
-                
+
             else:
                 continue
         resolved[agent_id] = resolved_list
     return resolved
+
+
+def resolve_tools_for_assistant(
+    db:Session,
+    assistant: Assistant,
+) -> ToolPlan:
+    """
+    Given an Assistant (with graph_json), return a mapping:
+    {
+        "<agent_id>":[
+            {
+                "kind":"user_tool" | "mcp_server",
+                "id":1,
+                "template_key":"tavily",
+                "config":{
+                    ...}},
+                {
+                    "kind":"mcp_server",
+                    "id":2,
+                    "name":"filesystem MCP",
+                    "server_type":"stdio",
+                    "config":{...}
+                }
+            } ],
+        ...
+    }
+    Served from the per-assistant plan cache when possible (read-only).
+    """
+    version = assistant.updated_at
+    ttl = settings.TOOL_PLAN_CACHE_TTL_S
+    if ttl > 0:
+        with _plans_lock:
+            entry = _plans.get(assistant.id)
+            if entry is not None and entry.version == version and entry.expires_at > time.monotonic():
+                _stats["hits"] += 1
+                return entry.plan
+            _stats["misses"] += 1
+
+    graph = assistant.graph_json or {}
+    refs = graph_tool_refs(graph)
+    plan = _build_plan(graph, *_load_rows(db, refs))
+
+    if ttl > 0:
+        with _plans_lock:
+            _plans[assistant.id] = _PlanEntry(version, plan, refs, time.monotonic() + ttl)
+    return plan
+
+
+def invalidate_assistant_tools(assistant_id: int) -> None:
+    """ Drop the cached plan of an assistant (graph updated / assistant deleted) """
+    with _plans_lock:
+        if _plans.pop(assistant_id, None) is not None:
+            _stats["invalidations"] += 1
+
+
+def invalidate_tool_plans(kind: str, ref_id: Optional[int] = None) -> None:
+    """
+    Drop every cached plan that references tool `kind` ("user_tool" /
+    "mcp_server") with id `ref_id` (any id of that kind when None) -
+    called after a tool connection or MCP server is created, updated or deleted.
+    """
+    with _plans_lock:
+        stale = [
+            assistant_id for assistant_id, entry in _plans.items()
+            if any(k == kind and (ref_id is None or i == ref_id) for k, i in entry.refs)
+        ]
+        for assistant_id in stale:
+            del _plans[assistant_id]
+        _stats["invalidations"] += len(stale)
+
+
+def tool_plan_cache_stats() -> Dict[str, Any]:
+    """ Size and hit / miss / invalidation counters of the plan cache """
+    with _plans_lock:
+        return {"enabled": settings.TOOL_PLAN_CACHE_TTL_S > 0, "size": len(_plans), **_stats}
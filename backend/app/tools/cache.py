@@ -0,0 +1,101 @@
+"""
+Tool result cache
+
+The same Tavily queries / weather lookups repeat across runs and across
+agents of one run. ToolRegistry keeps their results here so repeats skip
+the network and don't burn API quota.
+
+- key: tool name + canonical JSON of the LLM arguments + hash of the config
+  (api keys etc. are only stored hashed)
+- TTL per ToolDefinition (cache_ttl), None / 0 means never cached
+- LRU eviction once max_entries or max_bytes is exceeded
+
+Thread safe: sync handlers run in worker threads.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+def _canonical_json(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def make_cache_key(name: str, arguments: Dict[str, Any], config: Optional[Dict[str, Any]]) -> str:
+    """ Stable key for a tool call: same tool, same arguments, same config -> same key """
+    config_hash = hashlib.sha256(_canonical_json(config or {}).encode("utf-8")).hexdigest()
+    return f"{name}:{_canonical_json(arguments or {})}:{config_hash}"
+
+
+class ToolResultCache:
+    """
+    In-memory TTL + LRU cache of tool results (strings).
+
+    Usage:
+        cache = ToolResultCache(max_entries=1024, max_bytes=16 * 1024 * 1024)
+        result = cache.get(key)           # None on miss / expired
+        cache.set(key, result, ttl=600)
+    """
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max(1, max_bytes)
+        # key -> (expires_at, value, size)
+        self._entries: "OrderedDict[str, Tuple[float, str, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        """ Cached value, or None if missing / expired """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value, size = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        """ Store a value for `ttl` seconds; values larger than max_bytes are not cached """
+        size = len(key) + len(value.encode("utf-8"))
+        if ttl <= 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """ Counters for monitoring """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _remove(self, key: str) -> None:
+        # Caller holds the lock
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
@@ -8,9 +8,19 @@ each tool has:
 The LLM receives schemas, decides which tool to call with what arguments and we execute that only
 """
 
-from typing import Any, Dict, List, Optional, Callable
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
 
-ToolHandler = Callable[[Dict[str, Any]], str]
+from app.core.config import settings
+from app.core.tracing import current_span
+from app.tools.cache import ToolResultCache, make_cache_key
+from app.tools.manifest import CompiledTool
+
+# Handlers are either plain functions or `async def` coroutines and take
+# (args) or (args, config). Async handlers are awaited directly by
+# ToolRegistry.aexecute(); sync ones run in a worker thread.
+ToolHandler = Callable[..., Union[str, Awaitable[str]]]
 
 
 class ToolDefinition:
@@ -23,6 +33,13 @@ class ToolDefinition:
     parameters: JSON schema for the tool's input parameters
     handler: function that executes the tool with the given parameters
     require_config: List of config keys needed(like api key)
+    cache_ttl: seconds a result may be reused for the same arguments + config,
+        None / 0 disables caching (default - tools with side effects)
+    non_cacheable_actions: values of the "action" argument that must never be
+        cached even if cache_ttl is set (e.g. gmail "draft")
+    run_memo: results may be reused by later identical calls of the same run
+        (app.agents.memo) even though they are not cached across runs - for
+        reads whose answer is stable within a run but not between runs
     """
     def __init__(
         self,
@@ -30,13 +47,31 @@ class ToolDefinition:
         description: str,
         parameters: Dict[str, Any],
         handler: ToolHandler,
-        require_config: Optional[List[str]] = None
+        require_config: Optional[List[str]] = None,
+        cache_ttl: Optional[float] = None,
+        non_cacheable_actions: Optional[List[str]] = None,
+        run_memo: bool = False,
     ):
         self.name = name
         self.description = description
         self.parameters = parameters
         self.handler = handler
         self.require_config = require_config or []
+        self.cache_ttl = cache_ttl
+        self.non_cacheable_actions = set(non_cacheable_actions or [])
+        self.run_memo = run_memo
+    
+    def is_cacheable(self, arguments: Dict[str, Any]) -> bool:
+        """ Whether a call with these LLM arguments may be served from / stored in the cache """
+        if not self.cache_ttl or self.cache_ttl <= 0:
+            return False
+        return arguments.get("action") not in self.non_cacheable_actions
+    
+    def is_run_reusable(self, arguments: Dict[str, Any]) -> bool:
+        """ Whether a later identical call of the same run may reuse this call's result """
+        if self.run_memo:
+            return arguments.get("action") not in self.non_cacheable_actions
+        return self.is_cacheable(arguments)
         
 class ToolRegistry:
     """
@@ -52,15 +87,38 @@ class ToolRegistry:
     #  Execute a tool
     result = registry.execute("tool1),{"param" : "value"}, config={"api_key" : "..."}
     
+    Results of tools with a cache_ttl are kept in `cache` (if given)
+    and reused for identical (name, arguments, config) calls.
+    
+    Each tool is compiled once on register() (calling convention, schema,
+    argument validator - see app/tools/manifest.py); arguments that don't
+    match the tool's schema are rejected before the handler is called.
     """
-    def __init__(self):
+    def __init__(self, cache: Optional[ToolResultCache] = None):
         self._tools: Dict[str, ToolDefinition] = {}
+        self._compiled: Dict[str, CompiledTool] = {}
+        # tuple(tool names) -> schema list, cleared on register()
+        self._schema_lists: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self.cache = cache
         
     def register(self, tool: ToolDefinition) -> None:
         """ Register a tool defination"""
         if tool.name in self._tools:
             raise ValueError(f"Tool '{tool.name}' already registered")
-        self._tools[tool.name] = tool
+        compiled = CompiledTool(tool)
+        with self._lock:
+            self._tools[tool.name] = tool
+            self._compiled[tool.name] = compiled
+            self._schema_lists.clear()
+    
+    def _compiled_tool(self, tool: ToolDefinition) -> CompiledTool:
+        """ The tool's compiled entry, recompiled if tool.handler was replaced since """
+        compiled = self._compiled[tool.name]
+        if compiled.handler is not tool.handler:
+            compiled = compiled.with_handler(tool.handler)
+            self._compiled[tool.name] = compiled
+        return compiled
         
     def get(self,name:str)-> Optional[ToolDefinition]:
         """ Get a tool definition by name"""
@@ -84,30 +142,80 @@ class ToolRegistry:
             }
         }
         
+        Built once on register() - shared, do not modify.
         """
-        tool = self._tools.get(name)
-        if not tool:
-            return None
-        
-        return {
-            "type" : "function",
-            "function" : {
-                "name" : tool.name,
-                "description" : tool.description,
-                "parameters" : tool.parameters,
-            }
-        }
+        compiled = self._compiled.get(name)
+        return compiled.schema if compiled else None
         
         
     def get_openai_schemas_list(self, tool_names:List[str])-> List[Dict[str, Any]]:
-        """ Get multiple tool schemas for passing to LLM"""
-        schemas = []
-        for name in tool_names:
-            schema = self.get_openai_schemas(name)
-            if schema:
-                schemas.append(schema)
+        """ Get multiple tool schemas for passing to LLM (memoized per tool set - do not modify) """
+        key = tuple(tool_names)
+        schemas = self._schema_lists.get(key)
+        if schemas is None:
+            schemas = [self._compiled[name].schema for name in key if name in self._compiled]
+            with self._lock:
+                self._schema_lists[key] = schemas
         return schemas 
             
+    def _merge_config(
+        self,
+        tool: ToolDefinition,
+        arguments: Dict[str, Any],
+        config: Optional[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        """
+        Merge config into arguments if needed
+        Config values are injected server-side, not from LLM
+        """
+        merged_args = {**arguments}
+        if config: 
+            for key in tool.require_config:
+                if key in config and key not in merged_args:
+                    merged_args[f"_config_{key}"] = config[key]
+        return merged_args
+    
+    def _call_handler(
+        self,
+        compiled: CompiledTool,
+        merged_args: Dict[str, Any],
+        config: Optional[Dict[str, Any]],
+    ) -> Any:
+        """ Call the handler with (args, config) or (args) depending on its signature """
+        if compiled.takes_config:
+            # Handler expects (args, config)
+            return compiled.handler(merged_args, config or {})
+        # Handler expects only (args)
+        return compiled.handler(merged_args)
+    
+    def _invalid_arguments(self, compiled: CompiledTool, name: str, arguments: Any) -> Optional[str]:
+        """ Error result for arguments that don't match the tool's schema (None when valid) """
+        error = compiled.check_arguments(arguments)
+        if error is None:
+            return None
+        current_span().set_attribute("tool.invalid_arguments", True)
+        return f"Error: invalid arguments for {name}: {error}"
+    
+    def _cache_lookup(
+        self,
+        tool: ToolDefinition,
+        arguments: Dict[str, Any],
+        config: Optional[Dict[str, Any]],
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """ (cache key, cached result) - key is None when the call is not cacheable """
+        if self.cache is None or not tool.is_cacheable(arguments):
+            return None, None
+        key = make_cache_key(tool.name, arguments, config)
+        cached = self.cache.get(key)
+        current_span().set_attribute("tool.cache_hit", cached is not None)
+        return key, cached
+    
+    def _cache_store(self, tool: ToolDefinition, key: Optional[str], result: str) -> None:
+        """ Remember a successful result (error strings are never cached) """
+        if key is None or result.startswith("Error"):
+            return
+        self.cache.set(key, result, tool.cache_ttl)
+            
     def execute(
         self,
         name:str,
@@ -115,7 +223,10 @@ class ToolRegistry:
         config: Optional[Dict[str, Any]] = None
     ) -> str:
         """ 
-        Execute a tool by name with given arguments.
+        Execute a tool by name with given arguments (blocking).
+        
+        Only for tools with a sync handler: `async def` handlers (Tavily,
+        weather, MCP ...) raise TypeError - await aexecute() instead.
         
         Args:
             name: tool name
@@ -130,34 +241,80 @@ class ToolRegistry:
         if not tool:
             return f"Tool '{name}' not found"
         
-        # Merge config into arguments if needed
-        # Config values are injected server-side, not from LLM
+        compiled = self._compiled_tool(tool)
+        if compiled.is_async:
+            raise TypeError(f"Tool '{name}' has an async handler - call ToolRegistry.aexecute()")
+        invalid = self._invalid_arguments(compiled, name, arguments)
+        if invalid:
+            return invalid
         
-        merged_args = {**arguments}
-        if config: 
-            for key in tool.require_config:
-                if key in config and key not in merged_args:
-                    merged_args[f"_config_{key}"] = config[key]
+        cache_key, cached = self._cache_lookup(tool, arguments, config)
+        if cached is not None:
+            return cached
+        
+        merged_args = self._merge_config(tool, arguments, config)
                     
         try:
-            # Check if handler accepts config parameter
-            import inspect
-            sig = inspect.signature(tool.handler)
-            if len(sig.parameters) >= 2:
-                # Handler expects (args, config)
-                result = tool.handler(merged_args, config or {})
+            result = self._call_handler(compiled, merged_args, config)
+            # Ensure result is always a string
+            result = str(result) if result is not None else ""
+        except Exception as e:
+            return f"Error executing {name}: {str(e)}"
+        self._cache_store(tool, cache_key, result)
+        return result
+    
+    async def aexecute(
+        self,
+        name:str,
+        arguments: Dict[str, Any],
+        config: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """ 
+        Async version of execute().
+        
+        - `async def` handlers are awaited on the event loop
+        - blocking handlers (Gmail client, ...) run in a worker thread
+          so they never stall other runs
+        
+        Same arguments / return value as execute().
+        """
+        
+        tool = self._tools.get(name)
+        if not tool:
+            return f"Tool '{name}' not found"
+        
+        compiled = self._compiled_tool(tool)
+        invalid = self._invalid_arguments(compiled, name, arguments)
+        if invalid:
+            return invalid
+        
+        cache_key, cached = self._cache_lookup(tool, arguments, config)
+        if cached is not None:
+            return cached
+        
+        merged_args = self._merge_config(tool, arguments, config)
+        
+        try:
+            if compiled.is_async:
+                result = await self._call_handler(compiled, merged_args, config)
             else:
-                # Handler expects only (args)
-                result = tool.handler(merged_args)
+                result = await asyncio.to_thread(self._call_handler, compiled, merged_args, config)
             # Ensure result is always a string
-            return str(result) if result is not None else ""
+            result = str(result) if result is not None else ""
         except Exception as e:
             return f"Error executing {name}: {str(e)}"
+        self._cache_store(tool, cache_key, result)
+        return result
         
         
 # Global registry instance
 
-TOOL_REGISTRY = ToolRegistry()
+TOOL_REGISTRY = ToolRegistry(
+    cache=ToolResultCache(
+        max_entries=settings.TOOL_CACHE_MAX_ENTRIES,
+        max_bytes=settings.TOOL_CACHE_MAX_BYTES,
+    ) if settings.TOOL_CACHE_ENABLED else None
+)
 
 def register_tool(tool: ToolDefinition) -> None:
     """ Register a tool defination with the global registry"""
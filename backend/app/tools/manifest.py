@@ -0,0 +1,195 @@
+"""
+Compiled tool manifest.
+
+ToolRegistry.register() compiles every ToolDefinition once into a
+CompiledTool, instead of redoing the same work on every call:
+
+- calling convention: whether the handler takes (args) or (args, config)
+  and whether it is a coroutine function (no inspect.signature() per call)
+- the OpenAI / Groq function schema, built once (shared - read-only)
+- an argument validator compiled from the tool's JSON schema, so arguments
+  that don't match are rejected before dispatch with a precise message the
+  LLM can act on (instead of a vague handler error on the next round-trip)
+
+The validator covers the JSON-Schema keywords the tool schemas use: type,
+enum, required, properties, additionalProperties, items, minimum / maximum.
+Numbers the LLM quoted ("10") pass for integer / number fields - the
+handlers convert them anyway.
+"""
+
+import copy
+import inspect
+from typing import Any, Callable, Dict, List, Optional
+
+# Returns None when the value is valid, otherwise what is wrong with it
+Validator = Callable[[Any, str], Optional[str]]
+
+
+def _is_number_string(value: Any, integer: bool) -> bool:
+    if not isinstance(value, str):
+        return False
+    try:
+        number = float(value)
+    except ValueError:
+        return False
+    return not integer or number.is_integer()
+
+
+# JSON-Schema type name -> check (bool is not a number in JSON)
+_TYPE_CHECKS: Dict[str, Callable[[Any], bool]] = {
+    "string": lambda v: isinstance(v, str),
+    "integer": lambda v: (isinstance(v, int) and not isinstance(v, bool))
+        or (isinstance(v, float) and v.is_integer())
+        or _is_number_string(v, integer=True),
+    "number": lambda v: (isinstance(v, (int, float)) and not isinstance(v, bool))
+        or _is_number_string(v, integer=False),
+    "boolean": lambda v: isinstance(v, bool),
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "null": lambda v: v is None,
+}
+
+
+def _where(path: str) -> str:
+    return f"'{path}'" if path else "arguments"
+
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if value.is_integer() else str(value)
+
+
+def compile_validator(schema: Dict[str, Any]) -> Validator:
+    """
+    Build a validator for `schema`: validator(value, path) returns None when
+    `value` matches, otherwise a message naming the offending field.
+    Each keyword becomes one small check, so validating a call is a few
+    dict lookups - no schema walking at call time.
+    """
+    checks: List[Validator] = []
+
+    types = schema.get("type")
+    if types is None and "properties" in schema:
+        types = "object"
+    if types is not None:
+        type_names = [types] if isinstance(types, str) else list(types)
+        type_checks = [_TYPE_CHECKS[t] for t in type_names if t in _TYPE_CHECKS]
+        expected = " or ".join(type_names)
+        if type_checks:
+            def check_type(value, path):
+                if not any(check(value) for check in type_checks):
+                    return f"{_where(path)} must be {expected}, got {type(value).__name__}"
+            checks.append(check_type)
+
+    if "enum" in schema:
+        allowed = list(schema["enum"])
+        def check_enum(value, path):
+            if value not in allowed:
+                return f"{_where(path)} must be one of {', '.join(repr(a) for a in allowed)}, got {value!r}"
+        checks.append(check_enum)
+
+    for keyword, fails, relation in (("minimum", float.__lt__, ">="), ("maximum", float.__gt__, "<=")):
+        if keyword in schema:
+            bound = float(schema[keyword])
+            def check_bound(value, path, bound=bound, fails=fails, relation=relation):
+                try:
+                    number = float(value)
+                except (TypeError, ValueError):
+                    return None  # not a number: reported by the type check
+                if fails(number, bound):
+                    return f"{_where(path)} must be {relation} {_format_number(bound)}, got {value!r}"
+            checks.append(check_bound)
+
+    properties = {
+        name: compile_validator(sub_schema)
+        for name, sub_schema in (schema.get("properties") or {}).items()
+    }
+    required = list(schema.get("required") or [])
+    additional = schema.get("additionalProperties", True)
+    additional_validator = compile_validator(additional) if isinstance(additional, dict) else None
+    if properties or required or additional is not True:
+        def check_object(value, path):
+            if not isinstance(value, dict):
+                return None  # reported by the type check
+            prefix = f"{path}." if path else ""
+            for name in required:
+                if value.get(name) is None:
+                    return f"'{prefix}{name}' is required"
+            for name, item in value.items():
+                validator = properties.get(name)
+                if validator is None:
+                    if additional is False:
+                        known = ", ".join(properties) or "none"
+                        return f"unknown argument '{prefix}{name}' (expected: {known})"
+                    validator = additional_validator
+                if validator is not None:
+                    error = validator(item, f"{prefix}{name}")
+                    if error:
+                        return error
+        checks.append(check_object)
+
+    if isinstance(schema.get("items"), dict):
+        item_validator = compile_validator(schema["items"])
+        def check_items(value, path):
+            if not isinstance(value, list):
+                return None
+            for index, item in enumerate(value):
+                error = item_validator(item, f"{path or 'arguments'}[{index}]")
+                if error:
+                    return error
+        checks.append(check_items)
+
+    if not checks:
+        return lambda value, path: None
+    if len(checks) == 1:
+        return checks[0]
+
+    def validate(value, path):
+        for check in checks:
+            error = check(value, path)
+            if error:
+                return error
+    return validate
+
+
+class CompiledTool:
+    """
+    What ToolRegistry needs at call time, derived once from a ToolDefinition.
+
+    Attributes:
+    handler: the handler this calling convention was derived from (a
+        replaced tool.handler - e.g. benchmarks/fake_tools - is recompiled)
+    takes_config: handler signature is (args, config) rather than (args)
+    is_async: handler is an `async def`
+    schema: OpenAI / Groq function calling schema (read-only, shared)
+    validate: validator for the LLM arguments, see compile_validator()
+    """
+    __slots__ = ("handler", "takes_config", "is_async", "schema", "validate")
+
+    def __init__(self, tool: Any):
+        self.handler = tool.handler
+        self.takes_config = len(inspect.signature(tool.handler).parameters) >= 2
+        self.is_async = inspect.iscoroutinefunction(tool.handler)
+        parameters = copy.deepcopy(tool.parameters)
+        self.schema = {
+            "type": "function",
+            "function": {
+                "name": tool.name,
+                "description": tool.description,
+                "parameters": parameters,
+            },
+        }
+        self.validate = compile_validator(parameters)
+
+    def with_handler(self, handler: Callable[..., Any]) -> "CompiledTool":
+        """ Copy of this entry for a replaced handler (schema / validator are kept) """
+        compiled = copy.copy(self)
+        compiled.handler = handler
+        compiled.takes_config = len(inspect.signature(handler).parameters) >= 2
+        compiled.is_async = inspect.iscoroutinefunction(handler)
+        return compiled
+
+    def check_arguments(self, arguments: Any) -> Optional[str]:
+        """ None when the LLM arguments match the schema, otherwise the error for the LLM """
+        if not isinstance(arguments, dict):
+            return "arguments must be a JSON object"
+        return self.validate(arguments, "")
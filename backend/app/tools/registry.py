@@ -8,19 +8,19 @@ this file defines all abailable tools with
     """
     
 from typing import Dict, Any, List
-import requests
 from email.mime.text import MIMEText
 import base64
 from collections import defaultdict
 
+from app.core.http import get_http_client
 from app.tools.gmail_helpers import gmail_list_recent, gmail_search, gmail_create_draft, gmail_top_emails
 from app.tools.definitions import ToolDefinition, TOOL_REGISTRY, register_tool
 from app.services.google_oauth import build_gmail_client_from_tokens, refresh_gmail_tokens
-from app.mcp.client import call_mcp_tool, MCPClientError
+from app.mcp.client import acall_mcp_tool, MCPClientError
 
 # TAVILY WEB SEARCH
 
-def _tavily_handler(args: Dict[str,Any])-> str:
+async def _tavily_handler(args: Dict[str,Any])-> str:
     """
     Execute Tavily web search for CURRENT and REAL-TIME information
 
@@ -74,7 +74,7 @@ def _tavily_handler(args: Dict[str,Any])-> str:
         "include_answer" : True,
     }
     try:
-        resp = requests.post(url, json=payload, timeout=20)
+        resp = await get_http_client().post(url, json=payload, timeout=20)
     except Exception as e:
         return f"Error: Tavily request failed: {str(e)}"
     
@@ -135,11 +135,12 @@ register_tool(ToolDefinition(
         "required": ["query"]
     },
     handler= _tavily_handler,
-    require_config = ["api_key"]
+    require_config = ["api_key"],
+    cache_ttl = 60 * 60,  # search results are reused for an hour
 ))
 
 # WEATHER (OpenWeatherMap)
-def _weather_handler(args: Dict[str, Any])-> str:
+async def _weather_handler(args: Dict[str, Any])-> str:
     """
     Get current weather for a location
     
@@ -163,8 +164,6 @@ def _weather_handler(args: Dict[str, Any])-> str:
     if not api_key:
         return f"Error: OpenWeatherMap API key not configured. Cannot get weather for '{location}'."
     
-    print(f"[DEBUG] Weather API call for {location} ")
-    
     url = "https://api.openweathermap.org/data/2.5/weather"
     payload = {
         "q": location,
@@ -173,7 +172,7 @@ def _weather_handler(args: Dict[str, Any])-> str:
     }
     
     try:
-        resp = requests.get(url, params=payload, timeout=10)
+        resp = await get_http_client().get(url, params=payload, timeout=10)
     except Exception as e:
         return f"Error: Weather API request failed: {str(e)}"
     
@@ -238,6 +237,7 @@ register_tool(ToolDefinition(
     },
     handler=_weather_handler,
     require_config=["api_key"],  # Will be injected as _config_api_key
+    cache_ttl=10 * 60,  # conditions barely change within 10 minutes
 ))
 
 
@@ -251,8 +251,6 @@ def gmail_tool_handler(args: Dict[str, Any], config: Dict[str, Any]) -> str:
         config["gmail_credentials"] -> token dict from OAuth.
     Automatically refreshes expired tokens.
     """
-    print(f"[DEBUG] Gmail handler called with config keys: {list((config or {}).keys())}")
-    
     gmail_creds = (config or {}).get("gmail_credentials")
     if not gmail_creds:
         return "Error: Gmail is not connected. Please go to Add Tools, click 'Connect' on Gmail Toolkit, and complete the Google login to authorize access to your emails."
@@ -348,12 +346,16 @@ gmail_tool = ToolDefinition(
          "required" : ["action"],
     },
     handler = gmail_tool_handler,
+    # Mailbox reads are reused within a run only (the inbox changes between
+    # runs); creating a draft is a side effect
+    run_memo = True,
+    non_cacheable_actions = ["draft"],
 )
 register_tool(gmail_tool)
 
 # MCP TOOL Handler
 
-def mcp_tool_handler(args: Dict[str, Any], config: Dict[str, Any]) -> str:
+async def mcp_tool_handler(args: Dict[str, Any], config: Dict[str, Any]) -> str:
     """ 
     
     Generic MCP Proxy tool handler.
@@ -375,7 +377,7 @@ def mcp_tool_handler(args: Dict[str, Any], config: Dict[str, Any]) -> str:
     What It Does:
     1. Validates that endpoint is present.
     2. Builds a lightweight server-like object with .endpoint and .config_json attributes.
-    3. Uses call_mcp_tool(server, tool_name, arguments) to talk to the MCP server.
+    3. Uses acall_mcp_tool(server, tool_name, arguments) to talk to the MCP server.
     4. Returns the result string back to the LLM.
     
     Important:
@@ -394,7 +396,7 @@ def mcp_tool_handler(args: Dict[str, Any], config: Dict[str, Any]) -> str:
     endpoint = config.get("endpoint")
     server_config_json = config.get("config_json") or {}
     
-    # 3. Build a lightweight MCP Server - like object so we can reuse call_mcp_tool
+    # 3. Build a lightweight MCP Server - like object so we can reuse acall_mcp_tool
     class _SimpleServer:
         def __init__(self,endpoint:str, config_json:dict[str,Any]):
             self.endpoint = endpoint
@@ -404,7 +406,7 @@ def mcp_tool_handler(args: Dict[str, Any], config: Dict[str, Any]) -> str:
     
     # 4 cal the MCP Server via our HTTP Client
     try: 
-        result = call_mcp_tool(
+        result = await acall_mcp_tool(
             server = server_obj,   # has endpoint + config_json
             tool_name = tool_name,
             arguments = tool_args,
@@ -0,0 +1,3 @@
+"""
+Offline benchmarks: fake LLM server, fake tools and the run_bench driver.
+"""
@@ -0,0 +1,216 @@
+"""
+Local stand-in for the Groq / OpenAI chat-completions API.
+
+Speaks enough of the wire format for the groq SDK (plain and streamed
+completions, tool calls, usage) so the real client code path is measured.
+Point the app at it with LLM_BASE_URL=<server.url> before app.llm.client
+is imported.
+
+Scripted behaviour, per agent conversation:
+- while fewer than `tool_rounds` assistant tool-call turns are in the
+  conversation and tools are offered, answer with `tool_calls_per_turn`
+  calls (cycling over the offered tools, arguments built from their
+  JSON schemas and unique per call so the runtime's loop detection and
+  the tool cache don't kick in)
+- otherwise answer with `response_words` words of text
+Every request waits `latency_ms` first (simulated model time).
+"""
+
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+
+class FakeLLMServer:
+    """
+    Usage:
+        server = FakeLLMServer(latency_ms=50)
+        server.start()
+        os.environ["LLM_BASE_URL"] = server.url
+        ...
+        server.tool_calls_per_turn = 2   # change the script between scenarios
+        server.stop()
+    """
+    def __init__(
+        self,
+        latency_ms: float = 0,
+        tool_calls_per_turn: int = 0,
+        tool_rounds: int = 1,
+        response_words: int = 60,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.latency_ms = latency_ms
+        self.tool_calls_per_turn = tool_calls_per_turn
+        self.tool_rounds = tool_rounds
+        self.response_words = response_words
+        self.requests = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-llm", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def reset_counters(self) -> None:
+        with self._lock:
+            self.requests = 0
+
+    def _next_id(self) -> int:
+        with self._lock:
+            return next(self._ids)
+
+    # Scripted completions
+
+    def complete(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """ Build the assistant message ({"content"} or {"tool_calls"}) for a request """
+        with self._lock:
+            self.requests += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+        messages = request.get("messages") or []
+        tools = request.get("tools") or []
+        rounds_done = sum(1 for m in messages if m.get("role") == "assistant" and m.get("tool_calls"))
+
+        if tools and self.tool_calls_per_turn > 0 and rounds_done < self.tool_rounds:
+            calls = []
+            for i in range(self.tool_calls_per_turn):
+                function = tools[i % len(tools)]["function"]
+                call_id = self._next_id()
+                calls.append({
+                    "id": f"call_{call_id}",
+                    "type": "function",
+                    "function": {
+                        "name": function["name"],
+                        "arguments": json.dumps(_arguments_for(function.get("parameters") or {}, call_id)),
+                    },
+                })
+            return {"role": "assistant", "content": None, "tool_calls": calls}
+
+        words = ("benchmark " * self.response_words).strip()
+        return {"role": "assistant", "content": f"Fake answer #{self._next_id()}: {words}"}
+
+
+def _arguments_for(schema: Dict[str, Any], call_id: int) -> Dict[str, Any]:
+    """ Minimal valid arguments for a JSON schema (required properties only) """
+    properties = schema.get("properties") or {}
+    args = {}
+    for name in schema.get("required") or []:
+        prop = properties.get(name) or {}
+        if prop.get("enum"):
+            args[name] = prop["enum"][0]
+        elif prop.get("type") == "integer":
+            args[name] = call_id
+        elif prop.get("type") == "object":
+            args[name] = {}
+        else:
+            args[name] = f"bench-{call_id}"
+    args["_bench_call"] = call_id
+    return args
+
+
+def _usage(request: Dict[str, Any], message: Dict[str, Any]) -> Dict[str, int]:
+    prompt_chars = sum(len(m.get("content") or "") for m in request.get("messages") or [])
+    completion_chars = len(message.get("content") or json.dumps(message.get("tool_calls") or []))
+    prompt_tokens, completion_tokens = prompt_chars // 4 + 1, completion_chars // 4 + 1
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+def _stream_chunks(base: Dict[str, Any], message: Dict[str, Any], usage: Dict[str, int]) -> List[Dict[str, Any]]:
+    """ Split a completion into chat.completion.chunk objects """
+    def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> Dict[str, Any]:
+        return {**base, "object": "chat.completion.chunk",
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+
+    chunks = [chunk({"role": "assistant", "content": ""})]
+    if message.get("tool_calls"):
+        for index, tc in enumerate(message["tool_calls"]):
+            chunks.append(chunk({"tool_calls": [{
+                "index": index, "id": tc["id"], "type": "function",
+                "function": {"name": tc["function"]["name"], "arguments": ""},
+            }]}))
+            chunks.append(chunk({"tool_calls": [{
+                "index": index, "function": {"arguments": tc["function"]["arguments"]},
+            }]}))
+        finish_reason = "tool_calls"
+    else:
+        for word in message["content"].split(" "):
+            chunks.append(chunk({"content": word + " "}))
+        finish_reason = "stop"
+    last = chunk({}, finish_reason)
+    last["x_groq"] = {"id": base["id"], "usage": usage}
+    chunks.append(last)
+    return chunks
+
+
+def _make_handler(server: FakeLLMServer):
+    class _Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body go out as two writes; without TCP_NODELAY the body
+        # waits for the delayed ACK of the headers (~40ms per request)
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):  # keep benchmark output clean
+            pass
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+                return
+            length = int(self.headers.get("Content-Length") or 0)
+            request = json.loads(self.rfile.read(length) or b"{}")
+
+            message = server.complete(request)
+            usage = _usage(request, message)
+            base = {
+                "id": f"chatcmpl-{server._next_id()}",
+                "created": int(time.time()),
+                "model": request.get("model", "fake"),
+            }
+
+            if request.get("stream"):
+                body = "".join(
+                    f"data: {json.dumps(c)}\n\n" for c in _stream_chunks(base, message, usage)
+                ) + "data: [DONE]\n\n"
+                self._send(200, body.encode("utf-8"), "text/event-stream")
+                return
+
+            finish_reason = "tool_calls" if message.get("tool_calls") else "stop"
+            self._send_json(200, {
+                **base,
+                "object": "chat.completion",
+                "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                "usage": usage,
+            })
+
+        def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+            self._send(status, json.dumps(payload).encode("utf-8"), "application/json")
+
+        def _send(self, status: int, body: bytes, content_type: str) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return _Handler
@@ -0,0 +1,44 @@
+"""
+Replaceable handlers for the registered tools.
+
+install_fake_tools() swaps the handler of every tool in TOOL_REGISTRY for
+an async fake that sleeps `latency_ms` and returns `result_chars` of text,
+so benchmarks exercise the real registry / runtime code without calling
+Tavily, OpenWeatherMap, Gmail or MCP servers.
+"""
+
+import asyncio
+from typing import Any, Callable, Dict, Optional
+
+from app.tools.definitions import TOOL_REGISTRY
+import app.tools.registry  # noqa: F401  (registers the real tools)
+
+
+def make_fake_handler(name: str, latency_ms: float, result_chars: int) -> Callable[..., Any]:
+    """ Async handler with the (args, config) signature of the real handlers """
+    async def _fake_handler(args: Dict[str, Any], config: Dict[str, Any]) -> str:
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        return f"[{name}] " + ("x" * max(0, result_chars))
+    return _fake_handler
+
+
+def install_fake_tools(
+    latency_ms: float = 0,
+    result_chars: int = 500,
+    handlers: Optional[Dict[str, Callable[..., Any]]] = None,
+) -> Callable[[], None]:
+    """
+    Replace every registered tool's handler (or only use `handlers[name]`
+    where given). Returns a function restoring the original handlers.
+    """
+    originals = {}
+    for name in TOOL_REGISTRY.list_tools():
+        tool = TOOL_REGISTRY.get(name)
+        originals[name] = tool.handler
+        tool.handler = (handlers or {}).get(name) or make_fake_handler(name, latency_ms, result_chars)
+
+    def restore() -> None:
+        for name, handler in originals.items():
+            TOOL_REGISTRY.get(name).handler = handler
+    return restore
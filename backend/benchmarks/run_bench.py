@@ -0,0 +1,305 @@
+"""
+Offline end-to-end benchmark of the run pipeline.
+
+Every external dependency is replaced by a local stand-in: the LLM by
+FakeLLMServer (real groq SDK, real HTTP), the tools by fake handlers. What
+is left - and measured - is our own overhead: graph scheduling, prompt
+building, tool loop, DB writes, API layer.
+
+Needs a database (DATABASE_URL, tables are created if missing); use a
+scratch database, the benchmark inserts and then deletes its own rows.
+--sqlite runs against a throwaway SQLite file instead (embedded mode, no
+outside services at all).
+
+Run from backend/:
+    python -m benchmarks.run_bench
+    python -m benchmarks.run_bench --mode graph,api --agents 1,4,8 --tool-calls 0,2 \\
+        --concurrency 1,8,32 --runs 50 --llm-latency-ms 50 --tool-latency-ms 20 --json bench.json
+
+For every (mode, agents, tool calls, concurrency) scenario it reports
+throughput, p50 / p95 / p99 run latency, the ideal latency of the graph's
+critical path (pure simulated LLM + tool time) and DB queries / LLM
+requests per run.
+
+Modes:
+- graph: arun_assistant_graph() directly (run creation / context loading
+  happen before the clock starts)
+- api:   POST /assistants/{id}/runs through the ASGI app (in process)
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List
+
+from benchmarks.fake_llm import FakeLLMServer
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """ Linear interpolation percentile of an already sorted list """
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * p / 100
+    lower, upper = math.floor(k), math.ceil(k)
+    if lower == upper:
+        return sorted_values[int(k)]
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (k - lower)
+
+
+def make_graph(agents: int, shape: str, tool_ref_ids: List[int]) -> Dict[str, Any]:
+    """
+    "chain":  a0 -> a1 -> ... -> aN
+    "fanout": a0 -> (a1 .. aN-1 in parallel) -> aN   (chain below 3 agents)
+    """
+    ids = [f"a{i}" for i in range(agents)]
+    nodes = [{
+        "id": agent_id,
+        "type": "agent",
+        "role": f"Bench agent {i}",
+        "system_prompt": f"You are benchmark agent {i}. Answer briefly.",
+        "tool_refs": [{"kind": "user_tool", "id": tid} for tid in tool_ref_ids],
+    } for i, agent_id in enumerate(ids)]
+
+    if shape == "fanout" and agents >= 3:
+        middle = ids[1:-1]
+        edges = [{"from": ids[0], "to": m} for m in middle] + [{"from": m, "to": ids[-1]} for m in middle]
+    else:
+        edges = [{"from": a, "to": b} for a, b in zip(ids, ids[1:])]
+    return {"nodes": nodes, "edges": edges}
+
+
+def critical_path_ms(agents: int, shape: str, tool_calls: int, llm_ms: float, tool_ms: float, tool_parallel: int) -> float:
+    """ Simulated time of the longest dependency chain - the floor for a run's latency """
+    depth = 3 if shape == "fanout" and agents >= 3 else agents
+    per_agent = llm_ms
+    if tool_calls:
+        per_agent += tool_ms * math.ceil(tool_calls / max(1, tool_parallel)) + llm_ms
+    return depth * per_agent
+
+
+class QueryCounter:
+    """ Counts SQL statements sent through the given engines """
+    def __init__(self, *engines):
+        from sqlalchemy import event
+        self.count = 0
+        self._lock = threading.Lock()
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args, **kwargs):
+        with self._lock:
+            self.count += 1
+
+
+async def run_scenario(ctx: Dict[str, Any], mode: str, agents: int, tool_calls: int, concurrency: int, args) -> Dict[str, Any]:
+    from app.db.models import Assistant
+    from app.schemas.schemas import RunCreate
+    from app.services.run_executor import create_run, load_run_context
+    from app.agents.runtime import arun_assistant_graph, MAX_PARALLEL_TOOL_CALLS
+
+    server: FakeLLMServer = ctx["server"]
+    SessionLocal = ctx["SessionLocal"]
+    server.tool_calls_per_turn = tool_calls
+    server.tool_rounds = 1
+
+    def _create_assistant() -> int:
+        db = SessionLocal()
+        try:
+            assistant = Assistant(
+                name=f"bench {mode} {agents}x{tool_calls}",
+                graph_json=make_graph(agents, args.shape, [ctx["tool_id"]] if tool_calls else []),
+            )
+            db.add(assistant)
+            db.commit()
+            return assistant.id
+        finally:
+            db.close()
+
+    assistant_id = await asyncio.to_thread(_create_assistant)
+    counter = itertools.count()
+
+    async def _one_run() -> float:
+        input_text = f"benchmark question {next(counter)}"
+        if mode == "api":
+            started = time.perf_counter()
+            resp = await ctx["http"].post(f"/assistants/{assistant_id}/runs", json={"input_text": input_text})
+            elapsed = time.perf_counter() - started
+            if resp.status_code != 200:
+                raise RuntimeError(f"POST /runs returned {resp.status_code}: {resp.text[:200]}")
+            return elapsed
+
+        db = SessionLocal()
+        try:
+            def _prepare():
+                assistant, run = create_run(db, assistant_id, RunCreate(input_text=input_text))
+                previous_messages, tools_by_agent = load_run_context(db, assistant, run)
+                return assistant, run, previous_messages, tools_by_agent
+            assistant, run, previous_messages, tools_by_agent = await asyncio.to_thread(_prepare)
+            started = time.perf_counter()
+            await arun_assistant_graph(db, assistant, run, previous_messages, tools_by_agent)
+            return time.perf_counter() - started
+        finally:
+            db.close()
+
+    limiter = asyncio.Semaphore(concurrency)
+
+    async def _limited() -> float:
+        async with limiter:
+            return await _one_run()
+
+    for _ in range(args.warmup):
+        await _one_run()
+
+    queries_before = ctx["queries"].count
+    server.reset_counters()
+    started = time.perf_counter()
+    latencies = sorted(await asyncio.gather(*[_limited() for _ in range(args.runs)]))
+    wall = time.perf_counter() - started
+    queries = ctx["queries"].count - queries_before
+
+    await asyncio.to_thread(_delete_assistant, SessionLocal, assistant_id)
+
+    return {
+        "mode": mode,
+        "shape": args.shape,
+        "agents": agents,
+        "tool_calls": tool_calls,
+        "concurrency": concurrency,
+        "runs": args.runs,
+        "throughput_rps": round(args.runs / wall, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "ideal_ms": round(critical_path_ms(
+            agents, args.shape, tool_calls, args.llm_latency_ms, args.tool_latency_ms, MAX_PARALLEL_TOOL_CALLS,
+        ), 1),
+        "queries_per_run": round(queries / args.runs, 1),
+        "llm_requests_per_run": round(server.requests / args.runs, 1),
+    }
+
+
+def _delete_assistant(SessionLocal, assistant_id: int) -> None:
+    from app.db.models import Assistant
+    db = SessionLocal()
+    try:
+        assistant = db.query(Assistant).filter(Assistant.id == assistant_id).first()
+        if assistant:
+            db.delete(assistant)
+            db.commit()
+    finally:
+        db.close()
+
+
+def print_report(results: List[Dict[str, Any]]) -> None:
+    columns = [
+        ("mode", 5), ("agents", 6), ("tool_calls", 10), ("concurrency", 11), ("runs", 5),
+        ("throughput_rps", 14), ("p50_ms", 9), ("p95_ms", 9), ("p99_ms", 9), ("ideal_ms", 9),
+        ("queries_per_run", 15), ("llm_requests_per_run", 20),
+    ]
+    print(" ".join(name.rjust(width) for name, width in columns))
+    for row in results:
+        print(" ".join(str(row[name]).rjust(width) for name, width in columns))
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the multi-agent run pipeline")
+    parser.add_argument("--mode", default="graph,api", help="comma list of: graph, api")
+    parser.add_argument("--shape", default="fanout", choices=["chain", "fanout"])
+    parser.add_argument("--agents", type=_int_list, default=[1, 3, 6])
+    parser.add_argument("--tool-calls", type=_int_list, default=[0, 2], help="tool calls per agent")
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 8])
+    parser.add_argument("--runs", type=int, default=20, help="measured runs per scenario")
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--llm-latency-ms", type=float, default=50)
+    parser.add_argument("--tool-latency-ms", type=float, default=20)
+    parser.add_argument("--response-words", type=int, default=60)
+    parser.add_argument("--provider", default="groq", choices=["groq", "openai"],
+                        help="LLM provider talking to the fake server")
+    parser.add_argument("--sqlite", action="store_true",
+                        help="use a temporary SQLite database instead of DATABASE_URL")
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    return parser.parse_args()
+
+
+async def main_async(args) -> List[Dict[str, Any]]:
+    server = FakeLLMServer(latency_ms=args.llm_latency_ms, response_words=args.response_words)
+    server.start()
+
+    # Must be set before the app (and its LLM client) is imported
+    os.environ["LLM_BASE_URL"] = server.url
+    os.environ["GROQ_API_KEY"] = "bench-key"
+    os.environ["OPENAI_COMPAT_BASE_URL"] = server.url
+    os.environ["LLM_PROVIDER"] = args.provider
+    os.environ["CHAT_SUMMARY_ENABLED"] = "false"
+    os.environ["LLM_CACHE_ENABLED"] = "false"
+    if args.sqlite:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='bench-')}/bench.db"
+
+    import httpx
+    from app.db.base import Base
+    from app.db.models import UserToolConnection
+    from app.db.session import engine, SessionLocal, async_engine
+    from app.main import app
+    from benchmarks.fake_tools import install_fake_tools
+
+    Base.metadata.create_all(bind=engine)
+    restore_tools = install_fake_tools(latency_ms=args.tool_latency_ms)
+
+    db = SessionLocal()
+    tool = UserToolConnection(name="bench tavily", template_key="tavily", status="connected",
+                              config_json={"api_key": "bench"})
+    db.add(tool)
+    db.commit()
+
+    ctx = {
+        "server": server,
+        "SessionLocal": SessionLocal,
+        "tool_id": tool.id,
+        # The async engine (DATABASE_ASYNC_ENABLED) writes the runs' messages
+        "queries": QueryCounter(engine, *([async_engine.sync_engine] if async_engine is not None else [])),
+        "http": httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None),
+    }
+
+    results = []
+    try:
+        for mode in [m.strip() for m in args.mode.split(",") if m.strip()]:
+            for agents in args.agents:
+                for tool_calls in args.tool_calls:
+                    for concurrency in args.concurrency:
+                        result = await run_scenario(ctx, mode, agents, tool_calls, concurrency, args)
+                        results.append(result)
+                        print(f"[bench] {mode} agents={agents} tool_calls={tool_calls} "
+                              f"concurrency={concurrency}: p50 {result['p50_ms']}ms", flush=True)
+    finally:
+        await ctx["http"].aclose()
+        db.delete(tool)
+        db.commit()
+        db.close()
+        restore_tools()
+        server.stop()
+    return results
+
+
+def main() -> None:
+    args = parse_args()
+    results = asyncio.run(main_async(args))
+    print()
+    print_report(results)
+    if args.json_path:
+        from app.db.session import pool_stats
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results, "db_pool": pool_stats()}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
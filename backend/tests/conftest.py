@@ -0,0 +1,52 @@
+"""
+Shared test setup.
+
+Tests always run against an in-memory SQLite database (never the
+DATABASE_URL of the environment - tables are dropped after every test)
+and without background LLM work. LLM calls go to the local fake server
+from benchmarks/ (fake_llm fixture), so no test needs network access.
+"""
+
+import os
+
+# Must be set before app.core.config is imported
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ["DATABASE_ASYNC_ENABLED"] = "false"
+os.environ["CHAT_SUMMARY_ENABLED"] = "false"
+os.environ["LLM_CACHE_ENABLED"] = "false"
+os.environ["LLM_PROVIDER"] = "groq"
+
+import pytest
+
+from app.core.config import settings
+from app.db import models  # noqa: F401  (registers the tables)
+from app.db.base import Base
+from app.db.session import SessionLocal, engine
+from app.llm import providers
+from benchmarks.fake_llm import FakeLLMServer
+
+
+@pytest.fixture
+def db():
+    """ Session on a fresh, empty database """
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """ FakeLLMServer the Groq provider talks to (providers are recreated for the test) """
+    server = FakeLLMServer(latency_ms=0, response_words=5)
+    server.start()
+    monkeypatch.setattr(settings, "LLM_BASE_URL", server.url)
+    monkeypatch.setattr(settings, "Groq_API_KEY", "test-key")
+    monkeypatch.setattr(providers, "_providers", {})
+    try:
+        yield server
+    finally:
+        server.stop()
@@ -0,0 +1,97 @@
+"""
+Keyset pagination of chat transcripts (app/services/chat_history.load_message_page).
+"""
+
+import pytest
+
+from app.db.models import Assistant, Chat, Message, Run
+from app.services.chat_history import load_message_page
+
+LONG_ANSWER = "word " * 1000  # above MESSAGE_COMPRESS_MIN_CHARS: stored compressed
+
+
+@pytest.fixture
+def chat_ids(db):
+    """
+    Two chats whose messages interleave: chat 1 gets messages "m0".."m6"
+    (the last one compressed), chat 2 a message between every two of them.
+    """
+    assistant = Assistant(name="test", graph_json={"nodes": [], "edges": []})
+    chat, other = Chat(assistant=assistant), Chat(assistant=assistant)
+    db.add_all([chat, other])
+    db.flush()
+    runs = [Run(assistant=assistant, chat_id=c.id, input_text="q") for c in (chat, other, chat)]
+    db.add_all(runs)
+    db.flush()
+
+    contents = [f"m{i}" for i in range(6)] + [LONG_ANSWER]
+    for i, content in enumerate(contents):
+        run = runs[0] if i < 3 else runs[2]
+        db.add(Message(run_id=run.id, sender="user" if i % 2 == 0 else "writer", content=content))
+        db.flush()
+        db.add(Message(run_id=runs[1].id, sender="user", content=f"other {i}"))
+        db.flush()
+    db.commit()
+    return chat.id, other.id
+
+
+def contents(messages):
+    return [m["content"] for m in messages]
+
+
+def test_latest_page(db, chat_ids):
+    messages, has_more = load_message_page(db, chat_ids[0], limit=3)
+
+    assert contents(messages) == ["m4", "m5", LONG_ANSWER]
+    assert has_more is True
+    assert [m["id"] for m in messages] == sorted(m["id"] for m in messages)
+
+
+def test_before_id_pages_towards_older_messages(db, chat_ids):
+    page, _ = load_message_page(db, chat_ids[0], limit=3)
+
+    older, has_more = load_message_page(db, chat_ids[0], limit=3, before_id=page[0]["id"])
+    assert contents(older) == ["m1", "m2", "m3"]
+    assert has_more is True
+
+    oldest, has_more = load_message_page(db, chat_ids[0], limit=3, before_id=older[0]["id"])
+    assert contents(oldest) == ["m0"]
+    assert has_more is False
+
+
+def test_after_id_pages_towards_newer_messages(db, chat_ids):
+    oldest, _ = load_message_page(db, chat_ids[0], limit=7)
+
+    newer, has_more = load_message_page(db, chat_ids[0], limit=3, after_id=oldest[0]["id"])
+    assert contents(newer) == ["m1", "m2", "m3"]
+    assert has_more is True
+
+    newest, has_more = load_message_page(db, chat_ids[0], limit=3, after_id=newer[-1]["id"])
+    assert contents(newest) == ["m4", "m5", LONG_ANSWER]
+    assert has_more is False
+
+
+def test_exact_fit_has_no_more(db, chat_ids):
+    messages, has_more = load_message_page(db, chat_ids[0], limit=7)
+
+    assert len(messages) == 7
+    assert has_more is False
+
+
+def test_pages_only_contain_the_chat(db, chat_ids):
+    messages, has_more = load_message_page(db, chat_ids[1], limit=50)
+
+    assert contents(messages) == [f"other {i}" for i in range(7)]
+    assert has_more is False
+    assert load_message_page(db, 999, limit=10) == ([], False)
+
+
+def test_metadata_only_page(db, chat_ids):
+    messages, _ = load_message_page(db, chat_ids[0], limit=2, with_content=False)
+
+    assert "content" not in messages[0]
+    assert messages[0]["content_chars"] == 2
+    assert messages[0]["content_preview"] == "m5"
+    assert messages[1]["content_chars"] == len(LONG_ANSWER)
+    assert messages[1]["content_preview"].startswith("word word")
+    assert messages[1]["content_preview"].endswith("...")
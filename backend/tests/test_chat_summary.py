@@ -0,0 +1,119 @@
+"""
+Rolling chat summary (app/services/chat_summary.update_chat_summary):
+runs whose own update was skipped are folded by the next one.
+"""
+
+import asyncio
+
+import pytest
+
+from app.db.models import Assistant, Chat, Message, Run
+from app.llm.client import LLMResponse
+from app.services import chat_summary
+
+LONG_ANSWER = "word " * 1000  # above MESSAGE_COMPRESS_MIN_CHARS: stored compressed
+
+
+class FakeSummarizer:
+    """ Stands in for acall_llm_with_tools: records the prompts, can be told to fail """
+    def __init__(self):
+        self.prompts = []
+        self.fail = False
+
+    async def __call__(self, messages, **kwargs):
+        self.prompts.append(messages[-1]["content"])
+        if self.fail:
+            raise RuntimeError("summary model down")
+        return LLMResponse(content=f"summary #{len(self.prompts)}")
+
+
+@pytest.fixture
+def summarizer(monkeypatch):
+    fake = FakeSummarizer()
+    monkeypatch.setattr(chat_summary, "acall_llm_with_tools", fake)
+    return fake
+
+
+@pytest.fixture
+def chat_runs(db):
+    """ A chat with three runs; run i has the user message "question i" and one agent answer """
+    assistant = Assistant(name="test", graph_json={"nodes": [], "edges": []})
+    chat = Chat(assistant=assistant)
+    db.add(chat)
+    db.flush()
+    runs = []
+    for i in range(3):
+        run = Run(assistant=assistant, chat_id=chat.id, input_text=f"question {i}", status="completed")
+        db.add(run)
+        db.flush()
+        answer = LONG_ANSWER if i == 0 else f"answer {i}"
+        db.add_all([
+            Message(run_id=run.id, sender="user", content=f"question {i}"),
+            Message(run_id=run.id, sender="writer", content=answer),
+        ])
+        runs.append(run)
+    db.commit()
+    return chat.id, [run.id for run in runs]
+
+
+def update(chat_id, run_id):
+    asyncio.run(chat_summary.update_chat_summary(chat_id, run_id))
+
+
+def load_chat(db, chat_id):
+    db.expire_all()
+    return db.query(Chat).filter(Chat.id == chat_id).one()
+
+
+def test_runs_are_folded_in_order(db, summarizer, chat_runs):
+    chat_id, run_ids = chat_runs
+
+    update(chat_id, run_ids[0])
+    update(chat_id, run_ids[1])
+
+    chat = load_chat(db, chat_id)
+    assert chat.summary == "summary #2"
+    assert chat.summary_run_id == run_ids[1]
+    assert "question 0" in summarizer.prompts[0] and "word word" in summarizer.prompts[0]
+    assert "Current summary:\nsummary #1" in summarizer.prompts[1]
+    assert "question 0" not in summarizer.prompts[1] and "question 1" in summarizer.prompts[1]
+
+
+def test_later_run_finishing_first_folds_the_earlier_ones(db, summarizer, chat_runs):
+    chat_id, run_ids = chat_runs
+
+    update(chat_id, run_ids[2])
+    update(chat_id, run_ids[0])  # late task of an already folded run: no-op
+
+    chat = load_chat(db, chat_id)
+    assert chat.summary_run_id == run_ids[2]
+    assert len(summarizer.prompts) == 1
+    prompt = summarizer.prompts[0]
+    assert prompt.index("question 0") < prompt.index("question 1") < prompt.index("question 2")
+
+
+def test_failed_update_is_caught_up_by_the_next_one(db, summarizer, chat_runs):
+    chat_id, run_ids = chat_runs
+
+    summarizer.fail = True
+    update(chat_id, run_ids[0])
+    chat = load_chat(db, chat_id)
+    assert chat.summary is None and chat.summary_run_id is None
+
+    summarizer.fail = False
+    update(chat_id, run_ids[1])
+    chat = load_chat(db, chat_id)
+    assert chat.summary_run_id == run_ids[1]
+    assert "question 0" in summarizer.prompts[-1] and "question 1" in summarizer.prompts[-1]
+
+
+def test_fold_stops_before_a_run_in_progress(db, summarizer, chat_runs):
+    chat_id, run_ids = chat_runs
+    db.query(Run).filter(Run.id == run_ids[1]).update({"status": "running"})
+    db.commit()
+
+    update(chat_id, run_ids[2])
+
+    chat = load_chat(db, chat_id)
+    assert chat.summary_run_id == run_ids[0]
+    assert "question 1" not in summarizer.prompts[0] and "question 2" not in summarizer.prompts[0]
@@ -0,0 +1,91 @@
+"""
+Token-budgeted context assembly (app/agents/context.assemble_context).
+"""
+
+import pytest
+
+from app.agents.context import (
+    SUMMARY_SENDER,
+    TRUNCATION_MARKER,
+    ContextItem,
+    assemble_context,
+    count_tokens,
+)
+
+
+def items(*specs):
+    """ ContextItems from (sender, content, current_run) tuples, in chat order """
+    return [ContextItem(sender, content, index, current) for index, (sender, content, current) in enumerate(specs)]
+
+
+def used(blocks):
+    return sum(count_tokens(block) for block in blocks)
+
+
+def words(word, n):
+    return " ".join([word] * n)
+
+
+def test_everything_fits():
+    candidates = items(("planner", "plan", True), ("writer", "draft", True))
+
+    assert assemble_context(candidates, "q", 1000) == ["[planner]: \nplan", "[writer]: \ndraft"]
+    assert assemble_context(candidates, "q", None) == ["[planner]: \nplan", "[writer]: \ndraft"]
+
+
+@pytest.mark.parametrize("budget", [40, 120, 300, 500, 800])
+def test_budget_holds_with_truncation_and_omissions(budget):
+    candidates = items(
+        ("old_research", words("history", 300), False),
+        (SUMMARY_SENDER, words("summary", 150), False),
+        ("researcher", words("finding", 400), True),
+        ("critic", words("remark", 200), True),
+    )
+
+    blocks = assemble_context(candidates, "q", budget)
+
+    assert used(blocks) <= budget
+    assert blocks[-1].endswith("omitted to fit the context budget]")
+
+
+def test_omitted_note_is_counted_when_the_budget_is_exactly_full():
+    # The two current outputs exactly fill the budget on their own, the older one must go
+    candidates = items(("old", words("gamma", 50), False), ("a", words("alpha", 50), True), ("b", words("beta", 50), True))
+    budget = count_tokens(candidates[1].render()) + count_tokens(candidates[2].render())
+
+    blocks = assemble_context(candidates, "q", budget)
+
+    assert used(blocks) <= budget
+    assert blocks[-1].startswith("[")
+    assert "omitted" in blocks[-1]
+
+
+def test_current_run_outputs_come_first_and_keep_chat_order():
+    candidates = items(
+        ("old", words("older", 100), False),
+        ("planner", words("plan", 40), True),
+        ("researcher", words("finding", 40), True),
+    )
+    budget = count_tokens(candidates[1].render()) + count_tokens(candidates[2].render()) + 30
+
+    blocks = assemble_context(candidates, "q", budget)
+
+    assert [b.split("]")[0] for b in blocks[:2]] == ["[planner", "[researcher"]
+    assert blocks[2] == "[1 earlier agent output(s) omitted to fit the context budget]"
+    assert used(blocks) <= budget
+
+
+def test_oversize_item_is_condensed():
+    candidates = items(("researcher", words("finding", 1000), True))
+
+    blocks = assemble_context(candidates, "q", 200)
+
+    assert len(blocks) == 1
+    assert blocks[0].endswith(TRUNCATION_MARKER)
+    assert used(blocks) <= 200
+
+
+def test_budget_too_small_for_anything():
+    blocks = assemble_context(items(("researcher", words("finding", 100), True)), "q", 5)
+
+    assert blocks == []
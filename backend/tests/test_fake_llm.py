@@ -0,0 +1,64 @@
+"""
+The benchmark fake LLM server, driven through the real Groq provider.
+"""
+
+import asyncio
+
+from app.llm.client import acall_llm_with_tools
+
+SEARCH_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "search",
+        "description": "Search the web",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "query": {"type": "string"},
+                "max_results": {"type": "integer"},
+            },
+            "required": ["query"],
+        },
+    },
+}
+
+
+def test_text_answer(fake_llm):
+    response = asyncio.run(acall_llm_with_tools([{"role": "user", "content": "hi"}]))
+
+    assert response.has_content
+    assert not response.has_tool_calls
+    assert response.content.startswith("Fake answer #")
+    assert fake_llm.requests == 1
+
+
+def test_scripted_tool_calls(fake_llm):
+    fake_llm.tool_calls_per_turn = 2
+
+    async def conversation():
+        messages = [{"role": "user", "content": "look this up"}]
+        first = await acall_llm_with_tools(messages, tools=[SEARCH_TOOL])
+        messages.append({
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [
+                {"id": call["id"], "type": "function", "function": {"name": call["name"], "arguments": "{}"}}
+                for call in first.tool_calls
+            ],
+        })
+        messages += [
+            {"role": "tool", "tool_call_id": call["id"], "content": "result"}
+            for call in first.tool_calls
+        ]
+        second = await acall_llm_with_tools(messages, tools=[SEARCH_TOOL])
+        return first, second
+
+    first, second = asyncio.run(conversation())
+
+    assert len(first.tool_calls) == 2
+    for call in first.tool_calls:
+        assert call["name"] == "search"
+        assert isinstance(call["arguments"]["query"], str)
+    # After tool_rounds tool-call turns the server answers with text
+    assert second.has_content and not second.has_tool_calls
+    assert fake_llm.requests == 2
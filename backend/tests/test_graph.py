@@ -0,0 +1,148 @@
+"""
+graph_json validation, scheduling order and edge conditions (app/agents/graph.py).
+"""
+
+import pytest
+
+from app.agents.graph import (
+    GraphValidationError,
+    build_upstream_map,
+    condition_matches,
+    router_routes,
+    topological_order,
+    validate_graph,
+)
+
+
+def agent(node_id, **settings):
+    return {"id": node_id, "type": "agent", **settings}
+
+
+def graph(nodes, edges=()):
+    return {"nodes": list(nodes), "edges": list(edges)}
+
+
+# validate_graph
+
+def test_valid_fan_out_graph():
+    validate_graph(graph(
+        [agent("planner"), agent("a"), agent("b"), agent("writer")],
+        [
+            {"from": "planner", "to": "a"},
+            {"source": "planner", "target": "b"},
+            {"from": "a", "to": "writer"},
+            {"from": "b", "to": "writer"},
+        ],
+    ))
+
+
+@pytest.mark.parametrize("graph_json, message", [
+    ([], "graph_json must be an object"),
+    ({"nodes": {}}, "nodes must be a list"),
+    ({"nodes": [], "edges": {}}, "edges must be a list"),
+    (graph([{"type": "agent"}]), "must be an object with an 'id'"),
+    (graph([agent("a"), agent("a")]), "Duplicate node id 'a'"),
+    (graph([agent("a")], [{"from": "a", "to": "missing"}]), "references an unknown node"),
+    (graph([agent("a")], [{"from": "a", "to": "a"}]), "is a self loop"),
+    (graph([agent("a"), agent("b")], [{"from": "a", "to": "b", "condition": 3}]), "condition must be a string"),
+    (graph([agent("a"), agent("b")], [{"from": "a", "to": "b", "condition": "regex:("}]), "invalid regex"),
+])
+def test_rejects_malformed_graphs(graph_json, message):
+    with pytest.raises(GraphValidationError, match=message):
+        validate_graph(graph_json)
+
+
+def test_rejects_cycle():
+    with pytest.raises(GraphValidationError, match="cycle"):
+        validate_graph(graph(
+            [agent("a"), agent("b"), agent("c")],
+            [{"from": "a", "to": "b"}, {"from": "b", "to": "c"}, {"from": "c", "to": "a"}],
+        ))
+
+
+@pytest.mark.parametrize("settings, message", [
+    ({"context_tokens": 0}, "context_tokens must be a positive integer"),
+    ({"context_tokens": True}, "context_tokens must be a positive integer"),
+    ({"provider": "nope"}, "provider must be one of"),
+    ({"model": "  "}, "model must be a non-empty string"),
+    ({"max_tokens": -1}, "max_tokens must be a positive integer"),
+    ({"temperature": 2.5}, "temperature must be a number between 0 and 2"),
+    ({"timeout_s": 0}, "timeout_s must be a positive number"),
+])
+def test_rejects_bad_node_settings(settings, message):
+    with pytest.raises(GraphValidationError, match=message):
+        validate_graph(graph([agent("a", **settings)]))
+
+
+def test_accepts_node_settings():
+    validate_graph(graph([agent(
+        "a", context_tokens=2000, provider="groq", model="llama-3.1-8b-instant",
+        max_tokens=256, temperature=0, timeout_s=30,
+    )]))
+
+
+@pytest.mark.parametrize("router, message", [
+    ({"mode": "fuzzy"}, "mode must be one of"),
+    ({"rules": "x"}, "rules must be a list"),
+    ({"rules": [{"pattern": "hi"}]}, "every rule needs a 'pattern' and a 'route'"),
+    ({"rules": [{"pattern": "[", "route": "chat"}]}, "invalid regex"),
+    ({"rules": [], "default": ""}, "default must be a non-empty string"),
+    ({"rules": []}, "a rules router needs rules or a default route"),
+    ({"mode": "llm"}, "an llm router needs 'routes'"),
+])
+def test_rejects_bad_routers(router, message):
+    with pytest.raises(GraphValidationError, match=message):
+        validate_graph(graph([{"id": "route", "type": "router", **router}, agent("a")]))
+
+
+def test_llm_router_takes_routes_from_its_edges():
+    router = {"id": "route", "type": "router", "mode": "llm"}
+    edges = [
+        {"from": "route", "to": "writer", "condition": "chat"},
+        {"from": "route", "to": "planner", "condition": "research|deep"},
+    ]
+    validate_graph(graph([router, agent("writer"), agent("planner")], edges))
+
+    assert router_routes(router, [e["condition"] for e in edges]) == ["chat", "research", "deep"]
+    assert router_routes({**router, "routes": {"a": "desc"}}, []) == ["a"]
+
+
+# Scheduling order
+
+def test_topological_order_keeps_node_order_for_ties():
+    upstream = build_upstream_map(graph(
+        [agent("writer"), agent("b"), agent("a"), agent("planner")],
+        [
+            {"from": "planner", "to": "a"},
+            {"from": "planner", "to": "b"},
+            {"from": "a", "to": "writer"},
+            {"from": "b", "to": "writer"},
+        ],
+    ))
+
+    assert upstream == {"writer": ["a", "b"], "b": ["planner"], "a": ["planner"], "planner": []}
+    assert topological_order(upstream) == ["planner", "b", "a", "writer"]
+
+
+def test_graph_without_edges_is_a_chain():
+    upstream = build_upstream_map(graph([agent("a"), {"id": "in", "type": "input"}, agent("b")]))
+
+    assert upstream == {"a": [], "b": ["a"]}
+    assert topological_order(upstream) == ["a", "b"]
+
+
+# Edge conditions
+
+@pytest.mark.parametrize("condition, output, expected", [
+    (None, "anything", True),
+    ("", None, True),
+    ("regex:^yes\\b", "Yes, ship it", True),
+    ("regex:^yes\\b", "no", False),
+    ("contains: Approved ", "status: APPROVED", True),
+    ("contains:approved", None, False),
+    ("chat", " Chat\n", True),
+    ("chat|research", "research", True),
+    ("chat|research", "research more", False),
+])
+def test_condition_matches(condition, output, expected):
+    assert condition_matches(condition, output) is expected
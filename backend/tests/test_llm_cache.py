@@ -0,0 +1,139 @@
+"""
+Opt-in LLM response cache (app/llm/cache.py) as used by the LLM client:
+hits, misses and what is never stored.
+"""
+
+import asyncio
+
+import pytest
+
+from app.llm import client
+from app.llm.cache import LLMResponseCache
+from app.llm.client import acall_llm_with_tools, call_llm_with_tools
+from app.llm.providers import LLMProviderError, get_provider
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+TOOL = {"type": "function", "function": {"name": "lookup", "description": "Look up", "parameters": {"type": "object"}}}
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def llm_cache(request, monkeypatch, tmp_path):
+    """ Fresh LLM_CACHE for the test: memory LRU only, or backed by a SQLite file """
+    disk_path = str(tmp_path / "llm_cache.sqlite3") if request.param == "sqlite" else None
+    cache = LLMResponseCache(max_entries=16, disk_path=disk_path)
+    monkeypatch.setattr(client, "LLM_CACHE", cache)
+    return cache
+
+
+def calls(*requests):
+    """ Responses to acall_llm_with_tools(MESSAGES, **kwargs) for each kwargs, in order and on one event loop """
+    async def scenario():
+        return [await acall_llm_with_tools(MESSAGES, **kwargs) for kwargs in requests]
+
+    return asyncio.run(scenario())
+
+
+def test_identical_request_is_served_from_the_cache(fake_llm, llm_cache):
+    first, second = calls({"temperature": 0.2}, {"temperature": 0.2})
+
+    assert fake_llm.requests == 1
+    assert (first.cached, second.cached) == (False, True)
+    assert second.content == first.content
+    assert llm_cache.stats()["memory_hits"] == 1
+
+
+def test_sync_and_async_clients_share_entries(fake_llm, llm_cache):
+    first = call_llm_with_tools(MESSAGES)
+    [second] = calls({})
+
+    assert fake_llm.requests == 1
+    assert second.cached and second.content == first.content
+
+
+def test_disk_tier_survives_a_restart(fake_llm, monkeypatch, tmp_path):
+    path = str(tmp_path / "llm_cache.sqlite3")
+    monkeypatch.setattr(client, "LLM_CACHE", LLMResponseCache(max_entries=16, disk_path=path))
+    [first] = calls({})
+
+    restarted = LLMResponseCache(max_entries=16, disk_path=path)
+    monkeypatch.setattr(client, "LLM_CACHE", restarted)
+    [second] = calls({})
+
+    assert fake_llm.requests == 1
+    assert second.content == first.content
+    assert restarted.stats()["disk_hits"] == 1
+
+
+@pytest.mark.parametrize("changed", [
+    {"model": "other-model"},
+    {"temperature": 0.9},
+    {"tools": [TOOL]},
+    {"max_tokens": 50},
+])
+def test_any_request_difference_is_a_miss(fake_llm, llm_cache, changed):
+    first, second = calls({}, changed)
+
+    assert fake_llm.requests == 2
+    assert not second.cached
+    assert second.content != first.content
+
+
+def test_bypass_cache_neither_reads_nor_writes(fake_llm, llm_cache):
+    _, bypassed, _ = calls({}, {"bypass_cache": True}, {"bypass_cache": True, "temperature": 0.9})
+
+    assert fake_llm.requests == 3
+    assert not bypassed.cached
+    assert llm_cache.stats()["entries"] == 1
+
+
+def test_streamed_responses_are_not_stored(fake_llm, llm_cache):
+    deltas = []
+
+    async def on_token(delta):
+        deltas.append(delta)
+
+    calls({"stream": True, "on_token": on_token}, {"stream": True, "on_token": on_token})
+
+    assert deltas
+    assert fake_llm.requests == 2
+    assert llm_cache.stats()["entries"] == 0
+
+
+def test_stream_request_is_served_from_a_stored_response(fake_llm, llm_cache):
+    deltas = []
+
+    async def on_token(delta):
+        deltas.append(delta)
+
+    stored, streamed = calls({}, {"stream": True, "on_token": on_token})
+
+    assert fake_llm.requests == 1
+    assert streamed.cached
+    assert deltas == [stored.content]
+
+
+@pytest.mark.parametrize("error", [LLMProviderError(429, "slow down", {"Retry-After": "0"}), LLMProviderError(503, "unavailable")])
+def test_failed_requests_are_not_stored(fake_llm, llm_cache, monkeypatch, error):
+    provider = get_provider("groq")
+    acomplete = provider.acomplete
+    errors = [error]
+
+    async def failing_once(kwargs, stream=False, timeout=None):
+        if errors:
+            raise errors.pop(0)
+        return await acomplete(kwargs, stream=stream, timeout=timeout)
+
+    monkeypatch.setattr(provider, "acomplete", failing_once)
+
+    async def scenario():
+        with pytest.raises(LLMProviderError):
+            await acall_llm_with_tools(MESSAGES, retries=1)
+        entries = llm_cache.stats()["entries"]
+        return entries, await acall_llm_with_tools(MESSAGES, retries=1)
+
+    entries, response = asyncio.run(scenario())
+
+    assert entries == 0
+    # The identical request after the failure goes to the provider
+    assert not response.cached and response.has_content
+    assert fake_llm.requests == 1
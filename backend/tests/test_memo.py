@@ -0,0 +1,150 @@
+"""
+Run-scoped tool result memo (app/agents/memo.RunToolMemo) and how it splits
+the work with the process-wide tool result cache.
+"""
+
+import asyncio
+
+import pytest
+
+from app.agents import memo as memo_module
+from app.agents.memo import RunToolMemo
+from app.tools.cache import ToolResultCache
+from app.tools.definitions import ToolDefinition, ToolRegistry
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """
+    - "search": cached across runs (cache_ttl)
+    - "mail": reusable within a run only (run_memo), "draft" never reused
+    - "send": neither
+    """
+    registry = ToolRegistry(cache=ToolResultCache(max_entries=100, max_bytes=1_000_000))
+    registry.register(ToolDefinition("search", "Search", {}, lambda args: "", cache_ttl=60))
+    registry.register(ToolDefinition("mail", "Mail", {}, lambda args: "", run_memo=True, non_cacheable_actions=["draft"]))
+    registry.register(ToolDefinition("send", "Send", {}, lambda args: ""))
+    monkeypatch.setattr(memo_module, "TOOL_REGISTRY", registry)
+    return registry
+
+
+class CountingTool:
+    """ Stands in for the real tool call: counts executions, can be slow or fail """
+    def __init__(self, result="result", delay=0.0):
+        self.result = result
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.result
+
+
+def call(memo, agent_id, tool_name, arguments, execute):
+    return memo.call(agent_id, tool_name, arguments, {"api_key": "k"}, execute)
+
+
+def test_run_only_tool_is_reused_from_the_memo(registry):
+    memo = RunToolMemo()
+    tool = CountingTool("3 unread emails")
+
+    async def scenario():
+        first = await call(memo, "planner", "mail", {"action": "list_recent"}, tool)
+        second = await call(memo, "writer", "mail", {"action": "list_recent"}, tool)
+        return first, second
+
+    assert asyncio.run(scenario()) == (("3 unread emails", False), ("3 unread emails", True))
+    assert tool.calls == 1
+    assert memo.hits == 1
+
+
+def test_cross_run_cached_tool_is_not_kept_twice(registry):
+    memo = RunToolMemo()
+    tool = CountingTool("python results")
+
+    async def scenario():
+        await call(memo, "planner", "search", {"query": "python"}, tool)
+        return await call(memo, "writer", "search", {"query": "python"}, tool)
+
+    # The repeat goes back to the tool path (served by the registry's cache there);
+    # the memo only remembers it for the index
+    assert asyncio.run(scenario()) == ("python results", False)
+    assert tool.calls == 2
+    assert len(memo) == 1
+    assert "search" in memo.index(exclude_agent="writer")
+
+
+def test_every_reusable_tool_is_kept_when_the_tool_cache_is_off(registry):
+    registry.cache = None
+    memo = RunToolMemo()
+    tool = CountingTool()
+
+    async def scenario():
+        await call(memo, "a", "search", {"query": "python"}, tool)
+        return await call(memo, "b", "search", {"query": "python"}, tool)
+
+    assert asyncio.run(scenario()) == ("result", True)
+    assert tool.calls == 1
+
+
+@pytest.mark.parametrize("tool_name", ["search", "mail"])
+def test_identical_calls_in_flight_are_coalesced(registry, tool_name):
+    memo = RunToolMemo()
+    tool = CountingTool(delay=0.05)
+
+    async def scenario():
+        return await asyncio.gather(
+            call(memo, "a", tool_name, {"query": "q"}, tool),
+            call(memo, "b", tool_name, {"query": "q"}, tool),
+        )
+
+    assert asyncio.run(scenario()) == [("result", False), ("result", True)]
+    assert tool.calls == 1
+
+
+@pytest.mark.parametrize("tool_name, arguments", [
+    ("send", {"to": "x"}),
+    ("mail", {"action": "draft"}),
+    ("unknown", {}),
+])
+def test_calls_with_side_effects_always_run(registry, tool_name, arguments):
+    memo = RunToolMemo()
+    tool = CountingTool()
+
+    async def scenario():
+        await call(memo, "a", tool_name, arguments, tool)
+        return await call(memo, "a", tool_name, arguments, tool)
+
+    assert asyncio.run(scenario()) == ("result", False)
+    assert tool.calls == 2
+    assert len(memo) == 0
+
+
+def test_error_results_are_not_kept(registry):
+    memo = RunToolMemo()
+    tool = CountingTool("Error executing mail: quota")
+
+    async def scenario():
+        await call(memo, "a", "mail", {"action": "search"}, tool)
+        return await call(memo, "a", "mail", {"action": "search"}, tool)
+
+    assert asyncio.run(scenario()) == ("Error executing mail: quota", False)
+    assert tool.calls == 2
+
+
+def test_index_lists_what_other_agents_fetched(registry):
+    memo = RunToolMemo()
+
+    async def scenario():
+        await call(memo, "planner", "mail", {"action": "search", "query": "invoice"}, CountingTool("x " * 200))
+        await call(memo, "writer", "search", {"query": "python"}, CountingTool("python results"))
+
+    asyncio.run(scenario())
+
+    index = memo.index(exclude_agent="writer")
+    assert '- mail {"action": "search", "query": "invoice"} (by planner): x x' in index
+    assert index.endswith("...")
+    assert "python" not in index
+    assert memo.index(exclude_agent="nobody").count("\n- ") == 2
+    assert RunToolMemo().index() == ""
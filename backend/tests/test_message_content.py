@@ -0,0 +1,115 @@
+"""
+Message body storage (app/db/models.Message.content, app/db/content.py):
+inline vs compressed bodies, preview column and the decoded-text cache.
+"""
+
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import selectinload
+
+from app.core.config import settings
+from app.db.content import CODEC_ZLIB
+from app.db.models import Assistant, Message, MessageBlob, Run
+from app.db.session import engine
+
+THRESHOLD = settings.MESSAGE_COMPRESS_MIN_CHARS
+SHORT = "short answer"
+AT_THRESHOLD = "x" * THRESHOLD
+LONG = "Résumé of the findings. " * (THRESHOLD // 10)
+
+
+@contextmanager
+def count_queries():
+    queries = []
+
+    def on_execute(conn, cursor, statement, *args):
+        queries.append(statement)
+
+    event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        yield queries
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+
+
+@pytest.fixture
+def run_id(db):
+    assistant = Assistant(name="test", graph_json={"nodes": [], "edges": []})
+    run = Run(assistant=assistant, input_text="q")
+    db.add(run)
+    db.flush()
+    for sender, content in (("user", SHORT), ("a", AT_THRESHOLD), ("b", LONG)):
+        db.add(Message(run_id=run.id, sender=sender, content=content))
+    db.commit()
+    run_id = run.id
+    db.expunge_all()  # later loads build new instances (no cached text)
+    return run_id
+
+
+def load(db, run_id, *options):
+    return {m.sender: m for m in db.query(Message).options(*options).filter(Message.run_id == run_id)}
+
+
+def test_storage_columns(db, run_id):
+    messages = load(db, run_id)
+
+    short = messages["user"]
+    assert (short.stored_content, short.content_codec, short.content_chars) == (SHORT, None, len(SHORT))
+    assert short.content_preview == SHORT
+    assert db.query(MessageBlob).filter(MessageBlob.message_id == short.id).count() == 0
+
+    for sender, text in (("a", AT_THRESHOLD), ("b", LONG)):
+        m = messages[sender]
+        assert (m.stored_content, m.content_codec, m.content_chars) == ("", CODEC_ZLIB, len(text))
+        assert len(m.content_preview) <= settings.MESSAGE_PREVIEW_CHARS + 3
+        assert m.content_preview.endswith("...")
+    assert len(messages["b"].blob.data) < len(LONG.encode("utf-8"))
+
+
+def test_round_trip_through_the_lazy_path(db, run_id):
+    messages = load(db, run_id)
+
+    with count_queries() as queries:
+        assert messages["user"].content == SHORT
+    assert queries == []
+
+    with count_queries() as queries:
+        assert messages["b"].content == LONG
+        assert messages["b"].content == LONG
+    # One lazy blob load, then the decoded text is cached on the instance
+    assert len(queries) == 1
+    assert "message_blobs" in queries[0]
+
+
+def test_round_trip_through_selectinload(db, run_id):
+    with count_queries() as queries:
+        messages = load(db, run_id, selectinload(Message.blob))
+        assert messages["a"].content == AT_THRESHOLD
+        assert messages["b"].content == LONG
+        assert messages["user"].content == SHORT
+    # The messages and all of their blobs in two queries, nothing loaded per message
+    assert len(queries) == 2
+
+
+def test_rewriting_a_body_switches_its_storage(db, run_id):
+    messages = load(db, run_id)
+    messages["user"].content = LONG
+    messages["b"].content = SHORT
+    db.commit()
+    db.expunge_all()
+
+    messages = load(db, run_id)
+    assert (messages["user"].content_codec, messages["user"].content) == (CODEC_ZLIB, LONG)
+    assert (messages["b"].content_codec, messages["b"].content) == (None, SHORT)
+    # The old blob is deleted with the switch to inline storage
+    assert db.query(MessageBlob).filter(MessageBlob.message_id == messages["b"].id).count() == 0
+
+
+def test_compression_can_be_disabled(db, run_id, monkeypatch):
+    monkeypatch.setattr(settings, "MESSAGE_COMPRESS_MIN_CHARS", 0)
+
+    message = Message(run_id=run_id, sender="c", content=LONG)
+
+    assert (message.stored_content, message.content_codec, message.blob) == (LONG, None, None)
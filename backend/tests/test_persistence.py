@@ -0,0 +1,177 @@
+"""
+Persistence of run messages (app/agents/persistence.py): the write-behind
+writer, and the immediate default seen through GET /runs/{id}.
+"""
+
+import asyncio
+import time
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import object_session
+
+from app.agents.persistence import ImmediateRunWriter, WriteBehindRunWriter, make_run_writer
+from app.db.models import Assistant, Message, Run, RunStep
+from app.main import app
+
+
+@pytest.fixture
+def run(db):
+    assistant = Assistant(name="test", graph_json={"nodes": [], "edges": []})
+    run = Run(assistant=assistant, input_text="q", status="running")
+    db.add(run)
+    db.commit()
+    return run
+
+
+def message(run, sender, content=None):
+    return Message(run_id=run.id, sender=sender, content=content or f"from {sender}", created_at=datetime.utcnow())
+
+
+def step(agent_id):
+    now = datetime.utcnow()
+    return RunStep(agent_id=agent_id, step_type="llm", name="model", started_at=now, ended_at=now, duration_ms=1.0)
+
+
+def stored(db, run):
+    """ (senders of the run's messages in id order, agent ids of its steps, run status) """
+    db.expire_all()
+    senders = [m.sender for m in db.query(Message).filter(Message.run_id == run.id).order_by(Message.id)]
+    steps = [s.agent_id for s in db.query(RunStep).filter(RunStep.run_id == run.id).order_by(RunStep.id)]
+    status = db.query(Run.status).filter(Run.id == run.id).scalar()
+    return senders, steps, status
+
+
+def test_nothing_is_written_before_complete(db, run):
+    writer = WriteBehindRunWriter(run)
+
+    async def scenario():
+        await writer.add_message(message(run, "user"))
+        await writer.add_message(message(run, "a"), [step("a")])
+        before = stored(db, run)
+        await writer.complete()
+        return before
+
+    before = asyncio.run(scenario())
+
+    assert before == ([], [], "running")
+    assert stored(db, run) == (["user", "a"], ["a"], "completed")
+
+
+def test_checkpoints_and_final_flush_keep_every_message_in_order(db, run):
+    writer = WriteBehindRunWriter(run, checkpoint_every=2)
+    senders = ["user"] + [f"agent{i}" for i in range(6)]
+
+    async def scenario():
+        for sender in senders:
+            await writer.add_message(message(run, sender))
+            await asyncio.sleep(0)  # let a checkpoint start
+        await writer.complete()
+
+    asyncio.run(scenario())
+
+    assert writer.checkpoints >= 1
+    assert stored(db, run) == (senders, [], "completed")
+    assert run.completed_at is not None
+
+
+def test_abort_keeps_what_was_produced_without_completing_the_run(db, run):
+    writer = WriteBehindRunWriter(run, checkpoint_every=2)
+
+    async def scenario():
+        await writer.add_message(message(run, "user"))
+        await writer.add_message(message(run, "a"), [step("a")])
+        await writer.add_message(message(run, "b"))
+        await writer.abort()
+
+    asyncio.run(scenario())
+
+    # Nothing is left buffered or in flight, and the run is not marked completed
+    assert stored(db, run) == (["user", "a", "b"], ["a"], "running")
+
+
+def test_abort_with_a_failing_batch_writes_none_of_it(db, run):
+    writer = WriteBehindRunWriter(run)
+
+    async def scenario():
+        await writer.add_message(message(run, "user"))
+        await writer.add_message(message(run, "a"), [step("a")])
+        # NOT NULL violation: the whole batch must roll back
+        await writer.add_message(Message(run_id=run.id, sender=None, content="broken"))
+        await writer.abort()
+
+    asyncio.run(scenario())
+
+    assert stored(db, run) == ([], [], "running")
+    # The session is still usable afterwards (the caller marks the run failed with it)
+    run.status = "failed"
+    db.commit()
+    assert stored(db, run)[2] == "failed"
+
+
+def test_failing_final_batch_leaves_the_run_uncompleted(db, run):
+    writer = WriteBehindRunWriter(run)
+
+    async def scenario():
+        await writer.add_message(message(run, "user"))
+        await writer.add_message(Message(run_id=run.id, sender=None, content="broken"))
+        await writer.complete()
+
+    with pytest.raises(IntegrityError):
+        asyncio.run(scenario())
+
+    assert stored(db, run) == ([], [], "running")
+
+
+def test_batches_are_written_outside_the_callers_session(db, run):
+    writer = WriteBehindRunWriter(run, checkpoint_every=1)
+    messages = [message(run, "user"), message(run, "a")]
+
+    async def scenario():
+        for m in messages:
+            await writer.add_message(m)
+        await writer.complete()
+
+    asyncio.run(scenario())
+
+    # The caller's session (used by the event loop meanwhile) never saw the rows
+    assert not db.new and all(object_session(m) is None for m in messages)
+    assert all(m.id is not None for m in messages)
+    assert (run.status, stored(db, run)) == ("completed", (["user", "a"], [], "completed"))
+
+
+def test_immediate_is_the_default_mode(db, run):
+    assert isinstance(make_run_writer(db, run), ImmediateRunWriter)
+    assert isinstance(make_run_writer(db, run, "write_behind"), WriteBehindRunWriter)
+    with pytest.raises(ValueError, match="Unknown RUN_PERSISTENCE_MODE"):
+        make_run_writer(db, run, "eventually")
+
+
+def test_queued_run_shows_its_messages_while_it_runs(db, fake_llm):
+    fake_llm.latency_ms = 300
+    assistant = Assistant(name="test", graph_json={
+        "nodes": [
+            {"id": "planner", "type": "agent", "role": "planner", "system_prompt": "Plan."},
+            {"id": "writer", "type": "agent", "role": "writer", "system_prompt": "Write."},
+        ],
+        "edges": [{"from": "planner", "to": "writer"}],
+    })
+    db.add(assistant)
+    db.commit()
+
+    polls = []
+    with TestClient(app) as client:
+        run_id = client.post(f"/assistants/{assistant.id}/runs/enqueue", json={"input_text": "hello"}).json()["id"]
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            body = client.get(f"/runs/{run_id}").json()
+            polls.append((body["status"], [m["sender"] for m in body["messages"]]))
+            if body["status"] in ("completed", "failed"):
+                break
+            time.sleep(0.05)
+
+    # The planner's output is visible while the writer is still working
+    assert ("running", ["user", "planner"]) in polls
+    assert polls[-1] == ("completed", ["user", "planner", "writer"])
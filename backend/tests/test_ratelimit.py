@@ -0,0 +1,240 @@
+"""
+Token-bucket LLM rate limiter and 429 handling (app/llm/ratelimit.py).
+"""
+
+import asyncio
+import types
+
+import httpx
+import pytest
+from groq import RateLimitError
+
+from app.llm import ratelimit
+from app.llm.client import acall_llm_with_tools
+from app.llm.providers import LLMProviderError, get_provider
+from app.llm.ratelimit import (
+    RateLimiter,
+    _parse_duration,
+    estimate_request_tokens,
+    is_rate_limit_error,
+    retry_after_from_headers,
+)
+
+
+class FakeClock:
+    """ time.monotonic / time.sleep replacement: sleeping only advances the clock """
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(ratelimit, "time", types.SimpleNamespace(monotonic=clock.monotonic, sleep=clock.sleep))
+    return clock
+
+
+def _response(status_code):
+    return httpx.Response(status_code, request=httpx.Request("POST", "http://llm.test/chat/completions"))
+
+
+# Buckets
+
+def test_requests_within_budget_do_not_wait(clock):
+    limiter = RateLimiter("test", rpm=60, tpm=0)
+
+    assert [limiter.reserve(0) for _ in range(60)] == [0.0] * 60
+    assert limiter.delayed == 0
+
+
+def test_reservations_queue_up_in_arrival_order(clock):
+    limiter = RateLimiter("test", rpm=60, tpm=0)  # one request per second
+    for _ in range(60):
+        limiter.reserve(0)
+
+    # Each caller past the budget waits for everyone before it
+    assert limiter.reserve(0) == pytest.approx(1.0)
+    assert limiter.reserve(0) == pytest.approx(2.0)
+    assert limiter.delayed == 2
+
+    clock.now += 2.0
+    assert limiter.reserve(0) == pytest.approx(1.0)
+
+
+def test_token_bucket_and_usage_refund(clock):
+    limiter = RateLimiter("test", rpm=0, tpm=600)  # ten tokens per second
+
+    assert limiter.reserve(500) == 0.0
+    assert limiter.reserve(200) == pytest.approx(10.0)
+
+    # Both requests used far less than reserved: the difference is given back
+    limiter.record_usage(500, 100)
+    limiter.record_usage(200, 50)
+    assert limiter.stats()["tokens_available"] == pytest.approx(450.0)
+    assert limiter.reserve(400) == 0.0
+
+    # Refunds never fill the bucket past its capacity
+    limiter.record_usage(400, 0)
+    limiter.record_usage(400, 0)
+    assert limiter.stats()["tokens_available"] == pytest.approx(600.0)
+
+
+def test_oversize_request_waits_at_most_a_full_refill(clock):
+    limiter = RateLimiter("test", rpm=0, tpm=600)
+    limiter.reserve(600)
+
+    assert limiter.reserve(10_000) == pytest.approx(60.0)
+
+
+def test_acquire_sleeps_for_the_reservation(clock):
+    limiter = RateLimiter("test", rpm=1, tpm=0)
+
+    assert limiter.acquire(0) == 0.0
+    assert limiter.acquire(0) == pytest.approx(60.0)
+    assert clock.slept == [pytest.approx(60.0)]
+    assert limiter.stats()["waiting"] == 0
+
+
+def test_aacquire_waits_without_blocking(clock, monkeypatch):
+    waits = []
+
+    async def fake_sleep(seconds):
+        waits.append(seconds)
+
+    monkeypatch.setattr(ratelimit.asyncio, "sleep", fake_sleep)
+    limiter = RateLimiter("test", rpm=1, tpm=0)
+
+    async def two_requests():
+        return [await limiter.aacquire(0), await limiter.aacquire(0)]
+
+    assert asyncio.run(two_requests()) == [0.0, pytest.approx(60.0)]
+    assert waits == [pytest.approx(60.0)]
+
+
+def test_rate_limited_pauses_every_caller(clock):
+    limiter = RateLimiter("test", rpm=0, tpm=0)
+
+    retry_wait = limiter.rate_limited(0, retry_after=5.0)
+
+    assert 5.0 <= retry_wait <= 5.5
+    assert limiter.reserve(0) == pytest.approx(5.0)
+    assert limiter.stats()["rate_limited"] == 1
+    clock.now += 5.0
+    assert limiter.reserve(0) == 0.0
+
+
+def test_rate_limited_without_retry_after_backs_off():
+    limiter = RateLimiter("test", rpm=0, tpm=0)
+
+    for attempt in range(6):
+        assert 0.0 <= limiter.rate_limited(attempt) <= min(30.0, 2 ** attempt)
+    assert limiter.reserve(0) == 0.0
+
+
+def test_estimate_request_tokens():
+    messages = [{"role": "user", "content": "x" * 400}, {"role": "assistant", "content": None}]
+
+    assert estimate_request_tokens(messages, 100) == 201
+    assert estimate_request_tokens(messages, None) == 101 + ratelimit.DEFAULT_COMPLETION_TOKENS
+
+
+# Reservations of calls through acall_llm_with_tools
+
+@pytest.fixture
+def token_limiter(clock, monkeypatch):
+    """ TPM-only limiter used by the groq provider (the clock is frozen, so no refill) """
+    limiter = RateLimiter("groq", rpm=0, tpm=100_000)
+    monkeypatch.setitem(ratelimit._limiters, "groq", limiter)
+    return limiter
+
+
+def failing_provider(monkeypatch, errors):
+    """ The groq provider raising `errors` one by one, then answering (through fake_llm) """
+    provider = get_provider("groq")
+    acomplete = provider.acomplete
+    errors = list(errors)
+
+    async def flaky_acomplete(kwargs, stream=False, timeout=None):
+        if errors:
+            raise errors.pop(0)
+        return await acomplete(kwargs, stream=stream, timeout=timeout)
+
+    monkeypatch.setattr(provider, "acomplete", flaky_acomplete)
+
+
+def test_retried_request_reserves_its_tokens_once(fake_llm, token_limiter, monkeypatch):
+    failing_provider(monkeypatch, [LLMProviderError(429, "slow down", {"Retry-After": "0"})] * 2)
+
+    response = asyncio.run(acall_llm_with_tools([{"role": "user", "content": "hi"}], max_tokens=100))
+
+    assert response.has_content
+    assert token_limiter.requests == 3
+    # Only the successful attempt's real usage is left charged
+    assert token_limiter.stats()["tokens_available"] == pytest.approx(100_000 - response.total_tokens)
+
+
+@pytest.mark.parametrize("error", [
+    LLMProviderError(429, "slow down", {"Retry-After": "0"}),
+    LLMProviderError(503, "unavailable"),
+    httpx.ReadTimeout("timed out"),
+])
+def test_failed_request_returns_its_reservation(fake_llm, token_limiter, monkeypatch, error):
+    failing_provider(monkeypatch, [error] * 3)
+
+    with pytest.raises(type(error)):
+        asyncio.run(acall_llm_with_tools([{"role": "user", "content": "hi"}], max_tokens=100))
+
+    assert token_limiter.requests == 3
+    assert token_limiter.stats()["tokens_available"] == pytest.approx(100_000)
+
+
+# 429 detection and headers
+
+@pytest.mark.parametrize("error, expected", [
+    (RateLimitError("slow down", response=_response(429), body=None), True),
+    (LLMProviderError(429, "Too Many Requests"), True),
+    (httpx.HTTPStatusError("429", request=_response(429).request, response=_response(429)), True),
+    (LLMProviderError(400, "rate limit exceeded for context length"), False),
+    (httpx.HTTPStatusError("500", request=_response(500).request, response=_response(500)), False),
+    (RuntimeError("429 Too Many Requests"), False),
+])
+def test_is_rate_limit_error(error, expected):
+    assert is_rate_limit_error(error) is expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("7", 7.0),
+    ("7.5", 7.5),
+    ("2m59.56s", 179.56),
+    ("450ms", 0.45),
+    ("1h", 3600.0),
+    ("-3", 0.0),
+    ("soon", None),
+    (None, None),
+])
+def test_parse_duration(value, expected):
+    assert _parse_duration(value) == (pytest.approx(expected) if expected is not None else None)
+
+
+def test_retry_after_from_headers():
+    assert retry_after_from_headers(None) is None
+    assert retry_after_from_headers({"Retry-After": "3"}) == 3.0
+    assert retry_after_from_headers({
+        "x-ratelimit-remaining-requests": "0",
+        "x-ratelimit-reset-requests": "2s",
+        "x-ratelimit-remaining-tokens": "0",
+        "x-ratelimit-reset-tokens": "1m",
+    }) == 60.0
+    # A bucket that isn't exhausted doesn't count
+    assert retry_after_from_headers({
+        "x-ratelimit-remaining-tokens": "120",
+        "x-ratelimit-reset-tokens": "1m",
+    }) is None
@@ -0,0 +1,141 @@
+"""
+Background run queue (app/services/run_queue.py) behind POST
+/assistants/{id}/runs/enqueue: backpressure, claiming, startup backlog and
+worker shutdown.
+"""
+
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.db.models import Assistant, Message, Run
+from app.db.session import SessionLocal
+from app.main import app
+from app.services.run_queue import RUN_QUEUE, RunQueue, _claim_run
+
+
+def agent(node_id):
+    return {"id": node_id, "type": "agent", "role": node_id, "system_prompt": f"You are {node_id}."}
+
+
+def make_assistant(db):
+    assistant = Assistant(name="queue", graph_json={"nodes": [agent("writer")], "edges": []})
+    db.add(assistant)
+    db.commit()
+    return assistant.id
+
+
+def make_queued_runs(db, assistant_id, n):
+    runs = [Run(assistant_id=assistant_id, input_text=f"task {i}", status="queued") for i in range(n)]
+    db.add_all(runs)
+    db.commit()
+    return [run.id for run in runs]
+
+
+def enqueue(client, assistant_id):
+    return client.post(f"/assistants/{assistant_id}/runs/enqueue", json={"input_text": "hello"})
+
+
+def statuses(db, run_ids):
+    db.expire_all()
+    return [db.query(Run.status).filter(Run.id == run_id).scalar() for run_id in run_ids]
+
+
+def wait_for(db, run_ids, wanted, timeout=10):
+    deadline = time.monotonic() + timeout
+    while statuses(db, run_ids) != wanted and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return statuses(db, run_ids)
+
+
+@pytest.fixture
+def queue_size(monkeypatch):
+    """ Size RUN_QUEUE (before the app starts it): queue_size(workers, max_depth) """
+    def resize(workers, max_depth):
+        monkeypatch.setattr(RUN_QUEUE, "workers", workers)
+        monkeypatch.setattr(RUN_QUEUE, "max_depth", max_depth)
+    return resize
+
+
+def test_full_queue_answers_429_with_retry_after(db, fake_llm, queue_size):
+    fake_llm.latency_ms = 1000  # the first run keeps the only worker busy
+    queue_size(workers=1, max_depth=2)
+    assistant_id = make_assistant(db)
+
+    with TestClient(app) as client:
+        responses = [enqueue(client, assistant_id) for _ in range(5)]
+
+    codes = [r.status_code for r in responses]
+    # One run executing + max_depth waiting, the rest is turned away
+    assert codes == [202, 202, 202, 429, 429]
+    rejected = responses[3]
+    assert int(rejected.headers["Retry-After"]) >= 1
+    assert rejected.json()["detail"] == "Run queue is full, please retry later"
+    # Rejected requests never created a run
+    assert db.query(Run).count() == 3
+
+
+def test_a_run_is_claimed_once(db):
+    [run_id] = make_queued_runs(db, make_assistant(db), 1)
+    first, second = SessionLocal(), SessionLocal()
+    try:
+        claimed = _claim_run(first, run_id)
+        assert claimed is not None and claimed[0].status == "running"
+        assert _claim_run(second, run_id) is None
+    finally:
+        first.close()
+        second.close()
+
+
+def test_a_run_handed_to_two_workers_runs_once(db, fake_llm):
+    fake_llm.latency_ms = 100
+    [run_id] = make_queued_runs(db, make_assistant(db), 1)
+    queue = RunQueue(workers=2, max_depth=10)
+
+    async def scenario():
+        # Not via start(): the startup backlog would already submit the run
+        queue._queue = asyncio.Queue(maxsize=queue.max_depth)
+        queue._tasks = [asyncio.create_task(queue._worker(i)) for i in range(queue.workers)]
+        queue.submit(run_id)
+        queue.submit(run_id)
+        await queue._queue.join()
+        await queue.stop()
+
+    asyncio.run(scenario())
+
+    assert statuses(db, [run_id]) == ["completed"]
+    assert [m.sender for m in db.query(Message).filter(Message.run_id == run_id)] == ["user", "writer"]
+    assert fake_llm.requests == 1
+
+
+def test_startup_submits_runs_left_queued_in_arrival_order(db, fake_llm, queue_size):
+    # More queued runs than the queue holds: the rest follow as slots free up
+    queue_size(workers=1, max_depth=1)
+    run_ids = make_queued_runs(db, make_assistant(db), 3)
+
+    with TestClient(app):
+        final = wait_for(db, run_ids, ["completed"] * 3)
+
+    assert final == ["completed"] * 3
+    finished = db.query(Run.id).order_by(Run.completed_at).all()
+    assert [row[0] for row in finished] == run_ids
+
+
+def test_shutdown_cancels_the_running_run_and_keeps_waiting_ones_queued(db, fake_llm, queue_size):
+    fake_llm.latency_ms = 2000
+    queue_size(workers=1, max_depth=5)
+    assistant_id = make_assistant(db)
+
+    with TestClient(app) as client:
+        run_ids = [enqueue(client, assistant_id).json()["id"] for _ in range(2)]
+        wait_for(db, run_ids, ["running", "queued"])
+
+    assert statuses(db, run_ids) == ["failed", "queued"]
+    assert db.query(Run.error_message).filter(Run.id == run_ids[0]).scalar() == "Run cancelled"
+
+    # The next process picks the waiting run up
+    fake_llm.latency_ms = 0
+    with TestClient(app):
+        assert wait_for(db, run_ids[1:], ["completed"]) == ["completed"]
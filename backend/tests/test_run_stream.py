@@ -0,0 +1,156 @@
+"""
+SSE run endpoint POST /assistants/{id}/runs/stream: event sequence, failed
+runs, and a client disconnect cancelling the run.
+"""
+
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+from app.db.models import Assistant, Message, Run
+from app.main import app
+from app.routers import run as run_router
+
+
+def agent(node_id):
+    return {"id": node_id, "type": "agent", "role": node_id, "system_prompt": f"You are {node_id}."}
+
+
+def make_assistant(db, graph_json):
+    assistant = Assistant(name="stream", graph_json=graph_json)
+    db.add(assistant)
+    db.commit()
+    return assistant.id
+
+
+def parse_sse(text):
+    """ [(event name, data)] of a text/event-stream body """
+    events = []
+    for frame in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in frame.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def index_of(events, event_name, agent_id):
+    return next(i for i, (name, data) in enumerate(events) if name == event_name and data.get("agent_id") == agent_id)
+
+
+def stream_run(assistant_id):
+    client = TestClient(app)
+    with client.stream("POST", f"/assistants/{assistant_id}/runs/stream", json={"input_text": "hello"}) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        return parse_sse(response.read().decode("utf-8"))
+
+
+def test_event_sequence_of_a_completed_run(db, fake_llm):
+    assistant_id = make_assistant(db, {
+        "nodes": [agent("planner"), agent("writer")],
+        "edges": [{"from": "planner", "to": "writer"}],
+    })
+
+    events = stream_run(assistant_id)
+
+    names = [name for name, _ in events]
+    assert names[0] == "run_started"
+    assert names[-1] == "run_completed"
+    # Tokens are streamed between each agent's boundaries, agents in graph order
+    boundaries = [(name, data["agent_id"]) for name, data in events if name in ("agent_started", "agent_completed")]
+    assert boundaries == [
+        ("agent_started", "planner"), ("agent_completed", "planner"),
+        ("agent_started", "writer"), ("agent_completed", "writer"),
+    ]
+    for agent_id in ("planner", "writer"):
+        start = index_of(events, "agent_started", agent_id)
+        end = index_of(events, "agent_completed", agent_id)
+        tokens = [data["delta"] for name, data in events[start:end] if name == "token"]
+        assert tokens and "".join(tokens).strip() == events[end][1]["content"].strip()
+        assert events[end][1]["message_id"] is not None
+
+    started, completed = events[0][1], events[-1][1]
+    assert completed["run"]["id"] == started["run_id"]
+    assert completed["run"]["status"] == "completed"
+    assert [m["sender"] for m in completed["run"]["messages"]] == ["user", "planner", "writer"]
+
+
+def test_event_sequence_of_a_failed_run(db, fake_llm):
+    # A stored graph with a cycle fails the run once it starts
+    assistant_id = make_assistant(db, {
+        "nodes": [agent("a"), agent("b")],
+        "edges": [{"from": "a", "to": "b"}, {"from": "b", "to": "a"}],
+    })
+
+    events = stream_run(assistant_id)
+
+    assert [name for name, _ in events] == ["run_started", "run_failed"]
+    assert "cycle" in events[1][1]["error"]
+    db.expire_all()
+    assert db.query(Run).filter(Run.id == events[0][1]["run_id"]).one().status == "failed"
+
+
+def test_error_after_the_graph_still_ends_the_stream_with_run_failed(db, fake_llm, monkeypatch):
+    def broken_response(db, run, messages):
+        raise RuntimeError("database went away")
+
+    monkeypatch.setattr(run_router, "build_run_response", broken_response)
+    assistant_id = make_assistant(db, {"nodes": [agent("writer")], "edges": []})
+
+    events = stream_run(assistant_id)
+
+    names = [name for name, _ in events]
+    assert names[0] == "run_started"
+    assert names[-1] == "run_failed"
+    assert "run_completed" not in names
+    assert events[-1][1]["error"] == "database went away"
+    db.expire_all()
+    run = db.query(Run).filter(Run.id == events[0][1]["run_id"]).one()
+    assert (run.status, run.error_message) == ("failed", "database went away")
+
+
+def test_client_disconnect_cancels_the_run(db, fake_llm):
+    fake_llm.latency_ms = 2000  # the first LLM call is still in flight when the client leaves
+    assistant_id = make_assistant(db, {
+        "nodes": [agent("planner"), agent("writer")],
+        "edges": [{"from": "planner", "to": "writer"}],
+    })
+
+    async def request_then_disconnect():
+        disconnected = asyncio.Event()
+        request_sent = False
+        events = []
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                body = json.dumps({"input_text": "hello"}).encode("utf-8")
+                return {"type": "http.request", "body": body, "more_body": False}
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.body" and message.get("body"):
+                events.extend(parse_sse(message["body"].decode("utf-8")))
+                if any(name == "agent_started" for name, _ in events):
+                    disconnected.set()
+
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": "POST", "scheme": "http", "path": f"/assistants/{assistant_id}/runs/stream",
+            "raw_path": b"", "query_string": b"", "root_path": "",
+            "headers": [(b"content-type", b"application/json"), (b"host", b"test")],
+            "server": ("test", 80), "client": ("test", 1234),
+        }
+        await asyncio.wait_for(app(scope, receive, send), timeout=5)
+        return events
+
+    events = asyncio.run(request_then_disconnect())
+
+    assert [name for name, _ in events] == ["run_started", "agent_started"]
+    db.expire_all()
+    run = db.query(Run).filter(Run.id == events[0][1]["run_id"]).one()
+    assert (run.status, run.error_message) == ("failed", "Run cancelled")
+    # The writer never ran
+    assert "writer" not in [m.sender for m in db.query(Message).filter(Message.run_id == run.id)]
@@ -0,0 +1,92 @@
+"""
+Per-step run timeline: a run through POST /assistants/{id}/runs, read back
+with GET /runs/{id}/timeline.
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from app.db.models import Assistant, UserToolConnection
+from app.main import app
+from benchmarks.fake_tools import install_fake_tools
+from benchmarks.run_bench import make_graph
+
+
+@pytest.fixture
+def fake_tools():
+    restore = install_fake_tools(result_chars=100)
+    try:
+        yield
+    finally:
+        restore()
+
+
+@pytest.fixture
+def assistant_id(db):
+    """ a0 -> (a1, a2) -> a3, every agent with the (fake) tavily tool """
+    tool = UserToolConnection(name="search", template_key="tavily", status="connected", config_json={"api_key": "k"})
+    db.add(tool)
+    db.flush()
+    assistant = Assistant(name="fan-out", graph_json=make_graph(4, "fanout", [tool.id]))
+    db.add(assistant)
+    db.commit()
+    return assistant.id
+
+
+def run_and_get_timeline(assistant_id):
+    async def requests():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            resp = await client.post(f"/assistants/{assistant_id}/runs", json={"input_text": "compare things"})
+            assert resp.status_code == 200, resp.text
+            run = resp.json()
+            timeline = await client.get(f"/runs/{run['id']}/timeline")
+            assert timeline.status_code == 200, timeline.text
+            return run, timeline.json()
+    return asyncio.run(requests())
+
+
+def test_timeline_of_a_fan_out_run(fake_llm, fake_tools, assistant_id):
+    fake_llm.tool_calls_per_turn = 1
+
+    run, timeline = run_and_get_timeline(assistant_id)
+
+    assert timeline["run_id"] == run["id"]
+    assert timeline["status"] == "completed"
+    steps = timeline["steps"]
+
+    # Every agent: an LLM call asking for the tool, the tool call, the final LLM call
+    for agent_id in ("a0", "a1", "a2", "a3"):
+        agent_steps = [(s["step_type"], s["name"]) for s in steps if s["agent_id"] == agent_id]
+        assert [step_type for step_type, _ in agent_steps] == ["llm", "tool", "llm"]
+        assert agent_steps[1][1] == "tavily"
+
+    # Steps are in start order, and the DAG shows in it
+    assert [s["started_at"] for s in steps] == sorted(s["started_at"] for s in steps)
+    first_of = {}
+    last_of = {}
+    for index, step in enumerate(steps):
+        first_of.setdefault(step["agent_id"], index)
+        last_of[step["agent_id"]] = index
+    assert last_of["a0"] < min(first_of["a1"], first_of["a2"])
+    assert max(last_of["a1"], last_of["a2"]) < first_of["a3"]
+
+    tool_steps = [s for s in steps if s["step_type"] == "tool"]
+    assert all(s["result_chars"] == len("[tavily] ") + 100 and s["error"] is None for s in tool_steps)
+    llm_steps = [s for s in steps if s["step_type"] == "llm"]
+    assert timeline["llm_time_ms"] == pytest.approx(sum(s["duration_ms"] for s in llm_steps))
+    assert timeline["tool_time_ms"] == pytest.approx(sum(s["duration_ms"] for s in tool_steps))
+    assert timeline["prompt_tokens"] == sum(s["prompt_tokens"] or 0 for s in steps) > 0
+    assert timeline["completion_tokens"] == sum(s["completion_tokens"] or 0 for s in steps) > 0
+    assert timeline["wall_time_ms"] is not None
+
+
+def test_timeline_of_unknown_run(db):
+    async def request():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/runs/999/timeline")
+
+    assert asyncio.run(request()).status_code == 404
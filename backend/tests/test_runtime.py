@@ -0,0 +1,190 @@
+"""
+Agent runtime (app/agents/runtime.py) with the fake LLM server behind every
+agent: DAG scheduling of assistant graphs through execute_run(), and
+concurrent tool calls within one LLM turn.
+"""
+
+import asyncio
+import copy
+import time
+
+import pytest
+
+from app.agents import runtime
+from app.db.models import Assistant, Message, Run
+from app.llm.client import acall_llm_with_tools
+from app.schemas.schemas import RunCreate
+from app.services.run_executor import RunFailedError, create_run, execute_run
+from app.tools.definitions import TOOL_REGISTRY
+from benchmarks.fake_tools import install_fake_tools
+
+
+def agent(node_id):
+    return {"id": node_id, "type": "agent", "role": node_id, "system_prompt": f"You are {node_id}."}
+
+
+FAN_OUT = {
+    "nodes": [agent("planner"), agent("fast"), agent("slow"), agent("writer")],
+    "edges": [
+        {"from": "planner", "to": "fast"},
+        {"from": "planner", "to": "slow"},
+        {"from": "fast", "to": "writer"},
+        {"from": "slow", "to": "writer"},
+    ],
+}
+
+
+class AgentRecorder:
+    """
+    Wraps runtime._execute_agent_node: records when each agent ran, and can
+    delay an agent or make it raise (a branch failing outside the agent's own
+    error handling).
+    """
+    def __init__(self, delays=None, fail=()):
+        self.delays = delays or {}
+        self.fail = set(fail)
+        self.started = {}
+        self.finished = {}
+        self.cancelled = set()
+        self.histories = {}
+        self._execute = runtime._execute_agent_node
+
+    async def __call__(self, node, history, *args, **kwargs):
+        agent_id = node["id"]
+        self.started[agent_id] = time.perf_counter()
+        self.histories[agent_id] = [m.sender for m in history]
+        try:
+            await asyncio.sleep(self.delays.get(agent_id, 0))
+            if agent_id in self.fail:
+                raise RuntimeError(f"{agent_id} exploded")
+            return await self._execute(node, history, *args, **kwargs)
+        except asyncio.CancelledError:
+            self.cancelled.add(agent_id)
+            raise
+        finally:
+            self.finished[agent_id] = time.perf_counter()
+
+
+@pytest.fixture
+def recorder(monkeypatch):
+    def install(**options):
+        recorder = AgentRecorder(**options)
+        monkeypatch.setattr(runtime, "_execute_agent_node", recorder)
+        return recorder
+    return install
+
+
+def start_run(db, graph_json):
+    assistant = Assistant(name="dag", graph_json=graph_json)
+    db.add(assistant)
+    db.commit()
+    return create_run(db, assistant.id, RunCreate(input_text="compare things"))
+
+
+def run_messages(db, run_id):
+    db.expire_all()
+    return db.query(Message).filter(Message.run_id == run_id).order_by(Message.id).all()
+
+
+def test_independent_branches_run_concurrently(db, fake_llm, recorder):
+    rec = recorder(delays={"fast": 0.2, "slow": 0.2})
+    assistant, run = start_run(db, FAN_OUT)
+
+    asyncio.run(execute_run(db, assistant, run))
+
+    # The two branches overlap instead of running one after the other
+    assert rec.started["slow"] < rec.finished["fast"]
+    assert rec.started["fast"] < rec.finished["slow"]
+    assert max(rec.finished["fast"], rec.finished["slow"]) - min(rec.started["fast"], rec.started["slow"]) < 0.4
+    assert [m.sender for m in run_messages(db, run.id)] == ["user", "planner", "fast", "slow", "writer"]
+
+
+def test_node_waits_for_all_of_its_upstream_nodes(db, fake_llm, recorder):
+    rec = recorder(delays={"slow": 0.3})
+    assistant, run = start_run(db, FAN_OUT)
+
+    asyncio.run(execute_run(db, assistant, run))
+
+    assert rec.started["fast"] >= rec.finished["planner"]
+    assert rec.started["writer"] >= rec.finished["fast"]
+    assert rec.started["writer"] >= rec.finished["slow"]
+    assert run.status == "completed"
+    # Every agent sees the outputs of its upstream agents, and only those
+    assert rec.histories["fast"] == ["user", "planner"]
+    assert rec.histories["writer"] == ["user", "planner", "fast", "slow"]
+
+
+def test_failing_branch_cancels_the_others_and_fails_the_run(db, fake_llm, recorder):
+    rec = recorder(delays={"slow": 5}, fail={"fast"})
+    assistant, run = start_run(db, FAN_OUT)
+
+    started = time.perf_counter()
+    with pytest.raises(RunFailedError, match="fast exploded"):
+        asyncio.run(execute_run(db, assistant, run))
+
+    assert time.perf_counter() - started < 2
+    assert rec.cancelled == {"slow"}
+    assert "writer" not in rec.started
+    db.expire_all()
+    run = db.query(Run).filter(Run.id == run.id).one()
+    assert run.status == "failed"
+    assert run.error_message == "fast exploded"
+    # What finished before the failure is kept (writer.abort()), nothing after it
+    assert [m.sender for m in run_messages(db, run.id)] == ["user", "planner"]
+
+
+# Concurrent tool calls of one LLM turn (_execute_tool_calls)
+
+class SlowTools:
+    """ Fake tavily / weather handlers that record when they ran """
+    def __init__(self, delays):
+        self.delays = delays
+        self.started = {}
+        self.finished = {}
+
+    def handler(self, name):
+        async def _handler(args, config):
+            self.started[name] = time.perf_counter()
+            await asyncio.sleep(self.delays[name])
+            self.finished[name] = time.perf_counter()
+            return f"{name} result"
+        return _handler
+
+
+def test_tool_calls_of_one_turn_overlap_and_return_in_call_order(fake_llm, monkeypatch):
+    # The first call is the slower one, so the calls finish in reverse order
+    tools = SlowTools({"tavily": 0.3, "weather": 0.1})
+    restore = install_fake_tools(handlers={name: tools.handler(name) for name in tools.delays})
+    monkeypatch.setattr(TOOL_REGISTRY, "cache", None)
+    fake_llm.tool_calls_per_turn = 2
+    requests = []
+
+    async def recording_llm(messages, **kwargs):
+        requests.append(copy.deepcopy(messages))
+        return await acall_llm_with_tools(messages, **kwargs)
+
+    monkeypatch.setattr(runtime, "acall_llm_with_tools", recording_llm)
+    configs = {"tavily": {"api_key": "k"}, "weather": {"api_key": "k"}}
+    try:
+        output, tools_used = asyncio.run(runtime.arun_agent_with_tools(
+            "You are a researcher.",
+            [Message(sender="user", content="weather and news")],
+            ["tavily", "weather"],
+            configs,
+            agent_id="researcher",
+        ))
+    finally:
+        restore()
+
+    assert output.startswith("Fake answer")
+    assert tools_used == ["tavily", "weather"]
+    assert tools.started["weather"] < tools.finished["tavily"]
+    assert tools.finished["weather"] < tools.finished["tavily"]
+
+    # The follow-up request carries one tool message per call, in tool_call order
+    assert len(requests) == 2
+    assistant_turn = next(m for m in requests[1] if m.get("tool_calls"))
+    call_ids = [tc["id"] for tc in assistant_turn["tool_calls"]]
+    tool_messages = [m for m in requests[1] if m["role"] == "tool"]
+    assert [m["tool_call_id"] for m in tool_messages] == call_ids
+    assert [m["content"] for m in tool_messages] == ["tavily result", "weather result"]
@@ -0,0 +1,188 @@
+"""
+ToolRegistry dispatch and the compiled argument validation (app/tools/definitions.py,
+app/tools/manifest.py).
+"""
+
+import asyncio
+import copy
+
+import pytest
+
+from app.core.http import aclose_http_client, get_http_client
+from app.tools.cache import ToolResultCache
+from app.tools.definitions import ToolDefinition, ToolRegistry
+from app.tools.manifest import compile_validator
+
+SEARCH_PARAMETERS = {
+    "type": "object",
+    "properties": {
+        "query": {"type": "string"},
+        "max_results": {"type": "integer", "minimum": 1, "maximum": 10},
+        "depth": {"type": "string", "enum": ["basic", "advanced"]},
+        "domains": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["query"],
+    "additionalProperties": False,
+}
+
+
+@pytest.fixture
+def calls():
+    return []
+
+
+@pytest.fixture
+def registry(calls):
+    def search(args, config):
+        calls.append((args, config))
+        return f"results for {args['query']}"
+
+    registry = ToolRegistry(cache=ToolResultCache(max_entries=10, max_bytes=10_000))
+    registry.register(ToolDefinition(
+        name="search",
+        description="Search the web",
+        parameters=copy.deepcopy(SEARCH_PARAMETERS),
+        handler=search,
+        require_config=["api_key"],
+        cache_ttl=60,
+    ))
+    return registry
+
+
+def run_both(registry, name, arguments, config=None):
+    """ Results of execute() and aexecute() for the same call """
+    return registry.execute(name, arguments, config), asyncio.run(registry.aexecute(name, arguments, config))
+
+
+def test_valid_call_reaches_the_handler(registry, calls):
+    result = registry.execute("search", {"query": "python", "max_results": "5"}, {"api_key": "k"})
+
+    assert result == "results for python"
+    assert calls == [({"query": "python", "max_results": "5", "_config_api_key": "k"}, {"api_key": "k"})]
+
+
+@pytest.mark.parametrize("arguments, error", [
+    ({}, "'query' is required"),
+    ({"query": None}, "'query' is required"),
+    ({"query": 3}, "'query' must be string, got int"),
+    ({"query": "q", "max_results": "many"}, "'max_results' must be integer, got str"),
+    ({"query": "q", "max_results": 2.5}, "'max_results' must be integer, got float"),
+    ({"query": "q", "max_results": True}, "'max_results' must be integer, got bool"),
+    ({"query": "q", "max_results": 0}, "'max_results' must be >= 1, got 0"),
+    ({"query": "q", "max_results": 11}, "'max_results' must be <= 10, got 11"),
+    ({"query": "q", "depth": "deep"}, "'depth' must be one of 'basic', 'advanced', got 'deep'"),
+    ({"query": "q", "domains": ["a.com", 1]}, "'domains[1]' must be string, got int"),
+    ({"query": "q", "limit": 5}, "unknown argument 'limit' (expected: query, max_results, depth, domains)"),
+    (["q"], "arguments must be a JSON object"),
+])
+def test_invalid_arguments_never_reach_the_handler(registry, calls, arguments, error):
+    expected = f"Error: invalid arguments for search: {error}"
+
+    assert run_both(registry, "search", arguments) == (expected, expected)
+    assert calls == []
+
+
+def test_invalid_arguments_are_not_cached(registry, calls):
+    registry.execute("search", {"query": 1})
+    registry.execute("search", {"query": "q"})
+    registry.execute("search", {"query": "q"})
+
+    assert len(calls) == 1
+
+
+def test_unknown_tool(registry):
+    assert run_both(registry, "nope", {}) == ("Tool 'nope' not found", "Tool 'nope' not found")
+
+
+def test_register_rejects_duplicates(registry):
+    with pytest.raises(ValueError, match="already registered"):
+        registry.register(ToolDefinition("search", "again", {}, lambda args: ""))
+
+
+def test_async_and_single_argument_handlers():
+    async def echo(args):
+        return args["text"].upper()
+
+    registry = ToolRegistry()
+    registry.register(ToolDefinition("echo", "Echo", {"properties": {"text": {"type": "string"}}}, echo))
+
+    assert asyncio.run(registry.aexecute("echo", {"text": "hi"})) == "HI"
+    assert (asyncio.run(registry.aexecute("echo", {"text": 1}))
+            == "Error: invalid arguments for echo: 'text' must be string, got int")
+
+
+def test_sync_execute_rejects_async_handlers():
+    async def echo(args):
+        return args["text"]
+
+    registry = ToolRegistry()
+    registry.register(ToolDefinition("echo", "Echo", {"properties": {"text": {"type": "string"}}}, echo))
+
+    with pytest.raises(TypeError, match="aexecute"):
+        registry.execute("echo", {"text": "hi"})
+
+
+def test_tool_handlers_share_one_http_client():
+    async def scenario():
+        client = get_http_client()
+        assert get_http_client() is client
+        await aclose_http_client()
+        assert client.is_closed
+        assert get_http_client() is not client
+        await aclose_http_client()
+
+    asyncio.run(scenario())
+
+
+def test_schema_lists_are_memoized_until_register(registry):
+    schemas = registry.get_openai_schemas_list(["search", "missing"])
+
+    assert schemas == [{
+        "type": "function",
+        "function": {"name": "search", "description": "Search the web", "parameters": SEARCH_PARAMETERS},
+    }]
+    assert registry.get_openai_schemas_list(["search", "missing"]) is schemas
+
+    registry.register(ToolDefinition("other", "Other", {}, lambda args: ""))
+    assert registry.get_openai_schemas_list(["search", "missing"]) is not schemas
+
+
+def test_schema_is_a_copy_of_the_definition(registry):
+    registry.get("search").parameters["required"].append("depth")
+
+    assert registry.get_openai_schemas("search")["function"]["parameters"]["required"] == ["query"]
+    assert registry.execute("search", {"query": "q"}) == "results for q"
+
+
+def test_replaced_handler_is_recompiled(registry, calls):
+    async def fake_search(args):
+        return f"fake {args['query']}"
+
+    tool = registry.get("search")
+    original = tool.handler
+    tool.handler = fake_search
+    try:
+        assert asyncio.run(registry.aexecute("search", {"query": "a"})) == "fake a"
+        # Validation is kept for the new handler
+        assert asyncio.run(registry.aexecute("search", {})).startswith("Error: invalid arguments")
+    finally:
+        tool.handler = original
+    assert registry.execute("search", {"query": "b"}) == "results for b"
+    assert len(calls) == 1
+
+
+def test_validator_accepts_union_types_and_nested_objects():
+    validate = compile_validator({
+        "type": "object",
+        "properties": {
+            "filter": {
+                "type": "object",
+                "properties": {"since": {"type": ["string", "null"]}},
+                "additionalProperties": {"type": "number"},
+            },
+        },
+    })
+
+    assert validate({"filter": {"since": None, "score": "0.5"}}, "") is None
+    assert validate({"filter": {"since": 3}}, "") == "'filter.since' must be string or null, got int"
+    assert validate({"filter": {"score": "high"}}, "") == "'filter.score' must be number, got str"
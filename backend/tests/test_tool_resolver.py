@@ -0,0 +1,156 @@
+"""
+Per-assistant tool plan cache (app/services/tool_resolver.py).
+"""
+
+from datetime import timedelta
+
+import pytest
+
+from app.core.config import settings
+from app.db.models import Assistant, MCPServer, UserToolConnection
+from app.services import tool_resolver
+from app.services.tool_resolver import (
+    graph_tool_refs,
+    invalidate_assistant_tools,
+    invalidate_tool_plans,
+    resolve_tools_for_assistant,
+    tool_plan_cache_stats,
+)
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(tool_resolver, "_plans", {})
+    monkeypatch.setattr(tool_resolver, "_stats", {"hits": 0, "misses": 0, "invalidations": 0})
+    monkeypatch.setattr(settings, "TOOL_PLAN_CACHE_TTL_S", 300)
+
+
+@pytest.fixture
+def rows(db):
+    """ A tavily connection, an MCP server and an assistant whose agents use them """
+    tavily = UserToolConnection(name="search", template_key="tavily", config_json={"api_key": "k"}, status="connected")
+    unused = UserToolConnection(name="unused", template_key="tavily", config_json={}, status="connected")
+    server = MCPServer(name="fs", endpoint="http://mcp.test", config_json={"root": "/"})
+    db.add_all([tavily, unused, server])
+    db.flush()
+    assistant = Assistant(name="test", graph_json={
+        "nodes": [
+            {"id": "researcher", "type": "agent", "tool_refs": [
+                {"kind": "user_tool", "id": tavily.id},
+                {"kind": "mcp_server", "id": server.id},
+            ]},
+            {"id": "writer", "type": "agent"},
+        ],
+        "edges": [{"from": "researcher", "to": "writer"}],
+    })
+    db.add(assistant)
+    db.commit()
+    return assistant, tavily, server
+
+
+def test_graph_tool_refs_skips_malformed_refs():
+    graph = {"nodes": [{"id": "a", "tool_refs": [
+        {"kind": "user_tool", "id": 1},
+        {"kind": "mcp_server", "id": 2},
+        {"kind": "user_tool", "id": "3"},
+        {"kind": "other", "id": 4},
+    ]}]}
+
+    assert graph_tool_refs(graph) == {("user_tool", 1), ("mcp_server", 2)}
+
+
+def test_resolves_only_referenced_rows(db, rows):
+    assistant, tavily, server = rows
+
+    plan = resolve_tools_for_assistant(db, assistant)
+
+    assert plan == {
+        "researcher": [
+            {"kind": "user_tool", "id": tavily.id, "template_key": "tavily",
+             "config": {"api_key": "k"}, "status": "connected"},
+            {"kind": "user_tool", "id": server.id, "template_key": "mcp",
+             "config": {"endpoint": "http://mcp.test", "config_json": {"root": "/"}}},
+        ],
+        "writer": [],
+    }
+
+
+def test_second_resolution_is_a_cache_hit(db, rows):
+    assistant, tavily, _ = rows
+    first = resolve_tools_for_assistant(db, assistant)
+
+    # A change the cache can't see (no invalidation) is not picked up
+    db.query(UserToolConnection).filter_by(id=tavily.id).update({"status": "error"})
+    db.commit()
+
+    assert resolve_tools_for_assistant(db, assistant) is first
+    assert tool_plan_cache_stats() == {"enabled": True, "size": 1, "hits": 1, "misses": 1, "invalidations": 0}
+
+
+def test_invalidate_tool_plans_drops_plans_referencing_the_row(db, rows):
+    assistant, tavily, server = rows
+    resolve_tools_for_assistant(db, assistant)
+
+    invalidate_tool_plans("user_tool", tavily.id + 100)
+    invalidate_tool_plans("mcp_server", server.id + 100)
+    assert tool_plan_cache_stats()["size"] == 1
+
+    db.query(UserToolConnection).filter_by(id=tavily.id).update({"status": "error"})
+    db.commit()
+    invalidate_tool_plans("user_tool", tavily.id)
+
+    assert tool_plan_cache_stats()["invalidations"] == 1
+    assert resolve_tools_for_assistant(db, assistant)["researcher"][0]["status"] == "error"
+
+
+@pytest.mark.parametrize("kind", ["user_tool", "mcp_server"])
+def test_invalidate_tool_plans_without_id_drops_every_plan_of_the_kind(db, rows, kind):
+    assistant, _, _ = rows
+    resolve_tools_for_assistant(db, assistant)
+
+    invalidate_tool_plans(kind)
+
+    assert tool_plan_cache_stats()["size"] == 0
+
+
+def test_invalidate_assistant_tools(db, rows):
+    assistant, _, _ = rows
+    first = resolve_tools_for_assistant(db, assistant)
+
+    invalidate_assistant_tools(assistant.id)
+    invalidate_assistant_tools(assistant.id)  # nothing left to drop
+
+    assert tool_plan_cache_stats()["invalidations"] == 1
+    assert resolve_tools_for_assistant(db, assistant) is not first
+
+
+def test_graph_change_is_picked_up_through_updated_at(db, rows):
+    assistant, _, _ = rows
+    resolve_tools_for_assistant(db, assistant)
+
+    # E.g. changed by another process: no invalidation, but a new version
+    assistant.graph_json = {"nodes": [{"id": "solo", "type": "agent"}], "edges": []}
+    assistant.updated_at = assistant.updated_at + timedelta(seconds=1)
+    db.commit()
+
+    assert resolve_tools_for_assistant(db, assistant) == {"solo": []}
+
+
+def test_expired_plan_is_rebuilt(db, rows):
+    assistant, _, _ = rows
+    first = resolve_tools_for_assistant(db, assistant)
+    tool_resolver._plans[assistant.id].expires_at = 0.0
+
+    assert resolve_tools_for_assistant(db, assistant) is not first
+    assert tool_plan_cache_stats()["misses"] == 2
+
+
+def test_ttl_zero_disables_the_cache(db, rows, monkeypatch):
+    monkeypatch.setattr(settings, "TOOL_PLAN_CACHE_TTL_S", 0)
+    assistant, _, _ = rows
+
+    first = resolve_tools_for_assistant(db, assistant)
+
+    assert resolve_tools_for_assistant(db, assistant) == first
+    assert resolve_tools_for_assistant(db, assistant) is not first
+    assert tool_plan_cache_stats() == {"enabled": False, "size": 0, "hits": 0, "misses": 0, "invalidations": 0}
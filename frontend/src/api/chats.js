@@ -13,6 +13,30 @@ export async function fetchChat(assistantId, chatId) {
   return res.data;
 }
 
+/**
+ * One page of a chat's messages, oldest first within the page.
+ * No cursor = the latest page; beforeId = older, afterId = newer.
+ * Returns { chat_id, messages, has_more, before_id, after_id }.
+ */
+export async function fetchChatMessages(
+  assistantId,
+  chatId,
+  { beforeId, afterId, limit, metadataOnly } = {}
+) {
+  const res = await apiClient.get(
+    `/assistants/${assistantId}/chats/${chatId}/messages`,
+    {
+      params: {
+        before_id: beforeId,
+        after_id: afterId,
+        limit,
+        metadata_only: metadataOnly || undefined,
+      },
+    }
+  );
+  return res.data;
+}
+
 export async function deleteChat(assistantId, chatId) {
   await apiClient.delete(`/assistants/${assistantId}/chats/${chatId}`);
 }
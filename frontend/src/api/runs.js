@@ -11,3 +11,63 @@ export async function createRun(assistantId, inputText, chatId) {
   );
   return res.data;
 }
+
+/**
+ * Start a run and consume its Server-Sent Events stream.
+ * `onEvent` is called with every parsed event
+ * ({ type: "agent_started" | "token" | "tool_call" | "tool_result" |
+ *   "agent_completed" | "route_selected" | "agent_skipped" |
+ *   "run_completed" | "run_failed", ... }).
+ * Resolves with the final run (RunWithMessages) once the stream ends.
+ */
+export async function streamRun(assistantId, inputText, chatId, onEvent) {
+  const res = await fetch(
+    `${apiClient.defaults.baseURL}/assistants/${assistantId}/runs/stream`,
+    {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({
+        input_text: inputText,
+        chat_id: chatId || null,
+      }),
+    }
+  );
+  if (!res.ok) {
+    const body = await res.json().catch(() => ({}));
+    throw new Error(body.detail || `Run failed with HTTP ${res.status}`);
+  }
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let finalRun = null;
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    // SSE frames are separated by a blank line
+    let sep;
+    while ((sep = buffer.indexOf("\n\n")) !== -1) {
+      const frame = buffer.slice(0, sep);
+      buffer = buffer.slice(sep + 2);
+      const dataLine = frame.split("\n").find((l) => l.startsWith("data: "));
+      if (!dataLine) continue;
+      const event = JSON.parse(dataLine.slice(6));
+      if (event.type === "run_completed") finalRun = event.run;
+      if (event.type === "run_failed") throw new Error(event.error);
+      onEvent?.(event);
+    }
+  }
+  return finalRun;
+}
+
+/**
+ * Per-step timeline of a run (every LLM / tool call with timings,
+ * tokens and errors) for profiling slow runs.
+ */
+export async function getRunTimeline(runId) {
+  const res = await apiClient.get(`/runs/${runId}/timeline`);
+  return res.data;
+}
@@ -3,7 +3,7 @@ import styles from "./Playground.module.css";
 import Button from "../common/Button";
 import ChatTranscript from "./chatTranscripts";
 import { createRun } from "../../api/runs.js";
-import { fetchChats, fetchChat, deleteChat } from "../../api/chats.js";
+import { fetchChats, fetchChatMessages, deleteChat } from "../../api/chats.js";
 
 const Playground = ({
   assistantName,
@@ -15,6 +15,8 @@ const Playground = ({
   const [error, setError] = useState(null);
   const [currentChatId, setCurrentChatId] = useState(null);
   const [chats, setChats] = useState([]);
+  // Cursor of the next older page of the open chat (null = nothing older)
+  const [olderCursor, setOlderCursor] = useState(null);
 
   // Map backend messages to frontend format - show ALL messages
   const mapBackendMessages = (backendMessages) => {
@@ -41,22 +43,37 @@ const Playground = ({
     }
   }, [assistantId]);
 
+  // Load the latest page of a chat; older pages are fetched on demand
   const loadChatMessages = useCallback(async (chatId) => {
     try {
-      const chatData = await fetchChat(assistantId, chatId);
-      const mapped = mapBackendMessages(chatData.messages);
-      setMessages(mapped);
+      const page = await fetchChatMessages(assistantId, chatId);
+      setMessages(mapBackendMessages(page.messages));
+      setOlderCursor(page.has_more ? page.before_id : null);
       setCurrentChatId(chatId);
     } catch (err) {
       console.error("Failed to load chat:", err);
     }
   }, [assistantId]);
 
+  const loadOlderMessages = async () => {
+    if (!currentChatId || olderCursor === null) return;
+    try {
+      const page = await fetchChatMessages(assistantId, currentChatId, {
+        beforeId: olderCursor,
+      });
+      setMessages((prev) => [...mapBackendMessages(page.messages), ...prev]);
+      setOlderCursor(page.has_more ? page.before_id : null);
+    } catch (err) {
+      console.error("Failed to load older messages:", err);
+    }
+  };
+
   // Load chats when assistant changes
   useEffect(() => {
     // Reset state when assistant changes
     setCurrentChatId(null);
     setMessages([]);
+    setOlderCursor(null);
     setInput("");
     loadChats();
   }, [assistantId, loadChats]);
@@ -103,10 +120,13 @@ const Playground = ({
         await loadChats();
       }
 
-      // ✅ FIXED: Backend returns ALL messages (previous conversation + new)
-      // Just replace all messages with the complete conversation
-      const allMapped = mapBackendMessages(res.messages);
-      setMessages(allMapped); // Replace with complete conversation
+      // Backend only sends the recent part of the conversation as context
+      // (older turns live in the chat summary), so append this run's
+      // messages in place of the optimistic user message
+      const runMapped = mapBackendMessages(
+        res.messages.filter((m) => m.run_id === res.id)
+      );
+      setMessages((prev) => [...prev.slice(0, -1), ...runMapped]);
       
       // Reload chat list to update timestamps
       await loadChats();
@@ -130,6 +150,7 @@ const Playground = ({
   const handleNewChat = () => {
     setCurrentChatId(null);
     setMessages([]);
+    setOlderCursor(null);
     setInput("");
   };
 
@@ -181,6 +202,7 @@ const Playground = ({
                       // If deleted chat was active, clear it
                       setCurrentChatId(null);
                       setMessages([]);
+                      setOlderCursor(null);
                     }
                   } catch (err) {
                     console.error("Failed to delete chat:", err);
@@ -198,6 +220,9 @@ const Playground = ({
   
       {/* ✅ FIXED: Transcript comes first (grows to fill space) */}
       <div className={styles.transcriptSection}>
+        {olderCursor !== null && (
+          <Button onClick={loadOlderMessages}>Load earlier messages</Button>
+        )}
         <ChatTranscript 
           messages={messages} 
           onDeleteMessage={async (messageId) => {
@@ -77,7 +77,18 @@
 //   id:string;
 //   source: string;
 //   target: string;
-//   condition?: string;
+//   condition?: string;   // route label(s) "a|b", "regex:<pattern>" or "contains:<text>",
+//                         // matched against the source node's output
+// }
+
+// RouterNode interface (type: "router")
+// {
+//   id:string;
+//   mode?: "rules" | "llm";
+//   rules?: { pattern: string; route: string }[];
+//   routes?: string[] | Record<string, string>;   // label -> description (llm mode)
+//   default?: string;
+//   system_prompt?: string;
 // }
 
 // AssistantGraph interface